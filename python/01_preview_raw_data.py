@@ -6,7 +6,7 @@ Purpose:
     Establishes the foundation for subsequent data cleaning modules.
 
 Dataset:
-    data_raw/ (folder containing raw platform CSVs)
+    data_raw/ (folder containing raw platform CSVs - plain, .csv.gz or .csv.zst)
 
 Author: Shian Raveneau-Wright
 
@@ -17,12 +17,11 @@ Notes:
 """
 
 
-import pandas as pd
+from gma.raw_csv import raw_file, read_raw_csv # finds games.csv / games.csv.gz / games.csv.zst
 
-# Creates file paths (relative to the project folder)
+# Platforms and tables to preview (files are found under data_raw/ by raw_file below)
 platforms = ["playstation", "steam", "xbox"]
 tables = ["games", "players", "prices", "purchased_games"]
-base_path = "./data_raw/"
 
 #Loops through each string in the 'platforms' list and assigns it to the temp. variable 'platform'
 #Actions the code below it then reassigns the value of 'platform' to the next string in the list until there are none left 
@@ -32,13 +31,13 @@ for platform in platforms:
     #takes the string in variable 'platform' and converts all charactesr to upper case
 
     for table in tables:
-        file_path = f"{base_path}{platform}/{table}.csv"
+        file_path = raw_file(platform, f"{table}.csv") # data_raw/<platform>/<table>.csv in whichever form exists
         # the value of the variable 'file_path is printed out because it is in {}
         print(f"\n--- Loading: {file_path} ---")
 
         try:
             # Using pandas (pd) this reads the .csv file and stores the information in a data frame (df)
-            df = pd.read_csv(file_path)
+            df = read_raw_csv(file_path)
             print(df.head())  # Shows first rows
             print(df.info())  # Shows data types
         except Exception as error_message:
@@ -1,39 +1,18 @@
-import sqlite3
-import pandas as pd
-from pathlib import Path
+"""
+Script Name: 07_load_population_into_sql.py
+Purpose:
+    Loads the prepared population tables (population, population_by_year,
+    countries, country_aliases) from data_external/ into
+    database/games_analytics.db.
 
-# === Define paths ===
-BASE_DIR = Path(".")
-EXTERNAL_DIR = BASE_DIR / "data_external"
-DB_DIR = BASE_DIR / "database"
-DB_PATH = DB_DIR / "games_analytics.db"
+Author: Shian Raveneau-Wright
 
-POP_CLEAN = EXTERNAL_DIR / "population_clean.csv"
+Notes:
+    - Stage logic lives in gma/population.py (load). Equivalent:
+      gma run load-population
+"""
 
-# === Load cleaned population CSV ===
-population_df = pd.read_csv(POP_CLEAN)
+from gma.population import load
 
-# === Connect to SQLite ===
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-# === Create population table ===
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS population (
-    country TEXT PRIMARY KEY,
-    population INTEGER
-);
-""")
-
-conn.commit()
-
-# === Insert data ===
-population_df.to_sql(
-    "population",
-    conn,
-    if_exists="replace",   # replace ensures the table updates cleanly
-    index=False
-)
-
-conn.close()
-print("Population data successfully added to SQLite.")
\ No newline at end of file
+if __name__ == "__main__":
+    load()
@@ -0,0 +1,26 @@
+"""
+Script Name: 08_run_sql_reports.py
+Purpose:
+    Run every analysis query in sql/ against games_analytics.db and write each
+    result set to reports/sql_results/ for the visualisation layer.
+    Independent queries run concurrently on separate read-only connections
+    (see gma/batch_runner.py).
+
+Dataset:
+    Input:   database/games_analytics.db
+             sql/*.sql
+    Output:  reports/sql_results/<sql file>/<query>.csv
+             reports/sql_results/manifest.json
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Options: --workers N, --format csv|parquet, --only 03_player_value ...,
+      --backend sqlite|duckdb (duckdb needs gma/columnar_backend.py build first)
+    - Exit code is 1 if any query failed (details in manifest.json).
+"""
+
+from gma.batch_runner import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,29 @@
+"""
+Script Name: 09_build_partitions.py
+Purpose:
+    Build the optional platform-partitioned copy of games_analytics.db:
+    one SQLite file per platform, with players and purchases clustered and
+    indexed by country. Queries that only need one platform (or a handful of
+    countries) then read a fraction of the data - see gma/partitions.py.
+
+Dataset:
+    Input:   database/games_analytics.db
+    Output:  database/partitions/playstation.db
+             database/partitions/steam.db
+             database/partitions/xbox.db
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Run after 05_build_sql_database.py (and 07 for population).
+    - Query example (from python/):
+        python -m gma.partitions query 03_player_value.estimated_spend_per_player --platform steam
+        python -m gma.partitions query 01_market_penetration.total_players_per_country --country Japan
+"""
+
+import sys
+
+from gma.partitions import main
+
+if __name__ == "__main__":
+    raise SystemExit(main(["build", *sys.argv[1:]]))
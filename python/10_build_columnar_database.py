@@ -0,0 +1,25 @@
+"""
+Script Name: 10_build_columnar_database.py
+Purpose:
+    Load the clean tables into an embedded DuckDB (columnar) database so the
+    sql/ files can run vectorised on all cores - see gma/columnar_backend.py.
+
+Dataset:
+    Input:   data_clean/*_master*.csv
+             data_external/population_clean.csv
+    Output:  database/games_analytics.duckdb
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Optional: requires `pip install duckdb`. SQLite stays the default backend.
+    - Check results against SQLite (from python/):
+        python -m gma.columnar_backend parity
+    - Run the reports on DuckDB:
+        python 08_run_sql_reports.py --backend duckdb
+"""
+
+from gma.columnar_backend import main
+
+if __name__ == "__main__":
+    raise SystemExit(main(["build"]))
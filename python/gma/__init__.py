@@ -0,0 +1,10 @@
+"""
+Package Name: gma
+Purpose:
+    Importable helpers for the Gaming Market Analysis pipeline.
+    The numbered scripts in python/ remain the documented entry points;
+    this package holds the pieces that are shared between them or that
+    need to be imported (services, catalogues, reusable primitives).
+
+Author: Shian Raveneau-Wright
+"""
@@ -0,0 +1,3 @@
+from gma.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""
+Module Name: artifacts.py
+Purpose:
+    Writes the data_clean/ and data_external/ side outputs of the cleaning
+    stages. When stages are chained in one process (`gma run all`) the clean
+    DataFrames go straight to the SQLite loader, so the CSV/Parquet files are
+    no longer on the critical path - ArtifactWriter can write them on a
+    background thread, or skip them.
+
+        writer = ArtifactWriter("background")
+        writer.write(df, CLEAN_DIR / "games_master.csv")
+        ...
+        writer.close()          # waits for pending files, re-raises errors
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - mode="sync" (default) writes immediately, exactly like the old
+      df.to_csv(path, index=False) calls - used by the numbered scripts.
+    - mode="background" uses one writer thread, so files are written in the
+      order they were submitted. A frame must not be modified after it has
+      been handed to write().
+    - mode="off" writes nothing (fastest full rebuild; later standalone
+      stages then have nothing to read).
+    - fmt="parquet" needs pyarrow; paths keep their name with a .parquet suffix.
+    - Files are written to a temporary name and renamed, so a reader never
+      sees a half-written artifact.
+    - Datetime columns are written as CSV_DATE_FORMAT. Left to itself, to_csv
+      writes a column date-only when every value in the block it is formatting
+      is at midnight, so one file could mix both forms; gma/spill.py writes
+      with the same format, block by block.
+"""
+
+import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MODES = ["sync", "background", "off"]
+FORMATS = ["csv", "parquet"]
+CSV_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def write_frame(df, path, fmt="csv"):
+    path = Path(path)
+    if fmt == "parquet":
+        path = path.with_suffix(".parquet")
+    tmp_path = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False, date_format=CSV_DATE_FORMAT)
+    tmp_path.replace(path)
+    return path
+
+
+class ArtifactWriter:
+    def __init__(self, mode="sync", fmt="csv"):
+        if mode not in MODES:
+            raise ValueError(f"unknown artifact mode {mode!r}; expected one of {MODES}")
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown artifact format {fmt!r}; expected one of {FORMATS}")
+        if fmt == "parquet" and mode != "off" and not any(
+                importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet")):
+            raise RuntimeError("parquet artifacts need pyarrow (or fastparquet) installed")
+        self.mode = mode
+        self.fmt = fmt
+        self.written = []
+        self._pending = []
+        self._executor = None
+        if mode == "background":
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gma-artifacts")
+
+    def write(self, df, path):
+        if self.mode == "off":
+            return
+        if self.mode == "sync":
+            self.written.append(write_frame(df, path, self.fmt))
+            return
+        self._pending.append(self._executor.submit(write_frame, df, path, self.fmt))
+
+    def flush(self):
+        """Wait for the pending background writes (the writer stays usable); re-raises errors."""
+        errors = []
+        for future in self._pending:
+            try:
+                self.written.append(future.result())
+            except Exception as error_message:
+                errors.append(error_message)
+        self._pending = []
+        if errors:
+            raise RuntimeError(f"{len(errors)} artifact(s) failed to write: {errors[0]}") from errors[0]
+
+    def close(self):
+        """Wait for background writes; returns the seconds spent waiting."""
+        start = time.perf_counter()
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        return time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
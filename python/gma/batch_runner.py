@@ -0,0 +1,193 @@
+"""
+Module Name: batch_runner.py
+Purpose:
+    Rebuild the full set of SQL report outputs in parallel. Every query in
+    sql/*.sql is an independent read-only SELECT, so after the views they
+    depend on exist (e.g. players_enriched) they can all run at once on
+    separate read connections. Each result set is written to disk for the
+    visualisation layer.
+
+Dataset:
+    Input:   database/games_analytics.db
+             sql/*.sql
+    Output:  reports/sql_results/<sql file stem>/<query slug>.csv (or .parquet)
+             reports/sql_results/manifest.json
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Uses a thread pool: sqlite3 releases the GIL while a statement runs,
+      so threads give real parallelism without copying results between
+      processes.
+    - Views are created as TEMP views on each worker connection, in
+      dependency order, and only if a selected query needs them.
+    - Queries are submitted slowest-first using the timings from the previous
+      manifest, so total wall time tracks the slowest query rather than the
+      sum of all of them.
+    - A failing query is recorded in the manifest and does not stop the batch.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from gma.paths import DB_PATH, REPORTS_DIR, SQL_DIR
+from gma.query_service import ReadOnlyPool
+from gma.sql_catalog import load_catalog, ordered_views, queries
+
+OUT_DIR = REPORTS_DIR / "sql_results"
+FETCH_SIZE = 10_000
+
+
+''' ===== WRITERS ===== '''
+
+def write_csv(cursor, path):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([d[0] for d in cursor.description])
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def write_parquet(cursor, path):
+    try:
+        import pandas as pd
+    except ImportError:
+        raise RuntimeError("parquet output needs pandas + pyarrow installed")
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+    df.to_parquet(path, index=False)
+    return len(df)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+''' ===== RUNNER ===== '''
+
+def _previous_timings(out_dir):
+    manifest = out_dir / "manifest.json"
+    if not manifest.exists():
+        return {}
+    try:
+        entries = json.loads(manifest.read_text(encoding="utf-8"))["queries"]
+    except (ValueError, KeyError):
+        return {}
+    return {e["name"]: e.get("seconds") or 0.0 for e in entries}
+
+
+def run_one(pool, stmt, out_dir, fmt):
+    target_dir = out_dir / stmt.file.rsplit(".", 1)[0]
+    target_dir.mkdir(parents=True, exist_ok=True)
+    path = target_dir / f"{stmt.name.split('.', 1)[1]}.{fmt}"
+    start = time.perf_counter()
+    entry = {"name": stmt.name, "file": stmt.file, "title": stmt.title, "output": str(path)}
+    try:
+        with pool.connection() as conn:
+            cursor = conn.execute(stmt.sql)
+            entry["rows"] = WRITERS[fmt](cursor, path)
+        entry["status"] = "ok"
+    except Exception as error_message:
+        entry["status"] = "error"
+        entry["error"] = str(error_message)
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+
+def run_batch(db_path=DB_PATH, sql_dir=SQL_DIR, out_dir=OUT_DIR, workers=None, fmt="csv", only=None,
+              backend="sqlite"):
+    """
+    Run every query (or those whose name starts with one of the `only`
+    prefixes) in parallel and return the manifest dict.
+    backend="duckdb" runs the same files on the columnar backend
+    (gma/columnar_backend.py); db_path is then the .duckdb file.
+    """
+    catalog = load_catalog(sql_dir)
+    selected = queries(catalog)
+    if only:
+        selected = [q for q in selected if any(q.name.startswith(p) for p in only)]
+    workers = workers or min(len(selected), os.cpu_count() or 4) or 1
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # slowest queries first (longest-processing-time scheduling)
+    previous = _previous_timings(out_dir)
+    selected.sort(key=lambda q: previous.get(q.name, float("inf")), reverse=True)
+
+    if backend == "duckdb":
+        from gma.columnar_backend import DuckDBPool
+        pool = DuckDBPool(Path(db_path))
+    else:
+        setup = [v.sql for v in ordered_views(catalog, [q.name for q in selected])]
+        pool = ReadOnlyPool(str(db_path), size=workers, setup_sql=setup)
+
+    print(f"Running {len(selected)} queries on {workers} workers -> {out_dir}")
+    start = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gma-batch") as executor:
+            futures = [executor.submit(run_one, pool, q, out_dir, fmt) for q in selected]
+            for future in as_completed(futures):
+                entry = future.result()
+                results.append(entry)
+                flag = "✔" if entry["status"] == "ok" else "✘"
+                detail = f"{entry.get('rows', 0)} rows" if entry["status"] == "ok" else entry["error"]
+                print(f"  {flag} {entry['name']} ({entry['seconds']:.2f}s, {detail})")
+    finally:
+        pool.close()
+
+    wall = time.perf_counter() - start
+    order = {q.name: i for i, q in enumerate(queries(catalog))}
+    results.sort(key=lambda e: order[e["name"]])
+    manifest = {
+        "database": str(db_path),
+        "backend": backend,
+        "format": fmt,
+        "workers": workers,
+        "wall_seconds": round(wall, 4),
+        "sum_query_seconds": round(sum(e["seconds"] for e in results), 4),
+        "slowest_query_seconds": max((e["seconds"] for e in results), default=0.0),
+        "failed": [e["name"] for e in results if e["status"] != "ok"],
+        "queries": results,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    print(f"\nWall time: {manifest['wall_seconds']:.2f}s "
+          f"(slowest query {manifest['slowest_query_seconds']:.2f}s, "
+          f"sum of queries {manifest['sum_query_seconds']:.2f}s)")
+    if manifest["failed"]:
+        print(f"  {len(manifest['failed'])} queries failed — see manifest.json")
+    return manifest
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run all sql/ report queries in parallel")
+    parser.add_argument("--db", default=None, help="defaults to the database of the chosen backend")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    parser.add_argument("--out", default=str(OUT_DIR))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--only", nargs="*", help="query name prefixes, e.g. 03_player_value")
+    args = parser.parse_args(argv)
+
+    db_path = args.db
+    if db_path is None and args.backend == "duckdb":
+        from gma.columnar_backend import DUCKDB_PATH
+        db_path = DUCKDB_PATH
+    manifest = run_batch(db_path or DB_PATH, out_dir=Path(args.out), workers=args.workers,
+                         fmt=args.format, only=args.only, backend=args.backend)
+    return 1 if manifest["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,394 @@
+"""
+Module Name: benchmarks.py
+Purpose:
+    Time and memory benchmarks for the Python cleaning code, so performance
+    work on it can be measured. Each cleaning function (safe_literal_eval,
+    parse_dates, deduplicate_games, clean_players, clean_purchases,
+    clean_price_df) and each cleaning stage is run on generated inputs at a
+    chosen scale, and its time, peak memory and rows/second are recorded.
+
+        gma bench run --scale 10k                   # run + write benchmarks/results_10k.json
+        gma bench run --scale 1m --save-baseline    # ... and store it as benchmarks/baseline_1m.json
+        gma bench check --scale 10k                 # run and exit 1 if anything regressed vs. the baseline
+
+Dataset:
+    Input:   benchmarks/data/<scale>/data_raw/steam/*.csv (generated, seeded, created on first use)
+    Output:  benchmarks/results_<scale>.json
+             benchmarks/baseline_<scale>.json (--save-baseline)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Scales are the row count of every generated raw table: 10k, 1m, 10m.
+      Only a Steam-shaped platform is generated (it has the most columns to clean).
+    - Every benchmark runs in its own child process with GMA_DATA_ROOT pointing at
+      the generated data (see gma/paths.py), so the stages read and write there and
+      the peak RSS belongs to that benchmark alone.
+    - seconds = fastest of --repeat runs. peak_mb = tracemalloc peak of one extra,
+      untimed run (tracing slows the code down). rss_mb = peak RSS of the child
+      process, for information only.
+    - A regression is seconds or peak_mb more than --threshold (default 25%) above
+      the baseline; differences under 10 ms / 1 MB are treated as noise, and a
+      benchmark that regresses is re-run once before it counts.
+    - Baselines depend on the machine; check warns when the baseline was recorded
+      on a different host.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from gma.paths import REPO_ROOT
+
+BENCH_DIR = REPO_ROOT / "benchmarks"
+DATA_DIR = BENCH_DIR / "data"
+PACKAGE_PARENT = Path(__file__).resolve().parents[1] # python/ - the child processes import gma from here
+
+# scale -> (rows per raw table, default repeats)
+SCALES = {
+    "10k": (10_000, 5),
+    "1m": (1_000_000, 3),
+    "10m": (10_000_000, 1),
+}
+THRESHOLD = 0.25
+MIN_SECONDS = 0.01 # smaller slowdowns are timer noise
+MIN_MB = 1.0
+GEN_CHUNK = 250_000 # rows generated and written per step
+GENERATOR_VERSION = "1"
+
+
+''' ===== GENERATED INPUTS ===== '''
+
+GENRES = ["['Action', 'Adventure']", "['Indie']", "['Strategy', 'Simulation', 'Casual']", "[]", "",
+          "Action, RPG"] # the last one is not a list literal - exercises the comma-split fallback
+LANGUAGES = ["['English']", "['English', 'French', 'German']", "['Japanese', 'English']", ""]
+COUNTRIES = ["United States", "Germany", "Japan", "Brazil", "Korea, Republic of", "Russian Federation", ""]
+PRICES = ["", "4.99", "9.99", "19.99", "59.99"]
+
+
+def _dates(rng, n, start, days, blank=0.05, with_time=False):
+    import numpy as np
+    if with_time:
+        values = (np.datetime64(start, "s") + rng.integers(0, days * 86400, n)).astype(str)
+        values = np.char.replace(values, "T", " ")
+    else:
+        values = (np.datetime64(start, "D") + rng.integers(0, days, n)).astype(str)
+    values = values.astype(object)
+    values[rng.random(n) < blank] = ""
+    return values
+
+
+def _games(rng, start, n, total):
+    import pandas as pd
+    ids = rng.integers(0, max(int(total * 0.8), 1), n) # ~20% duplicate gameids for deduplicate_games
+    labels = pd.Series(ids).astype(str)
+    devs = pd.Series(rng.integers(0, 500, n)).astype(str)
+    return pd.DataFrame({
+        "gameid": ids,
+        "title": " Game " + labels + " ",
+        "developers": "['Dev " + devs + "', 'Studio " + labels + "']",
+        "publishers": "['Pub " + devs + "']",
+        "genres": rng.choice(GENRES, n),
+        "supported_languages": rng.choice(LANGUAGES, n),
+        "release_date": _dates(rng, n, "2005-01-01", 7000),
+    })
+
+
+def _players(rng, start, n, total):
+    import numpy as np
+    import pandas as pd
+    ids = np.arange(start, start + n)
+    repeat = rng.random(n) < 0.02 # a few duplicate players
+    ids[repeat] = rng.integers(0, start + n, int(repeat.sum()))
+    return pd.DataFrame({
+        "playerid": ids,
+        "country": rng.choice(COUNTRIES, n),
+        "created": _dates(rng, n, "2010-01-01", 5000, with_time=True),
+    })
+
+
+def _purchases(rng, start, n, total):
+    import numpy as np
+    import pandas as pd
+    games = max(int(total * 0.8), 1)
+    sizes = rng.integers(0, 11, n) # 0-10 games per library, ~5 on average
+    ids = rng.integers(0, games, int(sizes.sum())).astype(str)
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    libraries = ["[" + ", ".join(ids[bounds[i]:bounds[i + 1]]) + "]" for i in range(n)]
+    return pd.DataFrame({"playerid": np.arange(start, start + n), "library": libraries})
+
+
+def _prices(rng, start, n, total):
+    import pandas as pd
+    return pd.DataFrame({
+        "gameid": rng.integers(0, max(total // 3, 1), n), # ~3 price snapshots per game
+        "usd": rng.choice(PRICES, n),
+        "eur": rng.choice(PRICES, n),
+        "gbp": rng.choice(PRICES, n),
+        "jpy": rng.choice(["", "500", "1200", "7800"], n),
+        "rub": rng.choice(["", "299", "1999"], n),
+        "date_acquired": _dates(rng, n, "2023-01-01", 700),
+    })
+
+
+TABLES = {"games.csv": _games, "players.csv": _players, "purchased_games.csv": _purchases, "prices.csv": _prices}
+
+
+def generate(scale):
+    """Write the raw tables for `scale` (once) and return the data root to run against."""
+    import numpy as np
+
+    rows = SCALES[scale][0]
+    root = DATA_DIR / scale
+    marker = root / ".generated"
+    if marker.exists() and marker.read_text() == GENERATOR_VERSION:
+        return root
+    folder = root / "data_raw" / "steam"
+    folder.mkdir(parents=True, exist_ok=True)
+    for seed, (name, make) in enumerate(TABLES.items()):
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        tmp = folder / (name + ".tmp")
+        for offset in range(0, rows, GEN_CHUNK):
+            chunk = make(rng, offset, min(GEN_CHUNK, rows - offset), rows)
+            chunk.to_csv(tmp, mode="a" if offset else "w", header=offset == 0, index=False)
+        tmp.replace(folder / name)
+        print(f"  ✔ generated {scale}/{name} ({rows} rows, {time.perf_counter() - started:.1f}s)")
+    marker.write_text(GENERATOR_VERSION)
+    return root
+
+
+''' ===== BENCHMARKS ===== '''
+
+# Each benchmark returns (prepare, run, rows): prepare() builds fresh arguments (not timed), run(*args) is timed.
+
+def _raw(name):
+    from gma.raw_csv import raw_file, read_raw_csv
+    return read_raw_csv(raw_file("steam", name))
+
+
+def _games_safe_literal_eval():
+    from gma.clean_games import normalize_list_field
+    genres = _raw("games.csv")["genres"]
+    return (lambda: (genres,)), normalize_list_field, len(genres)
+
+
+def _players_safe_literal_eval():
+    from gma.clean_players import safe_literal_eval
+    library = _raw("purchased_games.csv")["library"]
+    return (lambda: (library,)), (lambda s: s.apply(safe_literal_eval)), len(library)
+
+
+def _parse_dates():
+    from gma.clean_games import parse_dates
+    games = _raw("games.csv")
+    return (lambda: (games.copy(), "release_date")), parse_dates, len(games)
+
+
+def _deduplicate_games():
+    from gma.clean_games import clean_rows, deduplicate_games
+    games = clean_rows(_raw("games.csv"), "steam", "Steam")
+    return (lambda: (games.copy(),)), deduplicate_games, len(games)
+
+
+def _clean_players():
+    from gma.artifacts import ArtifactWriter
+    from gma.clean_players import clean_players
+    rows = len(_raw("players.csv"))
+    return (lambda: ("steam", ArtifactWriter("off"))), clean_players, rows # includes reading players.csv
+
+
+def _clean_purchases():
+    from gma.artifacts import ArtifactWriter
+    from gma.clean_players import clean_purchases
+    rows = len(_raw("purchased_games.csv"))
+    return (lambda: ("steam", ArtifactWriter("off"))), clean_purchases, rows # includes reading purchased_games.csv
+
+
+def _clean_price_df():
+    from gma.clean_prices import clean_price_df
+    prices = _raw("prices.csv")
+    return (lambda: (prices.copy(), "Steam")), clean_price_df, len(prices)
+
+
+def _stage(module, *tables):
+    # full stage for the generated platform, CSV outputs included (written under the benchmark data root)
+    def setup():
+        from importlib import import_module
+        run = import_module(module).run
+        rows = sum(len(_raw(name)) for name in tables)
+        return (lambda: (["steam"],)), run, rows
+    return setup
+
+
+BENCHMARKS = {
+    "games.safe_literal_eval": _games_safe_literal_eval,
+    "players.safe_literal_eval": _players_safe_literal_eval,
+    "games.parse_dates": _parse_dates,
+    "games.deduplicate_games": _deduplicate_games,
+    "players.clean_players": _clean_players,
+    "players.clean_purchases": _clean_purchases,
+    "prices.clean_price_df": _clean_price_df,
+    "stage.clean-games": _stage("gma.clean_games", "games.csv"),
+    "stage.clean-players": _stage("gma.clean_players", "players.csv", "purchased_games.csv"),
+    "stage.clean-prices": _stage("gma.clean_prices", "prices.csv"),
+}
+
+
+def measure(name, repeat):
+    """Run one benchmark in this process; returns its result entry."""
+    try:
+        import resource # not available on Windows
+    except ImportError:
+        resource = None
+
+    prepare, run, rows = BENCHMARKS[name]()
+    timings = []
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet): # the stages print progress
+        for _ in range(repeat):
+            args = prepare()
+            start = time.perf_counter()
+            run(*args)
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        args = prepare()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+    seconds = min(timings)
+    entry = {
+        "rows": rows,
+        "seconds": round(seconds, 5),
+        "rows_per_s": round(rows / seconds) if seconds else None,
+        "peak_mb": round(peak / 1e6, 2),
+        "repeat": repeat,
+    }
+    if resource is not None:
+        entry["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1) # KB on Linux
+    return entry
+
+
+''' ===== SUITE / BASELINES ===== '''
+
+def host_info():
+    import pandas as pd
+    return {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+            "system": platform.system(), "cpus": os.cpu_count()}
+
+
+def run_suite(scale="10k", only=None, repeat=None):
+    """Run every benchmark (or those starting with one of the `only` prefixes) in a child process each."""
+    root = generate(scale)
+    repeat = repeat or SCALES[scale][1]
+    env = dict(os.environ, GMA_DATA_ROOT=str(root))
+    results = {}
+    for name in BENCHMARKS:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        done = subprocess.run([sys.executable, "-m", "gma.benchmarks", "_one", name, str(repeat)],
+                              cwd=PACKAGE_PARENT, env=env, capture_output=True, text=True)
+        if done.returncode != 0:
+            print(f"  ✘ {name}: failed\n{done.stderr.strip()}")
+            results[name] = {"error": done.stderr.strip().splitlines()[-1] if done.stderr.strip() else "failed"}
+            continue
+        results[name] = json.loads(done.stdout.strip().splitlines()[-1])
+        r = results[name]
+        print(f"  ✔ {name:<28} {r['seconds']:>9.4f}s  {r['rows_per_s'] or 0:>12,} rows/s  {r['peak_mb']:>9.1f} MB peak")
+    return {"scale": scale, "rows": SCALES[scale][0], "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "host": host_info(), "benchmarks": results}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Names of the benchmarks that regressed beyond `threshold` (prints one line per benchmark)."""
+    regressions = []
+    for name, now in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if "error" in now:
+            regressions.append(name)
+            continue
+        if not before or "error" in before:
+            print(f"  - {name}: no baseline")
+            continue
+        slower = (now["seconds"] > before["seconds"] * (1 + threshold)
+                  and now["seconds"] - before["seconds"] > MIN_SECONDS)
+        bigger = now["peak_mb"] > before["peak_mb"] * (1 + threshold) and now["peak_mb"] - before["peak_mb"] > MIN_MB
+        time_change = now["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        memory_change = now["peak_mb"] / before["peak_mb"] - 1 if before["peak_mb"] else 0.0
+        print(f"  {'✘' if slower or bigger else '✔'} {name:<28} time {time_change:+7.1%}  memory {memory_change:+7.1%}")
+        if slower or bigger:
+            regressions.append(name)
+    return regressions
+
+
+def _baseline_path(scale):
+    return BENCH_DIR / f"baseline_{scale}.json"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["_one"]: # child process: python -m gma.benchmarks _one <name> <repeat>
+        print(json.dumps(measure(argv[1], int(argv[2]))))
+        return 0
+
+    parser = argparse.ArgumentParser(prog="gma bench", description="benchmarks for the cleaning functions and stages")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in [("run", "run the benchmarks and write benchmarks/results_<scale>.json"),
+                               ("check", "run the benchmarks and fail on a regression against the baseline")]:
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("--scale", choices=list(SCALES), default="10k")
+        p.add_argument("--only", nargs="*", help="benchmark name prefixes, e.g. games. stage.")
+        p.add_argument("--repeat", type=int, help="timed runs per benchmark (fastest is kept)")
+        if command == "run":
+            p.add_argument("--save-baseline", action="store_true")
+        else:
+            p.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown / growth (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    baseline_path = _baseline_path(args.scale)
+    if args.command == "check" and not baseline_path.exists():
+        print(f"  ✘ no baseline at {baseline_path} (run `gma bench run --scale {args.scale} --save-baseline`)")
+        return 1
+
+    print(f"Benchmarks at scale {args.scale} ({SCALES[args.scale][0]:,} rows per table)")
+    results = run_suite(args.scale, args.only, args.repeat)
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    (BENCH_DIR / f"results_{args.scale}.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    failed = [name for name, r in results["benchmarks"].items() if "error" in r]
+
+    if args.command == "run":
+        if args.save_baseline and not failed:
+            baseline_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+            print(f"  ✔ saved baseline {baseline_path.relative_to(REPO_ROOT)}")
+        return 1 if failed else 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    print(f"\nCompared with {baseline_path.name} ({baseline['created']}):")
+    if baseline["host"] != results["host"]:
+        print(f"  WARNING: baseline was recorded on {baseline['host']} - timings may not be comparable")
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        regressions = compare(results, baseline, args.threshold)
+    if regressions: # one more try for each, keeping the better run - a single slow run is often just noise
+        again = run_suite(args.scale, regressions, args.repeat)["benchmarks"]
+        for name in regressions:
+            if "error" not in again.get(name, {"error": ""}) and "error" not in results["benchmarks"][name]:
+                now, retry = results["benchmarks"][name], again[name]
+                results["benchmarks"][name] = min(now, retry, key=lambda r: (r["seconds"], r["peak_mb"]))
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+"""
+Module Name: build_database.py
+Purpose:
+    Build a SQLite relational database from cleaned data (stage "build-db",
+    run by 05_build_sql_database.py or `gma run build-db`).
+    Tasks include:
+        - creating tables: games, players, purchases, prices
+        - defining primary keys and foreign keys
+        - inserting cleaned data into SQLite
+        - generating games_analytics.db for SQL-based analysis
+        - indexing game titles (game_titles, games_fts - see gma/titles.py)
+
+Dataset:
+    Input:   data_clean/games_master.csv
+             data_clean/players_master.csv
+             data_clean/purchases_master.csv
+             data_clean/prices_master_latest.csv
+             (or the same tables passed in memory by an earlier stage)
+
+Output:
+    database/games_analytics.db
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Uses sqlite3 to establish relational structure.
+    - Produces the database consumed by Modules 8+ for SQL analytics.
+    - Ensures referential integrity between players, games, and purchases.
+    - The four tables are dropped and recreated on every run, so rebuilding
+      no longer appends duplicate rows (population, loaded by the
+      load-population stage, is left in place).
+    - With a memory budget (gma/spill.py), tables read from data_clean/ that
+      would not fit are inserted chunk by chunk.
+"""
+
+
+import sqlite3
+import pandas as pd
+
+from gma.artifacts import CSV_DATE_FORMAT
+from gma.paths import CLEAN_DIR, DB_DIR, DB_PATH
+from gma.spill import MemoryBudget, read_csv_chunks
+from gma.titles import build_title_index
+
+# table name -> cleaned CSV it is loaded from when no DataFrame is handed over
+SOURCES = {
+    "games": "games_master.csv",
+    "players": "players_master.csv",
+    "purchases": "purchases_master.csv",
+    "prices": "prices_master_latest.csv",
+}
+
+
+def load_clean_tables(tables=None, budget=None):
+    """
+    Return {table: DataFrame}, reading data_clean/ only for tables not already in memory.
+    A CSV that would not fit the memory budget comes back as an iterator of chunks instead.
+    """
+    tables = dict(tables or {})
+    budget = budget or MemoryBudget()
+    for name, file_name in SOURCES.items():
+        if tables.get(name) is None:
+            path = CLEAN_DIR / file_name
+            if budget.limit is not None:
+                size, row_bytes = budget.estimate_csv(path)
+                if budget.spills(size, file_name):
+                    tables[name] = read_csv_chunks(path, budget.chunk_rows(row_bytes))
+                    continue
+            tables[name] = pd.read_csv(path)
+        else:
+            tables[name] = sql_values(tables[name])
+    return tables
+
+
+def sql_values(df):
+    """
+    Prepare an in-memory frame for to_sql without a CSV round trip.
+    Integer columns keep their type (a CSV re-read turns Int64 with missing
+    values into float, stored as REAL). Dates are stored as the same text a
+    data_clean/ round trip gives (gma.artifacts.CSV_DATE_FORMAT), which is
+    what the sql/ queries expect. Arrow tables are accepted too.
+    """
+    if hasattr(df, "to_pandas"): # pyarrow.Table
+        df = df.to_pandas()
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object and values.map(lambda v: isinstance(v, pd.Timestamp)).any():
+            df[col] = values.map(lambda v: str(v) if isinstance(v, pd.Timestamp) else v)
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            df[col] = values.dt.strftime(CSV_DATE_FORMAT).where(values.notna(), None)
+    return df
+
+
+def create_schema(cursor):
+    for table in SOURCES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}") # rebuild from scratch - re-running must not duplicate rows
+
+    #the following uses SQL language which will be skipped over in python to avoid confusing the code.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS games (
+        gameid INTEGER,
+        platform TEXT,
+        platform_raw TEXT,
+        title TEXT,
+        developers TEXT,
+        publishers TEXT,
+        genres TEXT,
+        supported_languages TEXT,
+        release_date TEXT,
+        release_date_year INTEGER,
+        release_date_month INTEGER,
+        release_date_quarter INTEGER,
+        PRIMARY KEY (gameid, platform)
+    );
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS players (
+        playerid INTEGER PRIMARY KEY,
+        platform TEXT,
+        nickname TEXT,
+        country TEXT,
+        created_date TEXT
+    );
+    """)
+    # FOREIGN KEY () REFERENCES _ -> constraint that links this table to the primary key columns in the players and games tables.
+    ## This ensures that you cannot record a purchase for a gameid that doesn't actually exist in the games table.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS purchases (
+        playerid INTEGER,
+        gameid INTEGER,
+        platform TEXT,
+        FOREIGN KEY (playerid) REFERENCES players(playerid),
+        FOREIGN KEY (gameid) REFERENCES games(gameid)
+    );
+    """)
+
+    # usd REAL -> Defines the columns for currency prices. In SQLite, REAL is used to store floats.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS prices (
+        gameid INTEGER,
+        platform TEXT,
+        usd REAL,
+        eur REAL,
+        gbp REAL,
+        jpy REAL,
+        rub REAL,
+        date_acquired TEXT,
+        FOREIGN KEY (gameid) REFERENCES games(gameid)
+    );
+    """)
+
+
+def build(tables=None, db_path=DB_PATH, budget=None):
+    """
+    Build games_analytics.db. `tables` may hold in-memory DataFrames for
+    games / players / purchases / prices; anything missing is read from data_clean/
+    (in chunks when it would not fit `budget`, a gma.spill.MemoryBudget).
+    """
+    DB_DIR.mkdir(exist_ok=True)
+    tables = load_clean_tables(tables, budget)
+
+    conn = sqlite3.connect(db_path) # establishes the 'door' through which python writes data to SQL.
+
+    # WAL journal mode is stored in the database file - lets the read-only query service (gma/query_service.py)
+    ## keep serving while the database is being rebuilt.
+    conn.execute("PRAGMA journal_mode=WAL")
+
+    cursor = conn.cursor() # cursor -> essentially the 'tool' used to send SQL queries through the 'door' (conn) and retrieve results.
+    create_schema(cursor)
+
+    # Tells the database connection to finalize and save all the changes (the table creation commands) made by the cursor.
+    conn.commit()
+
+    for name in SOURCES:
+        # inserts each data frame (or each chunk of a spilled table) into the table of the same name.
+        chunks = [tables[name]] if isinstance(tables[name], pd.DataFrame) else tables[name]
+        rows = 0
+        for chunk in chunks:
+            chunk.to_sql(name, conn, if_exists="append", index=False)
+            rows += len(chunk)
+        print(f"  ✔ {name}: {rows} rows")
+
+    # normalised title key + FTS5 index for title search / cross-platform matching (gma/titles.py)
+    print(f"  ✔ game_titles / games_fts: {build_title_index(conn)} titles")
+
+    # Terminates the connection to the SQLite database file.
+    conn.close()
+    print(f"Database saved to: {db_path}")
+    return db_path
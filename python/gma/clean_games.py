@@ -0,0 +1,368 @@
+"""
+Module Name: clean_games.py
+Purpose:
+    Clean and standardise games.csv for each platform and merge them into a
+    unified master dataset (stage "clean-games", run by 02_clean_games.py or
+    `gma run clean-games`). Tasks include:
+        - parsing list-like fields (developers, publishers, genres, languages)
+        - converting release_date to datetime
+        - extracting year, month, quarter (as whole numbers, quarter 1-4)
+        - deduplicating by gameid and platform
+        - normalising missing values
+        - saving per-platform and master cleaned files
+
+Dataset:
+    Input:   data_raw/<platform>/games.csv (or .csv.gz / .csv.zst - see gma/raw_csv.py)
+    Output:  data_clean/games_<platform>_clean.csv
+             data_clean/games_master.csv
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Ensures consistent schema across PS, Steam, and Xbox.
+    - Provides the base table required for pricing, purchases, and SQL analysis.
+    - run() returns games_master so later stages can use it without re-reading the CSV.
+"""
+
+
+import os # file path handling.
+import ast # safely convert strings that look like Python lists into real lists.
+import pandas as pd # main data analysis library.
+from gma.artifacts import ArtifactWriter
+from gma.dates import DateParser, date_parts # format detected once, each distinct date string parsed once
+from gma.dedup import latest_per_key # hash-based "latest row per key" (no full sort) - see gma/dedup.py
+from gma.paths import CLEAN_DIR
+from gma.raw_csv import raw_file, read_header, read_raw_csv # plain or compressed raw files
+from gma.spill import (MemoryBudget, SpilledFrame, combined_template, concat_chunks,
+                       external_latest_per_key, read_csv_chunks, write_csv)
+
+''' ===== CONFIGURATION ===== '''
+
+#'PLATFORMS' -> A python 'dictionary', which stores key value pairs to map the lowercase foldernames to capitalised display names.
+PLATFORMS = {
+    "playstation": "PlayStation",
+    "steam": "Steam",
+    "xbox": "Xbox"
+}
+# 'TABLE_NAME' -> String variable that holds the name of the specified file.
+# cleaner than hard coding in the file path - as the file name can be swapped out easily if needed.
+TABLE_NAME = "games.csv"
+
+
+''' ===== HELPER FUNCTIONS | Creating Functions to call later in the Main script ====== '''
+
+''' Attempt to convert string like "['A','B']" into a Python list '''
+
+# # If conversion fails or value is NaN/empty, return None.
+#'def' -> marks the begining of a function
+## 'safe_literal_eval' -> function - reusable block of code that performs a specific task.
+def safe_literal_eval(val):
+    if pd.isna(val): # Checks if the value is a Pandas Not a Number (NaN) value (i.e., missing data).
+        return None # If it's missing, the function immediately returns None to indicate no data.
+    if isinstance(val, list): # Checks if the value is already a list.
+        return val # If the data is already clean, it's returned immediately without processing.
+    if isinstance(val,str):
+        val = val.strip() # Removes any leading or trailing whitespace from the string.
+        if val == "" or val.lower() in ["nan", "none", "[]", "na", "n/a"]:
+            return None # Checks for empty or missing string data (e.g."nan", "none", or "[]").
+        
+        try: # securely parses a string that contains a valid Python literal structure (e.g. a list)
+            parsed = ast.literal_eval(val) #safer than python's eval() function - literal_eval only evaluates data structures & prevents execution of arbitrary / potentially malicious code.
+            if isinstance(parsed, (str, int, float)):
+                return [str(parsed)] # If 'parsed' is a single non-list value - it is wrapped in a list and converted to a string.
+            if isinstance(parsed, (tuple, set)):
+                return list(parsed) # If 'parsed' is a tuple or set (similar to lists), then convert to a standard python list.
+            return parsed # If 'parsed' is a list or a dictionary, return as is.
+        
+        except Exception:
+            # sometimes the list is like "['A', 'B']" but with unicode quotes or as a plain string
+            # fallback: try to split on commas
+            try:
+                cleaned = val.strip("[] ") # removes any surrounding square brackets and any extra spaces.
+                if cleaned == "":
+                    return None
+                # breaks the string into individual parts based on the comma delimiter.
+                ## uses a list comprehension to iterate through those parts, removes lingering quotes & spaces / ensuring empty parts are skipped.
+                parts = [p.strip().strip("'\" ") for p in cleaned.split(",") if p.strip() != ""]
+                return parts if parts else None
+            except Exception:
+                return None
+    return None
+
+''' Apply safe_literal_eval and then join lists to a canonical string for CSV storage. '''
+
+def normalize_list_field(series): #'series' -> pandas series - a single column from a data frame.
+    # 'series.apply' -> Takes the function 'safe_literal_eval' as an argument and executes it on every single value in the series (column).
+    return series.apply(safe_literal_eval)
+
+"""Parse a date-like column into datetime; return original col if parsing fails."""
+
+def parse_dates(df, col, parse=None): 
+    
+    if col not in df.columns: # checks if the specified column name actually exists in the data frame.
+        return df # If the column is missing, the function immediately returns the original DataFrame without doing anything.
+    
+    # 'DateParser()' -> same result as pd.to_datetime(errors='coerce'): values that cannot be parsed become NaT (Not a Time/Date),
+    ## but the date format is detected once from the first value and each distinct date string is only converted once.
+    ### parse -> optional parser passed in by the caller (the spilled path keeps one parser, so one format, across chunks).
+    parse = parse if parse is not None else DateParser()
+    df[col] = parse(df[col])
+    # Add convenience columns if parsing succeeded
+    ## date_parts -> adds 'release_date'_year, 'release_date'_month and 'release_date'_quarter (1-4) as small whole-number columns.
+    df = date_parts(df, col)
+    return df # Returns the modified data frame, which now has the date column corrected and new feature columns added.
+
+'''Deduplicate by gameid if available, otherwise by title+platform'''
+
+def deduplicate_games(df):
+   
+    if "gameid" in df.columns: #checks if a column called 'gameid' exists in the data frame.
+        before = len(df) # stores the number of rows in the data frame before deduplication as 'before' to help track data quality changes
+        # keeps the most recent instance (latest release_date) of each gameid.
+        ## latest_per_key -> groups rows by gameid with a hash table instead of sorting the whole table first.
+        ### ties="first" -> if two rows share the latest date, the one that appears first in the file is kept (same as the old sort + keep="first").
+        #### missing="oldest" -> a missing release_date never beats a real one (same as the old sort, which put NaT last).
+        df = latest_per_key(df, ["gameid"], "release_date", ties="first", missing="oldest")
+        after = len(df) # stores the number of rows in the data frame after duplicatoin as 'after'.
+        print(f"Deduplicated by gameid: {before} -> {after}")
+    else:
+        before = len(df)
+        df = latest_per_key(df, ["title", "platform"], "release_date", ties="first", missing="oldest")
+        after = len(df)
+        print(f"Deduplicated by title+platform: {before} -> {after}")
+    return df
+
+
+''' ===== STAGE FUNCTIONS ====== '''
+
+''' Row-by-row cleaning of a games table (everything except deduplication) - shared by the in-memory and spilled paths. '''
+
+def clean_rows(df, key, pretty, parse=None):
+     # Standardize column names (strip whitespace)
+    df.columns = [c.strip() for c in df.columns] # removes any leading or trailing whitespace from all column names - ensures consistency.
+
+     # Add platform identifier
+    df["platform_raw"] = key # stores the short / raw name.
+    df["platform"] = pretty # stores the 'pretty' / new / user facing name.
+
+     # Parse release_date
+    df = parse_dates(df, "release_date", parse) # calls the parse_dates helper function created to attempt to convert the specified column to datetime format.
+
+     # Convert list-like string fields into python lists
+    for col in ["developers", "publishers", "genres", "supported_languages"]:
+        if col in df.columns:
+            df[col] = normalize_list_field(df[col]) # calls the normalize_list_field helper function to convert data to python lists
+        else:
+            df[col] = None # if one of the specified columns is missing - adds a column and fills it with 'None' to keep structure consistent accross all platforms.
+
+      # Normalize text fields: title -> strip whitespace
+    if "title" in df.columns:
+        df["title"] = df["title"].astype(str).str.strip() # ensures the 'title' column is treated as a string and removes extra spaces.
+        # '.astype(str)' -> converts every single value in the column into a string.
+        ## '.str' -> speccial pandas accessor that tells the program to apply standard python string method to every entry in the column.
+        ### .strip() -> text operation that removes any leading or trailing whitespaces from the text.
+        #### df["title"] = -> assigns the cleaned result back into the original "title" column of the data frame overwriting the messy data.
+
+        # Fill missing textual fields with 'Unknown' where appropriate
+    for col in ["developers", "publishers", "genres", "supported_languages"]: # initiates a loop - the value of 'col' = each item in turn.
+        # keep None for lists; we will represent None as empty lists for consistency
+        df[col] = df[col].apply(lambda x: x if x is not None else []) 
+        # lambda -> takes a single input, performs a simple calcuation, then returns a result.
+        ##  lambda x -> defintes the input variable 'x'. When appl() runs, x will be the value of a single cell (e.g.the cell with list of developer names for a single title)
+        ### x if x is not None -> if the cell value (x) is not None (e.g. already contains a list, even an empty one), return the value (x) as it is.
+        #### else [] -> if the cell value (x) is None (meaning it was a missing value), return an empty list ([]).
+    
+     # Ensure gameid exists and is integer (coerce)
+    if "gameid" in df.columns: # does the current data frame have a column with the exact name 'game_id'?
+        df["gameid"] = pd.to_numeric(df["gameid"], errors="coerce").astype("Int64")
+        # df["gameid"] = -> replaces the entire columns data with the results of the script
+        ## pd.to_numeric() -> pandas function designed to convert data into a numeric type (like an int or float).
+        ### errors="coerce" -> if value that can't be converted to number - coerce that number into a missing value (NaN/NaT).
+        #### .astype("Int64") - > after the data has been converted to numners, changes the column type to Int64 (pandas).
+
+    return df
+
+
+''' Clean one platform's games.csv and save it; returns the master-table columns (or None if the file is missing). '''
+
+def clean_platform(key, pretty, writer):
+    raw_path = raw_file(key, TABLE_NAME) #  creates a path to the raw data file, then the platform, then the file name (which was all set above)
+    print(f"\nProcessing platform: {pretty} — file: {raw_path}")
+    if not os.path.exists(raw_path): # checks if the file exists.
+        print(f"  WARNING: file not found: {raw_path} — skipping platform.") # If the file is missing, prints a warning.
+        return None # Returns nothing so the caller moves on to the next platform and skips processing any more of the steps below.
+
+     # Load
+    df = read_raw_csv(raw_path) # data is in the 'raw-path' location is loaded from the .csv into a pandas data frame (df).
+    print(f"  Loaded {len(df)} rows, columns: {list(df.columns)}") # Prints the number of rows loaded and the list of column names.
+
+    df = clean_rows(df, key, pretty)
+
+     # Deduplicate
+    df = deduplicate_games(df)   # calls the deduplicate helper function above to remove duplicate game entries.
+
+     # Save cleaned per-platform CSV (lists stored as JSON-like strings to keep readability)
+    out_path = os.path.join(CLEAN_DIR, f"games_{key}_clean.csv")
+    # out_path = -> Variable name
+    ## os.path.join(...) -> (operating system) od module's 'join' function - combine folder names to create a pathway.
+    ### (CLEAN_DIR, f"games_{key}_clean.csv") -> CLEAN_DIR = pathway set at config to the clean data folder, key = current platform in the loop's short name.
+     
+     # Convert lists to JSON-like strings for storage so Excel/SQLite imports can parse if needed
+    df_to_save = df.copy() # new data frame (df_to_save) is created as a copy of the main, cleaned data frame (df).
+    for col in ["developers", "publishers", "genres", "supported_languages"]: # loops through the columns that contain lists.
+        df_to_save[col] = df_to_save[col].apply(lambda lst: f"{lst}" if lst is not None else "[]")
+        # lambda function - process every list (1st) in the column. IF value is a list (or anything else), and IS NOT 'None', convert that list into a string using an f-string (f"{lst}").
+        ## else [] - if it IS 'None', ensures that the value is the string '[]'.
+    writer.write(df_to_save, out_path) # saves the data frame to the file path created earlier - index=False, ensures internal row numbers (data frame index numbers) are not saved as an extra column.
+    print(f"  Saved cleaned file to: {out_path} ({len(df_to_save)} rows)") # Reports total no. of rows saved in the new deduplicated file.
+
+    # Select canonical columns for master table
+    canonical_cols = ["gameid", "platform", "platform_raw", "title", # creates a list (canonical_cols) with standardised list of column names.
+                      "developers", "publishers", "genres", "supported_languages",
+                      "release_date", "release_date_year", "release_date_month", "release_date_quarter"]
+    # Some platforms may not have gameid — keep what's available
+    existing = [c for c in canonical_cols if c in df.columns] # creates a new list (existing) containing only the columns that are currently present in the data frame.
+    master = df[existing].copy() # creates a new data frame copy which only uses the columns listed in 'existing'.
+    return master
+
+
+''' Combine the per-platform tables into games_master.csv '''
+
+def build_master(master_dfs, writer):
+    games_master = pd.concat(master_dfs, ignore_index=True, sort=False) 
+    # games_master = pd.concat -> concatenate's all of the data frames into one data frame called 'games_master'.
+    ## ignore_index=True -> This tells pandas to create a brand new, continuous set of row numbers (the index) for the new combined table.
+    ### sort=False -> tells pandas not to sort the data alphabetically to speed up the processing time.
+    games_master = finish_master(games_master)
+
+    master_out = os.path.join(CLEAN_DIR, "games_master.csv") # creates the full file path for the final master file.
+    writer.write(games_master, master_out) # final, cleaned, and reordered DataFrame to the CSV file - prevents internal row numbering.
+    print(f"\nMaster games table saved to: {master_out} — rows: {len(games_master)}") # provides feedback to the user confirming the path and final row count.
+    return games_master
+
+
+''' Final column set / order of games_master (works on the whole table or on one block of it) '''
+
+def finish_master(games_master):
+    # Ensure consistent columns exist
+    for col in ["gameid", "platform", "title"]: # iterates through the absolute essential identifiers:(gameid), (platform), (title).
+        if col not in games_master.columns: # Checks that the critical column exists in the combined master table.
+            games_master[col] = pd.NA # If the column is missing, creates that column in the master table and fills every row with pd.NA (pandas for 'not available').
+
+    # Optionally reorder columns
+    col_order = ["gameid", "platform", "platform_raw", "title", # list that represents the ideal final order of columns.
+                 "developers", "publishers", "genres", "supported_languages",
+                 "release_date", "release_date_year", "release_date_month", "release_date_quarter"]
+    existing_order = [c for c in col_order if c in games_master.columns] # creates an ordered list which contains only the columns that actually exist in the data frame.
+    games_master = games_master[existing_order].copy() # uses the 'existing order' list to select the columns to passed to the data frame in the order specified.
+
+    # store list columns as strings for CSV
+    for col in ["developers", "publishers", "genres", "supported_languages"]: # iterates through the list-containing columns.
+        if col in games_master.columns: # ensures the columnn exists in the master table before attempting to modify it.
+            games_master[col] = games_master[col].apply(lambda lst: f"{lst}" if lst is not None else "[]")
+            #lambda function applised to every value in the column: 
+            # # converts the Python list object back into its string representation (necessary because CSV can only store plain text).
+    return games_master
+
+
+''' ===== SPILLED PATH: used when the games tables do not fit the memory budget (see gma/spill.py) ===== '''
+
+def clean_platform_spilled(key, pretty, budget, scratch):
+    """
+    clean_platform() for a games.csv that does not fit in memory: reads it in
+    chunks, deduplicates on disk and writes games_<platform>_clean.csv block
+    by block. Returns a SpilledFrame of the master-table columns.
+    """
+    raw_path = raw_file(key, TABLE_NAME)
+    print(f"\nProcessing platform: {pretty} — file: {raw_path} (spilling to disk)")
+    if not os.path.exists(raw_path):
+        print(f"  WARNING: file not found: {raw_path} — skipping platform.")
+        return None
+
+    _, row_bytes = budget.estimate_csv(raw_path)
+    rows = budget.chunk_rows(row_bytes)
+    columns = [c.strip() for c in read_header(raw_path)]
+    keys = ["gameid"] if "gameid" in columns else ["title", "platform"]
+    parse = DateParser() # one release_date format for the whole file, as a whole-file to_datetime would pick
+    loaded = []
+
+    def cleaned_chunks():
+        for chunk in read_csv_chunks(raw_path, rows):
+            loaded.append(len(chunk))
+            yield clean_rows(chunk, key, pretty, parse)
+
+    clean = SpilledFrame(os.path.join(scratch, f"games_{key}.pkl"))
+    for block in external_latest_per_key(cleaned_chunks(), keys, "release_date", scratch, rows,
+                                         ties="first", missing="oldest"):
+        clean.append(block)
+    clean.close()
+    print(f"  Loaded {sum(loaded)} rows in chunks of {rows}, columns: {columns}")
+    print(f"Deduplicated by {'+'.join(keys)}: {sum(loaded)} -> {len(clean)}")
+
+    canonical_cols = ["gameid", "platform", "platform_raw", "title",
+                      "developers", "publishers", "genres", "supported_languages",
+                      "release_date", "release_date_year", "release_date_month", "release_date_quarter"]
+    template = clean.template()
+    existing = [c for c in canonical_cols if c in template.columns]
+    master = SpilledFrame(os.path.join(scratch, f"games_{key}_master.pkl"))
+
+    def saved_blocks(blocks):
+        for block in blocks:
+            master.append(block[existing])
+            yield lists_as_text(block)
+
+    out_path = os.path.join(CLEAN_DIR, f"games_{key}_clean.csv")
+    write_csv(saved_blocks(clean.chunks(template)), out_path, lists_as_text(template))
+    master.close()
+    print(f"  Saved cleaned file to: {out_path} ({len(clean)} rows)")
+    return master
+
+
+def lists_as_text(df):
+    df = df.copy()
+    for col in ["developers", "publishers", "genres", "supported_languages"]:
+        df[col] = df[col].apply(lambda lst: f"{lst}" if lst is not None else "[]")
+    return df
+
+
+def run_spilled(selected, budget):
+    """The clean-games stage with every table on disk; games_master.csv is written block by block."""
+    with budget.scratch() as scratch:
+        parts = [clean_platform_spilled(key, PLATFORMS[key], budget, scratch) for key in selected]
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            print("No platform data processed — master table not created.")
+            return None
+        template = finish_master(combined_template([s for part in parts for s in part.samples]))
+        master_out = os.path.join(CLEAN_DIR, "games_master.csv")
+        rows = write_csv((finish_master(block) for block in concat_chunks(parts)), master_out, template)
+    print(f"\nMaster games table saved to: {master_out} — rows: {rows}")
+    return None
+
+
+def run(platforms=None, writer=None, budget=None):
+    """
+    Run the clean-games stage for the given platform keys (default: all) and return games_master.
+    `writer` (gma.artifacts.ArtifactWriter) decides how the CSVs are written; default: immediately.
+    `budget` (gma.spill.MemoryBudget): when the games tables would not fit, the stage runs on disk,
+    writes the CSVs directly and returns None (games_master.csv is then read from data_clean/).
+    """
+    writer = writer or ArtifactWriter()
+    budget = budget or MemoryBudget()
+    os.makedirs(CLEAN_DIR, exist_ok=True) # creates data_clean/ if it doesn't exist yet.
+    selected = platforms or list(PLATFORMS)
+    raw_paths = [raw_file(key, TABLE_NAME) for key in selected]
+    if budget.limit is not None and budget.spills(
+            sum(budget.estimate_csv(path)[0] for path in raw_paths if os.path.exists(path)), "games"):
+        return run_spilled(selected, budget)
+    master_dfs = [] # list which temporarily holdes the cleaned data frame created for each gaming platform before they are combined
+    for key in selected:
+        master = clean_platform(key, PLATFORMS[key], writer)
+        if master is not None:
+            master_dfs.append(master)
+
+    if not master_dfs:
+        print("No platform data processed — master table not created.")
+        # Informs the user that the stage finished, but no master file could be created because no data was available to process.
+        return None
+    return build_master(master_dfs, writer)
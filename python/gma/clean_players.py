@@ -0,0 +1,224 @@
+"""
+Module Name: clean_players.py
+Purpose:
+    Clean and merge players.csv and purchased_games.csv across platforms
+    (stage "clean-players", run by 03_clean_players_and_purchases.py or
+    `gma run clean-players`). Tasks include:
+        - validating player IDs
+        - normalising country fields
+        - expanding purchase lists into 1 row per purchase
+        - tagging records with platform
+        - building unified players_master and purchases_master datasets
+
+Dataset:
+    Input:   data_raw/<platform>/players.csv
+             data_raw/<platform>/purchased_games.csv
+             (either may be .csv.gz / .csv.zst - see gma/raw_csv.py)
+    Output:  data_clean/players_<platform>.csv, data_clean/purchases_<platform>.csv
+             data_clean/players_master.csv
+             data_clean/purchases_master.csv
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Creates clean relational tables ready for SQL foreign keys.
+    - Ensures consistent schemas across platforms.
+    - Purchase expansion supports accurate player value analysis.
+    - run() returns (players_master, purchases_master) for in-process chaining,
+      or (None, None) when it ran on disk under a memory budget (gma/spill.py).
+"""
+
+
+import os
+import ast
+import pandas as pd
+
+from gma.artifacts import ArtifactWriter
+from gma.dates import DateParser
+from gma.paths import CLEAN_DIR
+from gma.raw_csv import raw_file, read_raw_csv
+from gma.spill import (MemoryBudget, SpilledFrame, combined_template, concat_chunks,
+                       external_drop_duplicates, read_csv_chunks, write_csv)
+
+PLATFORMS = ["playstation", "steam", "xbox"]
+
+
+''' ===== SAFE PARSER FOR LIST FIELDS ===== '''
+
+def safe_literal_eval(value):
+# Convert a string like "[1, 2, 3]" into a real Python list.
+#Handles None, empty strings, invalid formats.
+
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str):
+        return []
+    val = value.replace("“", "\"").replace("”", "\"").replace("'", "\"")
+    try:
+        return ast.literal_eval(val)
+    except:
+        return []
+
+''' ===== CLEAN PLAYERS FOR ONE PLATFORM ===== '''
+
+def clean_players(platform, writer):
+    raw_path = raw_file(platform, "players.csv")
+    df = player_rows(read_raw_csv(raw_path), platform)
+
+    # Deduplicate if needed
+    df = df.drop_duplicates(subset=["playerid", "platform"], keep="first")
+
+    # Save cleaned player table
+    out_path = os.path.join(CLEAN_DIR, f"players_{platform}.csv")
+    writer.write(df, out_path)
+    print(f"  ✔ saved players_{platform}.csv")
+    return df
+
+
+def player_rows(df, platform, parse=None):
+# Per-row part of clean_players (everything but the dedup) - also used on chunks by the spilled path.
+# parse -> optional date parser for Steam's "created" column (gma.dates.DateParser, kept across chunks by the spilled path).
+
+    if platform == "playstation":
+        df["platform"] = "PlayStation"
+        df["created_date"] = None
+
+    elif platform == "steam":
+        df["platform"] = "Steam"
+        df["created_date"] = (parse if parse is not None else DateParser())(df["created"])
+        df.drop(columns=["created"], inplace=True)
+        df["nickname"] = None
+
+    elif platform == "xbox":
+        df["platform"] = "Xbox"
+        df["country"] = None
+        df["created_date"] = None
+
+    return df[["playerid", "platform", "nickname", "country", "created_date"]]
+
+''' ===== CLEAN PURCHASED GAMES FOR ONE PLATFORM ===== '''
+
+def clean_purchases(platform, writer):
+    raw_path = raw_file(platform, "purchased_games.csv")
+    df_exploded = purchase_rows(read_raw_csv(raw_path), platform)
+
+    out_path = os.path.join(CLEAN_DIR, f"purchases_{platform}.csv")
+    writer.write(df_exploded, out_path)
+    print(f"  ✔ saved purchases_{platform}.csv")
+
+    return df_exploded
+
+
+def purchase_rows(df, platform):
+# Library lists -> one row per purchase. Row by row, so the spilled path can run it on chunks.
+
+    # Normalize library field
+    df["library"] = df["library"].apply(safe_literal_eval)
+
+    # EXPLODE: one row per purchased game
+    df_exploded = df.explode("library") # explode - takes a single cell with a list/array and seperates each list member as a seperate cell.
+    df_exploded = df_exploded.rename(columns={"library": "gameid"}) # replaces old column name 'library' with 'gameid'.
+
+    # Remove rows where gameid is missing
+    df_exploded = df_exploded[df_exploded["gameid"].notna()]
+    # checks every item in the gameid column and returns a bool value of true if the value is NOT A NaN and drops any that are false.
+
+    df_exploded["platform"] = platform.capitalize() # capitalises the first letter of the text in the cell.
+
+    # Ensure gameid is integer
+    df_exploded["gameid"] = df_exploded["gameid"].astype("Int64")
+
+    # Final order
+    return df_exploded[["playerid", "gameid", "platform"]]
+
+
+''' ===== SPILLED PATH: used when the tables do not fit the memory budget (see gma/spill.py) ===== '''
+
+def estimate_bytes(platforms, budget):
+    total = 0
+    for plat in platforms:
+        total += budget.estimate_csv(raw_file(plat, "players.csv"))[0]
+        total += budget.estimate_csv(raw_file(plat, "purchased_games.csv"),
+                                     lambda sample: purchase_rows(sample, plat))[0]
+    return total
+
+
+def clean_platform_spilled(platform, budget, scratch):
+    """
+    clean_players() + clean_purchases() for tables that do not fit in memory:
+    chunked reads, chunked explode, players deduplicated on disk. Returns
+    (players, purchases) as SpilledFrames.
+    """
+    raw_path = raw_file(platform, "players.csv")
+    rows = budget.chunk_rows(budget.estimate_csv(raw_path)[1])
+    parse = DateParser()
+    chunks = (player_rows(chunk, platform, parse) for chunk in read_csv_chunks(raw_path, rows))
+    players = SpilledFrame(os.path.join(scratch, f"players_{platform}.pkl"))
+    for block in external_drop_duplicates(chunks, ["playerid", "platform"], scratch, rows):
+        players.append(block)
+    players.close()
+    write_csv(players.chunks(), os.path.join(CLEAN_DIR, f"players_{platform}.csv"), players.template())
+    print(f"  ✔ saved players_{platform}.csv ({len(players)} rows, chunks of {rows})")
+
+    raw_path = raw_file(platform, "purchased_games.csv")
+    rows = budget.chunk_rows(budget.estimate_csv(raw_path, lambda sample: purchase_rows(sample, platform))[1])
+    purchases = SpilledFrame(os.path.join(scratch, f"purchases_{platform}.pkl"))
+    for chunk in read_csv_chunks(raw_path, rows):
+        purchases.append(purchase_rows(chunk, platform))
+    purchases.close()
+    write_csv(purchases.chunks(), os.path.join(CLEAN_DIR, f"purchases_{platform}.csv"), purchases.template())
+    print(f"  ✔ saved purchases_{platform}.csv ({len(purchases)} rows, chunks of {rows})")
+    return players, purchases
+
+
+def run_spilled(platforms, budget):
+    with budget.scratch() as scratch:
+        tables = [clean_platform_spilled(plat, budget, scratch) for plat in platforms]
+        for name, frames in [("players_master.csv", [t[0] for t in tables]),
+                             ("purchases_master.csv", [t[1] for t in tables])]:
+            template = combined_template([s for frame in frames for s in frame.samples])
+            write_csv(concat_chunks(frames), os.path.join(CLEAN_DIR, name), template)
+
+    print("\n✔ Master tables created:")
+    print("  players_master.csv")
+    print("  purchases_master.csv")
+    return None, None
+
+
+''' ===== STAGE ENTRY POINT ===== '''
+
+def run(platforms=None, writer=None, budget=None):
+    writer = writer or ArtifactWriter()
+    budget = budget or MemoryBudget()
+    os.makedirs(CLEAN_DIR, exist_ok=True) # if the folder already exists - move on and don't produce an error message.
+    if budget.limit is not None and budget.spills(estimate_bytes(platforms or PLATFORMS, budget), "players/purchases"):
+        # written straight to data_clean/ - later stages read the masters from there
+        print("\nCleaning PLAYERS and PURCHASES (spilling to disk)...")
+        return run_spilled(platforms or PLATFORMS, budget)
+    all_players = []
+    all_purchases = []
+
+    print("\nCleaning PLAYERS and PURCHASES...")
+
+    for plat in platforms or PLATFORMS:
+        print(f"\n--- Platform: {plat} ---")
+
+        players_df = clean_players(plat, writer)
+        purchases_df = clean_purchases(plat, writer)
+
+        all_players.append(players_df)
+        all_purchases.append(purchases_df)
+
+    # Combine per-platform CSVs into master tables
+    players_master = pd.concat(all_players, ignore_index=True)
+    purchases_master = pd.concat(all_purchases, ignore_index=True)
+
+    writer.write(players_master, os.path.join(CLEAN_DIR, "players_master.csv"))
+    writer.write(purchases_master, os.path.join(CLEAN_DIR, "purchases_master.csv"))
+
+    print("\n✔ Master tables created:")
+    print("  players_master.csv")
+    print("  purchases_master.csv")
+    return players_master, purchases_master
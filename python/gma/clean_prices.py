@@ -0,0 +1,206 @@
+"""
+Module Name: clean_prices.py
+Purpose:
+    Clean and merge prices.csv across all platforms to create a unified,
+    latest-acquired price table (stage "clean-prices", run by
+    04_clean_prices.py or `gma run clean-prices`). Tasks include:
+        - merging PlayStation, Steam, and Xbox price data
+        - removing invalid rows (missing gameid, no currency values)
+        - converting date_acquired to timestamp
+        - selecting the most recent price per game/platform
+        - normalising currency formats
+        - saving final cleaned prices dataset
+
+Dataset:
+    Input:   data_raw/<platform>/prices.csv (or .csv.gz / .csv.zst - see gma/raw_csv.py)
+    Output:  data_clean/prices_<platform>_clean.csv, data_clean/prices_<platform>_latest.csv
+             data_clean/prices_master_history.csv
+             data_clean/prices_master_latest.csv
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Provides currency data required for pricing, supply, and behaviour analysis.
+    - Designed to be beginner-friendly while maintaining analytical accuracy.
+    - run() returns (master_history, master_latest) for in-process chaining,
+      or (None, None) when it ran on disk under a memory budget (gma/spill.py).
+"""
+
+
+import os
+import pandas as pd
+from gma.artifacts import ArtifactWriter
+from gma.dates import DateParser
+from gma.dedup import latest_non_null_per_key
+from gma.paths import CLEAN_DIR
+from gma.raw_csv import raw_file, read_raw_csv
+from gma.spill import (MemoryBudget, SpilledFrame, combined_template, concat_chunks,
+                       external_latest_non_null_per_key, read_csv_chunks, write_csv)
+
+''' ===== CONFIG ===== '''
+
+PLATFORMS = {
+    "playstation": "PlayStation",
+    "steam": "Steam",
+    "xbox": "Xbox"
+}
+
+PRICE_COLS = ["usd", "eur", "gbp", "jpy", "rub"]  # expected numeric price columns
+INPUT_NAME = "prices.csv"
+
+''' ===== HELPER FUNCTION: Parse and Coerce price table ====='''
+
+def clean_price_df(df, platform_pretty):
+    """
+    - Coerce price columns to numeric (NaN where missing / invalid)
+    - Parse date_acquired => datetime
+    - Drop rows missing gameid
+    - Keep full cleaned history (returned, in input order)
+    - Also returns a 'latest' price per gameid (most recent date_acquired)
+    """
+    df = price_rows(df, platform_pretty)
+
+    # Latest price per gameid (keep the latest non-null record per currency ideally)
+    # Hash-groups by gameid and takes each column's most recent non-null value - same result as
+    # sorting by (gameid, date_acquired) and calling groupby().last(), without sorting the full history.
+    latest = latest_non_null_per_key(df, ["gameid"], "date_acquired", ties="last", missing="newest")
+    latest = latest.sort_values("gameid").reset_index(drop=True) # one row per game - cheap to order
+
+    return df, latest
+
+
+def price_rows(df, platform_pretty, parse=None):
+    """Row-by-row part of clean_price_df (the history rows); `parse` is an optional date_acquired parser."""
+    # Standardize column names
+    df.columns = [c.strip() for c in df.columns]
+
+    # Ensure gameid exists
+    if "gameid" not in df.columns:
+        raise ValueError("prices.csv missing 'gameid' column")
+
+    # Coerce price columns to numeric (if present)
+    for pc in PRICE_COLS:
+        if pc in df.columns:
+            df[pc] = pd.to_numeric(df[pc], errors="coerce")
+
+    # Parse date_acquired
+    if "date_acquired" in df.columns:
+        df["date_acquired"] = (parse if parse is not None else DateParser())(df["date_acquired"])
+    else:
+        df["date_acquired"] = pd.NaT
+
+    # Drop rows with missing gameid and convert gameid to whole number
+    df = df[df["gameid"].notna()].copy()
+    df["gameid"] = df["gameid"].astype("Int64")
+
+    # Add platform column
+    df["platform"] = platform_pretty
+    return df
+
+''' ===== SPILLED PATH: used when the price history does not fit the memory budget (see gma/spill.py) ===== '''
+
+def clean_platform_spilled(path, pretty, budget, scratch):
+    """clean_price_df() on a prices.csv read in chunks; returns (history, latest) as SpilledFrames."""
+    rows = budget.chunk_rows(budget.estimate_csv(path)[1])
+    parse = DateParser()
+    history = SpilledFrame(os.path.join(scratch, f"prices_{pretty}_history.pkl"))
+    for chunk in read_csv_chunks(path, rows):
+        history.append(price_rows(chunk, pretty, parse))
+    history.close()
+
+    # one row per game, in gameid order - the k-way merge by gameid gives the order the in-memory sort gives
+    latest = SpilledFrame(os.path.join(scratch, f"prices_{pretty}_latest.pkl"))
+    for block in external_latest_non_null_per_key(history.chunks(), ["gameid"], "date_acquired", scratch, rows,
+                                                  ties="last", missing="newest"):
+        latest.append(block)
+    latest.close()
+    return history, latest
+
+
+def run_spilled(platforms, budget):
+    histories, latests = [], []
+    with budget.scratch() as scratch:
+        for key in platforms:
+            pretty = PLATFORMS[key]
+            path = raw_file(key, INPUT_NAME)
+            print(f"Processing prices for: {pretty} — {path} (spilling to disk)")
+            if not os.path.exists(path):
+                print(f"  WARNING: file not found: {path}  (skipping)")
+                continue
+            history, latest = clean_platform_spilled(path, pretty, budget, scratch)
+            out_hist = os.path.join(CLEAN_DIR, f"prices_{key}_clean.csv")
+            write_csv(history.chunks(), out_hist, history.template())
+            print(f"  Saved cleaned history: {out_hist} ({len(history)} rows)")
+            out_latest = os.path.join(CLEAN_DIR, f"prices_{key}_latest.csv")
+            write_csv(latest.chunks(), out_latest, latest.template())
+            print(f"  Saved latest snapshot: {out_latest} ({len(latest)} rows)")
+            histories.append(history)
+            latests.append(latest)
+
+        # latest rows are unique per (gameid, platform) already - the in-memory drop_duplicates is a no-op
+        for name, frames in [("prices_master_history.csv", histories), ("prices_master_latest.csv", latests)]:
+            if frames:
+                template = combined_template([s for frame in frames for s in frame.samples])
+                write_csv(concat_chunks(frames), os.path.join(CLEAN_DIR, name), template)
+                print(f"Saved {name}")
+
+    print("\nPrice cleaning complete.")
+    return None, None
+
+''' ===== STAGE ENTRY POINT: process each platform, save outputs, and build masters ===== '''
+
+def run(platforms=None, writer=None, budget=None):
+    """
+    Run the clean-prices stage and return (master_history, master_latest) -
+    or (None, None) when the history does not fit `budget` and the stage runs on disk.
+    """
+    writer = writer or ArtifactWriter()
+    budget = budget or MemoryBudget()
+    os.makedirs(CLEAN_DIR, exist_ok=True)
+    paths = [raw_file(key, INPUT_NAME) for key in platforms or list(PLATFORMS)]
+    if budget.limit is not None and budget.spills(
+            sum(budget.estimate_csv(path)[0] for path in paths if os.path.exists(path)), "prices"):
+        return run_spilled(platforms or list(PLATFORMS), budget)
+    master_history = master_latest = None
+    history_tables = []
+    latest_tables = []
+
+    for key in platforms or list(PLATFORMS):
+        pretty = PLATFORMS[key]
+        path = raw_file(key, INPUT_NAME)
+        print(f"Processing prices for: {pretty} — {path}")
+        if not os.path.exists(path):
+            print(f"  WARNING: file not found: {path}  (skipping)")
+            continue
+
+        df = read_raw_csv(path)
+        df_clean_history, df_latest = clean_price_df(df, pretty)
+
+        # Save per-platform cleaned history
+        out_hist = os.path.join(CLEAN_DIR, f"prices_{key}_clean.csv")
+        writer.write(df_clean_history, out_hist)
+        print(f"  Saved cleaned history: {out_hist} ({len(df_clean_history)} rows)")
+
+        # Save per-platform latest
+        out_latest = os.path.join(CLEAN_DIR, f"prices_{key}_latest.csv")
+        writer.write(df_latest, out_latest)
+        print(f"  Saved latest snapshot: {out_latest} ({len(df_latest)} rows)")
+
+        history_tables.append(df_clean_history)
+        latest_tables.append(df_latest)
+
+    # Build master history and latest
+    if history_tables:
+        master_history = pd.concat(history_tables, ignore_index=True, sort=False)
+        writer.write(master_history, os.path.join(CLEAN_DIR, "prices_master_history.csv"))
+        print("Saved prices_master_history.csv")
+
+    if latest_tables:
+        master_latest = pd.concat(latest_tables, ignore_index=True, sort=False)
+        # Optional: ensure unique by (gameid, platform) after concatenation
+        master_latest = master_latest.drop_duplicates(subset=["gameid", "platform"], keep="last")
+        writer.write(master_latest, os.path.join(CLEAN_DIR, "prices_master_latest.csv"))
+        print("Saved prices_master_latest.csv")
+
+    print("\nPrice cleaning complete.")
+    return master_history, master_latest
@@ -0,0 +1,257 @@
+"""
+Module Name: cli.py
+Purpose:
+    Single command-line entry point for the pipeline.
+
+        gma run clean-games --platform steam
+        gma run all                       # every stage in one process
+        gma run all --memory-budget 2GB   # spill to disk instead of running out of memory
+        gma status                        # what has been built, and when
+        gma validate                      # raw headers + database tables
+        gma serve | reports | partitions | duckdb | titles | sketches | sample | raw | bench ...
+
+    `gma run all` chains the stages in-process: the DataFrames returned by
+    the cleaning stages are handed straight to build-db / load-population
+    instead of being read back from data_clean/, and the CSV artifacts are
+    written on a background thread (--artifacts sync|background|off).
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Imports are lazy: pandas and the stage modules are only imported by the
+      subcommand that needs them, so `gma status` and `gma validate` start
+      without loading pandas.
+    - The numbered scripts in python/ still work and call the same stages.
+"""
+
+import argparse
+import sys
+import time
+from importlib import import_module
+
+from gma.paths import CLEAN_DIR, DB_DIR, DB_PATH, EXTERNAL_DIR
+
+PLATFORMS = ["playstation", "steam", "xbox"]
+
+# stage name -> (module, function, takes --platform)
+STAGES = {
+    "clean-games": ("gma.clean_games", "run", True),
+    "clean-players": ("gma.clean_players", "run", True),
+    "clean-prices": ("gma.clean_prices", "run", True),
+    "build-db": ("gma.build_database", "build", False),
+    "prepare-population": ("gma.population", "prepare", False),
+    "load-population": ("gma.population", "load", False),
+    "build-sketches": ("gma.sketches", "build", False),
+    "build-sample": ("gma.sampling", "build", False),
+    "build-value": ("gma.value_engine", "build", False),
+    "build-pricing": ("gma.pricing", "build", False),
+}
+
+# stages that take a memory budget (gma/spill.py)
+BUDGETED = {"clean-games", "clean-players", "clean-prices", "build-db"}
+
+# raw file -> columns every stage relies on
+RAW_HEADERS = {
+    "games.csv": ["gameid", "title", "developers", "publishers", "genres", "supported_languages", "release_date"],
+    "players.csv": ["playerid"], # the other player columns differ per platform
+    "purchased_games.csv": ["playerid", "library"],
+    "prices.csv": ["gameid", "usd", "eur", "gbp", "jpy", "rub", "date_acquired"],
+}
+
+ARTIFACTS = [
+    CLEAN_DIR / "games_master.csv",
+    CLEAN_DIR / "players_master.csv",
+    CLEAN_DIR / "purchases_master.csv",
+    CLEAN_DIR / "prices_master_history.csv",
+    CLEAN_DIR / "prices_master_latest.csv",
+    EXTERNAL_DIR / "population_clean.csv",
+    EXTERNAL_DIR / "population_by_year.csv",
+    EXTERNAL_DIR / "country_aliases.csv",
+    DB_PATH,
+    DB_DIR / "games_analytics_sample.db",
+]
+
+DB_TABLES = ["games", "players", "purchases", "prices", "population", "population_by_year", "countries",
+             "country_aliases", "game_titles", "sketches", "player_value", "value_platform_spend",
+             "value_segments", "value_country", "value_game_revenue", "pricing_bands", "pricing_regional",
+             "pricing_regional_summary", "pricing_changes", "pricing_change_demand", "pricing_elasticity"]
+
+
+''' ===== RUN ===== '''
+
+def _stage(name):
+    module, func, _ = STAGES[name]
+    return getattr(import_module(module), func)
+
+
+def run_stage(name, platforms=None, budget=None):
+    kwargs = {"budget": budget} if name in BUDGETED else {}
+    if STAGES[name][2]:
+        return _stage(name)(platforms, **kwargs)
+    return _stage(name)(**kwargs)
+
+
+def run_all(platforms=None, artifacts="background", fmt="csv", budget=None):
+    """
+    Run every stage in one process. The clean DataFrames are handed straight
+    to build-db / load-population; the data_clean/ files are a side output
+    written by an ArtifactWriter (background thread by default, see gma/artifacts.py).
+    A stage that spilled to disk under the memory budget returns None, and the
+    later stages read its table back from data_clean/ / the database instead.
+    """
+    from gma.artifacts import ArtifactWriter
+
+    writer = ArtifactWriter(artifacts, fmt)
+    try:
+        games = _stage("clean-games")(platforms, writer, budget)
+        players, purchases = _stage("clean-players")(platforms, writer, budget)
+        prices_history, prices_latest = _stage("clean-prices")(platforms, writer, budget)
+        if any(t is None for t in (games, players, purchases, prices_latest)):
+            writer.flush() # spilled tables are re-read from data_clean/ - the files they depend on must be written
+        population = _stage("prepare-population")(writer, players)
+
+        start = time.perf_counter()
+        tables = {"games": games, "players": players, "purchases": purchases, "prices": prices_latest}
+        _stage("build-db")(tables, budget=budget)
+        _stage("load-population")(population)
+        in_memory = {name: tables[name] for name in ["players", "purchases", "prices"]}
+        _stage("build-sketches")(in_memory if all(t is not None for t in in_memory.values()) else None)
+        _stage("build-value")(tables if all(t is not None for t in tables.values()) else None)
+        pricing = {"history": prices_history, "prices": prices_latest, "purchases": purchases}
+        _stage("build-pricing")(pricing if all(t is not None for t in pricing.values()) else None)
+        print(f"Database built in {time.perf_counter() - start:.1f}s")
+    finally:
+        waited = writer.close()
+    if artifacts == "background":
+        print(f"Waited {waited:.1f}s for {len(writer.written)} background artifact(s)")
+
+
+def cmd_run(args):
+    if args.stage != "all" and args.platform and not STAGES[args.stage][2]:
+        print(f"--platform is ignored by {args.stage}", file=sys.stderr)
+    if args.memory_budget and args.stage not in BUDGETED | {"all"}:
+        print(f"--memory-budget is ignored by {args.stage}", file=sys.stderr)
+    from gma.spill import MemoryBudget
+
+    budget = MemoryBudget(args.memory_budget, args.spill_dir)
+    start = time.perf_counter()
+    if args.stage == "all":
+        run_all(args.platform, args.artifacts, args.artifact_format, budget)
+    else:
+        run_stage(args.stage, args.platform, budget)
+    print(f"\n{args.stage} finished in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+''' ===== STATUS / VALIDATE (no pandas) ===== '''
+
+def _table_counts(db_path):
+    import sqlite3
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] if t in existing else None
+                for t in DB_TABLES}
+    finally:
+        conn.close()
+
+
+def cmd_status(args):
+    for path in ARTIFACTS:
+        if path.exists():
+            stat = path.stat()
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(stat.st_mtime))
+            print(f"  ✔ {path.relative_to(path.parents[1])}  {stat.st_size / 1e6:.1f} MB  {stamp}")
+        else:
+            print(f"  ✘ {path.relative_to(path.parents[1])}  missing")
+    if DB_PATH.exists():
+        print("\nTables:")
+        for table, count in _table_counts(DB_PATH).items():
+            print(f"  {table}: {'missing' if count is None else count}")
+    return 0
+
+
+def cmd_validate(args):
+    from gma.raw_csv import raw_file, read_header # standard library only - no pandas
+    problems = []
+    for platform in args.platform or PLATFORMS:
+        for file_name, required in RAW_HEADERS.items():
+            path = raw_file(platform, file_name) # .csv, .csv.gz or .csv.zst
+            if not path.exists():
+                problems.append(f"{path}: missing")
+                continue
+            header = read_header(path)
+            missing = [c for c in required if c not in header]
+            if missing:
+                problems.append(f"{path}: missing columns {missing}")
+    if DB_PATH.exists():
+        for table, count in _table_counts(DB_PATH).items():
+            if not count:
+                problems.append(f"{DB_PATH.name}: table {table} is {'missing' if count is None else 'empty'}")
+    else:
+        problems.append(f"{DB_PATH}: missing (run `gma run build-db`)")
+
+    for problem in problems:
+        print(f"  ✘ {problem}")
+    if not problems:
+        print("  ✔ raw inputs and database look complete")
+    return 1 if problems else 0
+
+
+''' ===== DELEGATES ===== '''
+
+# subcommand -> module whose main(argv) handles the remaining arguments
+DELEGATES = {
+    "serve": ("gma.query_service", "read-only HTTP query service"),
+    "reports": ("gma.batch_runner", "run every sql/ report query in parallel"),
+    "partitions": ("gma.partitions", "build or query the platform partitions"),
+    "duckdb": ("gma.columnar_backend", "build, query or parity-check the DuckDB backend"),
+    "titles": ("gma.titles", "build or search the game title index"),
+    "sketches": ("gma.sketches", "approximate distinct counts / quantiles from stored sketches"),
+    "sample": ("gma.sampling", "build the stratified sample db or estimate a query from it"),
+    "raw": ("gma.raw_csv", "compress the raw inputs or check the parallel CSV reader"),
+    "bench": ("gma.benchmarks", "benchmark the cleaning functions/stages and gate regressions"),
+}
+
+
+''' ===== MAIN ===== '''
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gma", description="Games market analysis pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="run one pipeline stage, or all of them in one process")
+    r.add_argument("stage", choices=[*STAGES, "all"])
+    r.add_argument("--platform", nargs="*", choices=PLATFORMS)
+    r.add_argument("--artifacts", choices=["sync", "background", "off"], default="background",
+                   help="how `run all` writes data_clean/ side outputs (default: background thread)")
+    r.add_argument("--artifact-format", choices=["csv", "parquet"], default="csv")
+    r.add_argument("--memory-budget", metavar="SIZE",
+                   help="e.g. 2GB: cleaning stages / build-db whose tables would not fit switch to "
+                        "on-disk (chunked, external sort) versions with identical output")
+    r.add_argument("--spill-dir", help="directory for temporary spill files (default: system temp dir)")
+    r.set_defaults(handler=cmd_run)
+
+    s = sub.add_parser("status", help="show built artifacts and database row counts")
+    s.set_defaults(handler=cmd_status)
+
+    v = sub.add_parser("validate", help="check raw input headers and database tables")
+    v.add_argument("--platform", nargs="*", choices=PLATFORMS)
+    v.set_defaults(handler=cmd_validate)
+
+    for name, (_, help_text) in DELEGATES.items():
+        d = sub.add_parser(name, help=help_text, add_help=False)
+        d.add_argument("rest", nargs=argparse.REMAINDER)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGATES:
+        return import_module(DELEGATES[argv[0]][0]).main(argv[1:]) or 0
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
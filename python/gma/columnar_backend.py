@@ -0,0 +1,472 @@
+"""
+Module Name: columnar_backend.py
+Purpose:
+    Switchable, embedded columnar backend for the sql/ analysis files.
+    The same queries that run on games_analytics.db (SQLite, row store, one
+    core) can run in-process on DuckDB, which reads the clean tables directly
+    and executes the heavy GROUP BYs in sql/03-05 vectorised on all cores.
+
+    Includes:
+        - build():          load data_clean/ + population (+ the pricing summaries) into database/games_analytics.duckdb
+        - translate():      SQLite -> DuckDB compatibility shim (STRFTIME, date(), integer division)
+        - execute():        runs translated SQL, wrapping SQLite-style bare GROUP BY columns in ANY_VALUE()
+        - run_query():      run a named sql/ query on either backend
+        - check_parity():   run every query on both backends and compare results
+
+Dataset:
+    Input:   data_clean/games_master.csv
+             data_clean/players_master.csv
+             data_clean/purchases_master.csv
+             data_clean/prices_master_latest.csv
+             data_clean/prices_master_history.csv (pricing summaries, gma/pricing.py)
+             data_external/population_clean.csv, population_by_year.csv,
+             countries.csv, country_aliases.csv
+    Output:  database/games_analytics.duckdb
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - DuckDB is optional (pip install duckdb); SQLite remains the default
+      backend and nothing else in the pipeline needs it. No server is used.
+    - Column types mirror the SQLite schema in 05_build_sql_database.py so
+      both backends see the same values.
+"""
+
+import argparse
+import math
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from gma.paths import CLEAN_DIR, DB_DIR, DB_PATH, EXTERNAL_DIR
+from gma.sql_catalog import as_temp_view, load_catalog, ordered_views, queries
+
+DUCKDB_PATH = DB_DIR / "games_analytics.duckdb"
+BACKENDS = ["sqlite", "duckdb"]
+
+# table -> (source csv, column types) - same layout as the SQLite tables
+TABLES = {
+    "games": (CLEAN_DIR / "games_master.csv", {
+        "gameid": "BIGINT", "platform": "VARCHAR", "platform_raw": "VARCHAR", "title": "VARCHAR",
+        "developers": "VARCHAR", "publishers": "VARCHAR", "genres": "VARCHAR",
+        "supported_languages": "VARCHAR", "release_date": "VARCHAR", "release_date_year": "BIGINT",
+        "release_date_month": "BIGINT", "release_date_quarter": "BIGINT",
+    }),
+    "players": (CLEAN_DIR / "players_master.csv", {
+        "playerid": "BIGINT", "platform": "VARCHAR", "nickname": "VARCHAR",
+        "country": "VARCHAR", "created_date": "VARCHAR",
+    }),
+    "purchases": (CLEAN_DIR / "purchases_master.csv", {
+        "playerid": "BIGINT", "gameid": "BIGINT", "platform": "VARCHAR",
+    }),
+    "prices": (CLEAN_DIR / "prices_master_latest.csv", {
+        "gameid": "BIGINT", "platform": "VARCHAR", "usd": "DOUBLE", "eur": "DOUBLE", "gbp": "DOUBLE",
+        "jpy": "DOUBLE", "rub": "DOUBLE", "date_acquired": "VARCHAR",
+    }),
+    "population": (EXTERNAL_DIR / "population_clean.csv", {
+        "country": "VARCHAR", "population": "BIGINT",
+    }),
+    "population_by_year": (EXTERNAL_DIR / "population_by_year.csv", {
+        "country_id": "BIGINT", "year": "BIGINT", "population": "BIGINT",
+    }),
+    "countries": (EXTERNAL_DIR / "countries.csv", {
+        "country_id": "BIGINT", "iso3": "VARCHAR", "name": "VARCHAR",
+    }),
+    "country_aliases": (EXTERNAL_DIR / "country_aliases.csv", {
+        "alias": "VARCHAR", "country_id": "BIGINT",
+    }),
+}
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("the columnar backend needs DuckDB: pip install duckdb")
+    return duckdb
+
+
+''' ===== SQLITE -> DUCKDB SHIM ===== '''
+
+def _matching_paren(sql, open_idx):
+    depth, i, quote = 0, open_idx, None
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("unbalanced parentheses in SQL")
+
+
+def _split_args(text):
+    args, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+
+def _rewrite_calls(sql, func, rewrite):
+    pattern = re.compile(rf"(?<![\w.]){func}\s*\(", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        match = pattern.search(sql, pos)
+        if not match:
+            out.append(sql[pos:])
+            return "".join(out)
+        open_idx = match.end() - 1
+        close_idx = _matching_paren(sql, open_idx)
+        inner = _rewrite_calls(sql[open_idx + 1:close_idx], func, rewrite) # nested calls
+        out.append(sql[pos:match.start()])
+        out.append(rewrite(_split_args(inner)))
+        pos = close_idx + 1
+
+
+def translate(sql):
+    """
+    Rewrite the SQLite-specific parts of a sql/ statement for DuckDB:
+        STRFTIME('%Y', x)  -> strftime(TRY_CAST(x AS TIMESTAMP), '%Y')
+        date(x)            -> TRY_CAST(x AS DATE)
+    TRY_CAST keeps SQLite's "NULL for unparseable text" behaviour. Integer
+    division is handled by the connection setting integer_division=true.
+    """
+    sql = _rewrite_calls(sql, "STRFTIME",
+                         lambda a: f"strftime(TRY_CAST({a[1]} AS TIMESTAMP), {a[0]})")
+    sql = _rewrite_calls(sql, "date",
+                         lambda a: f"TRY_CAST({a[0]} AS DATE)" if len(a) == 1 else f"date({', '.join(a)})")
+    return sql
+
+
+BARE_COLUMN_RE = re.compile(r'must appear in the GROUP BY clause.*?LINE (\d+):( *)(.*?)\n( *)\^', re.DOTALL)
+
+
+def execute(con, sql, params=None, max_rewrites=10, rewrites=None):
+    """
+    Execute a SQLite-dialect statement on DuckDB.
+    SQLite allows "bare" columns next to aggregates (e.g. pop.population in
+    sql/01 query 6); DuckDB rejects them. When DuckDB reports one, the column
+    reference it points at is wrapped in ANY_VALUE() and the statement is
+    retried - the same "value from some row of the group" SQLite returns.
+    Wrapped references are appended to `rewrites` if a list is given.
+    """
+    sql = translate(sql)
+    for _ in range(max_rewrites + 1):
+        try:
+            return con.execute(sql, params) if params else con.execute(sql)
+        except Exception as error_message:
+            match = BARE_COLUMN_RE.search(str(error_message))
+            if not match:
+                raise
+            line_no = int(match.group(1)) - 1
+            caret = len(match.group(4)) - len(f"LINE {match.group(1)}:") - len(match.group(2))
+            lines = sql.split("\n")
+            # error lines are shown with leading whitespace trimmed
+            indent = len(lines[line_no]) - len(lines[line_no].lstrip())
+            line, col = lines[line_no], caret + indent
+            ref = re.match(r'[\w."]+', line[col:])
+            if not ref:
+                raise
+            rest = line[col + ref.end():]
+            wrapped = f"ANY_VALUE({ref.group(0)})"
+            if rest.strip() in ("", ",") or rest.lstrip().startswith(","):
+                # a plain select item - keep SQLite's output column name
+                wrapped += f' AS "{ref.group(0).split(".")[-1].strip(chr(34))}"'
+            lines[line_no] = f"{line[:col]}{wrapped}{rest}"
+            if rewrites is not None:
+                rewrites.append(ref.group(0))
+            sql = "\n".join(lines)
+    raise RuntimeError("too many bare-column rewrites")
+
+
+''' ===== BUILD / CONNECT ===== '''
+
+def _load_tables(con):
+    for table, (path, columns) in TABLES.items():
+        if not path.exists():
+            print(f"  WARNING: {path} not found — {table} not loaded")
+            continue
+        # types (by name), not columns (by position): the CSV column order differs between tables
+        types = ", ".join(f"'{c}': '{t}'" for c, t in columns.items())
+        con.execute(f"DROP TABLE IF EXISTS {table}")
+        con.execute(f"""
+            CREATE TABLE {table} AS
+            SELECT {', '.join(columns)}
+            FROM read_csv('{path.as_posix()}', header = true, types = {{{types}}})
+        """)
+        rows = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        print(f"  ✔ {table}: {rows} rows")
+
+    # game_titles is derived from games (normalised title key, see gma/titles.py); no FTS index here
+    if TABLES["games"][0].exists():
+        from gma.titles import title_frame
+        titles = title_frame(con.execute("SELECT gameid, platform, title FROM games").df())
+        con.register("game_titles_df", titles)
+        con.execute("DROP TABLE IF EXISTS game_titles")
+        con.execute("CREATE TABLE game_titles AS SELECT * FROM game_titles_df")
+        con.unregister("game_titles_df")
+        print(f"  ✔ game_titles: {len(titles)} rows")
+
+    # pricing_* summaries for sql/06 are derived from prices + purchases (+ the price history, see gma/pricing.py)
+    if TABLES["prices"][0].exists() and TABLES["purchases"][0].exists():
+        from gma.pricing import HISTORY_CSV, pricing_tables
+        import pandas as pd
+        inputs = {
+            "prices": con.execute("SELECT * FROM prices").df(),
+            "demand": con.execute("SELECT gameid, lower(platform) AS platform_key, COUNT(*) AS purchases "
+                                  "FROM purchases GROUP BY gameid, lower(platform)").df(),
+            "history": pd.read_csv(HISTORY_CSV) if HISTORY_CSV.exists() else None,
+        }
+        for name, df in pricing_tables(inputs).items():
+            con.register(f"{name}_df", df)
+            con.execute(f"DROP TABLE IF EXISTS {name}")
+            con.execute(f"CREATE TABLE {name} AS SELECT * FROM {name}_df")
+            con.unregister(f"{name}_df")
+            print(f"  ✔ {name}: {len(df)} rows")
+
+
+def build(db_path=DUCKDB_PATH):
+    """Load the clean tables into a DuckDB file (columnar, compressed)."""
+    duckdb = _duckdb()
+    tmp_path = db_path.with_suffix(".duckdb.tmp")
+    tmp_path.unlink(missing_ok=True)
+    con = duckdb.connect(str(tmp_path))
+    try:
+        _load_tables(con)
+    finally:
+        con.close()
+    tmp_path.replace(db_path)
+    print(f"DuckDB database saved to: {db_path}")
+
+
+def connect(db_path=DUCKDB_PATH, threads=None):
+    """
+    Open a DuckDB connection with the sql/ views in place. Uses the built
+    .duckdb file if present, otherwise loads the clean CSVs into memory.
+    """
+    duckdb = _duckdb()
+    if db_path is not None and db_path.exists():
+        con = duckdb.connect(str(db_path), read_only=True)
+    else:
+        con = duckdb.connect()
+        _load_tables(con)
+    con.execute("SET integer_division = true") # SQLite semantics for INTEGER / INTEGER
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    create_views(con)
+    return con
+
+
+def create_views(con):
+    # TEMP views are per connection - DuckDB cursors need their own copy
+    for view in ordered_views(load_catalog()):
+        con.execute(translate(as_temp_view(view.sql)))
+
+
+class DuckDBPool:
+    """
+    Same interface as gma.query_service.ReadOnlyPool, so the batch runner can
+    switch backends. One DuckDB connection is shared; each caller gets its own
+    cursor (DuckDB parallelises inside each query).
+    """
+
+    def __init__(self, db_path=DUCKDB_PATH, threads=None):
+        self._con = connect(db_path, threads)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            cursor = self._con.cursor()
+        create_views(cursor)
+        try:
+            yield _TranslatingCursor(cursor)
+        finally:
+            cursor.close()
+
+    def close(self):
+        self._con.close()
+
+
+class _TranslatingCursor:
+    # wraps a DuckDB cursor so callers can pass SQLite-dialect statements
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        return execute(self._cursor, sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+''' ===== RUN / PARITY ===== '''
+
+def run_query(name, backend="sqlite", sqlite_path=DB_PATH, duckdb_path=DUCKDB_PATH, con=None, rewrites=None):
+    """Return (columns, rows) for a named sql/ query on the chosen backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}; expected one of {BACKENDS}")
+    catalog = load_catalog()
+    if name not in catalog:
+        raise KeyError(f"unknown query: {name}")
+    sql = catalog[name].sql
+
+    if backend == "duckdb":
+        own = con is None
+        con = con or connect(duckdb_path)
+        try:
+            cur = execute(con, sql, rewrites=rewrites)
+            return [d[0] for d in cur.description], cur.fetchall()
+        finally:
+            if own:
+                con.close()
+
+    conn = con or sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True)
+    try:
+        for view in ordered_views(catalog, [name]):
+            conn.execute(as_temp_view(view.sql))
+        cur = conn.execute(sql)
+        return [d[0] for d in cur.description], cur.fetchall()
+    finally:
+        if con is None:
+            conn.close()
+
+
+def _normalise(value, digits):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return round(value, digits)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (int,)) or value is None:
+        return value
+    if hasattr(value, "__float__"): # Decimal
+        return round(float(value), digits)
+    return value
+
+
+def _rows_equal(left, right, rel_tol):
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        for x, y in zip(a, b):
+            if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+                if not math.isclose(x, y, rel_tol=rel_tol, abs_tol=1e-9):
+                    return False
+            elif x != y:
+                return False
+    return True
+
+
+def check_parity(names=None, sqlite_path=DB_PATH, duckdb_path=DUCKDB_PATH, digits=6, rel_tol=1e-9):
+    """
+    Run each query on SQLite and DuckDB and compare the result sets
+    (as multisets - row order is only compared through ORDER BY ties-free data).
+    Returns a list of dicts: name, status ("match", "mismatch", "error"), timings.
+    """
+    catalog = load_catalog()
+    selected = [q.name for q in queries(catalog)] if names is None else list(names)
+    duck = connect(duckdb_path)
+    lite = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True)
+    for view in ordered_views(catalog):
+        lite.execute(as_temp_view(view.sql))
+
+    report = []
+    try:
+        for name in selected:
+            entry = {"name": name}
+            try:
+                start = time.perf_counter()
+                cols_s, rows_s = run_query(name, "sqlite", con=lite)
+                entry["sqlite_s"] = round(time.perf_counter() - start, 4)
+                start = time.perf_counter()
+                rewrites = []
+                cols_d, rows_d = run_query(name, "duckdb", con=duck, rewrites=rewrites)
+                entry["duckdb_s"] = round(time.perf_counter() - start, 4)
+            except Exception as error_message:
+                entry.update(status="error", detail=str(error_message))
+                report.append(entry)
+                continue
+
+            norm_s = sorted((tuple(_normalise(v, digits) for v in r) for r in rows_s), key=repr)
+            norm_d = sorted((tuple(_normalise(v, digits) for v in r) for r in rows_d), key=repr)
+            if cols_s != cols_d:
+                entry.update(status="mismatch", detail=f"columns differ: {cols_s} vs {cols_d}")
+            elif not _rows_equal(norm_s, norm_d, rel_tol):
+                detail = f"{len(rows_s)} sqlite rows vs {len(rows_d)} duckdb rows"
+                if rewrites:
+                    detail += f" (bare GROUP BY column(s) {rewrites}: SQLite picks an arbitrary row per group)"
+                elif re.search(r"ROW_NUMBER|LIMIT", catalog[name].sql, re.IGNORECASE):
+                    detail += " (query ranks/limits rows - ties may be broken differently)"
+                entry.update(status="mismatch", detail=detail)
+            else:
+                entry["status"] = "match"
+            report.append(entry)
+    finally:
+        duck.close()
+        lite.close()
+    return report
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DuckDB columnar backend for the sql/ files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="load the clean tables into database/games_analytics.duckdb")
+    q = sub.add_parser("query", help="run a named sql/ query")
+    q.add_argument("name")
+    q.add_argument("--backend", choices=BACKENDS, default="duckdb")
+    q.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("parity", help="compare every query between SQLite and DuckDB")
+    p.add_argument("names", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build()
+        return 0
+
+    if args.command == "query":
+        start = time.perf_counter()
+        columns, rows = run_query(args.name, args.backend)
+        print(" | ".join(columns))
+        for row in rows[:args.limit]:
+            print(" | ".join(str(v) for v in row))
+        print(f"\n{len(rows)} rows in {time.perf_counter() - start:.3f}s ({args.backend})")
+        return 0
+
+    report = check_parity(args.names or None)
+    for entry in report:
+        flag = {"match": "✔", "mismatch": "✘", "error": "!"}[entry["status"]]
+        timing = f"sqlite {entry.get('sqlite_s', '-')}s / duckdb {entry.get('duckdb_s', '-')}s"
+        print(f"  {flag} {entry['name']} ({timing}) {entry.get('detail', '')}")
+    mismatches = [e for e in report if e["status"] == "mismatch"]
+    print(f"\n{len(report) - len(mismatches)} of {len(report)} queries without mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
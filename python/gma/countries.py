@@ -0,0 +1,147 @@
+"""
+Module Name: countries.py
+Purpose:
+    Country name -> ISO 3166 alpha-3 resolution, so the player data
+    (ISO-style names such as "Korea, Republic of" or "Viet Nam") can be joined
+    to external datasets that spell countries differently (OWID uses
+    "South Korea", "Vietnam", ...).
+
+    Every country gets a stable integer key, country_id, derived from its
+    alpha-3 code, so joins on population (or any later per-country table)
+    use integers instead of free-text names.
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - ISO_ALPHA3 lists the ISO 3166 short names used by the player data.
+      Names missing from it are resolved through extra aliases (e.g. the
+      OWID Entity column, paired with its Code) by CountryIndex.add_alias().
+    - Names are compared after normalise_name(): case, accents, punctuation
+      and "&"/"and" differences are ignored.
+"""
+
+import re
+import unicodedata
+
+# ISO 3166 short name (as it appears in players.country) -> alpha-3
+ISO_ALPHA3 = {
+    "Afghanistan": "AFG", "Åland Islands": "ALA", "Albania": "ALB", "Algeria": "DZA",
+    "American Samoa": "ASM", "Andorra": "AND", "Angola": "AGO", "Anguilla": "AIA",
+    "Antarctica": "ATA", "Antigua and Barbuda": "ATG", "Argentina": "ARG", "Armenia": "ARM",
+    "Aruba": "ABW", "Australia": "AUS", "Austria": "AUT", "Azerbaijan": "AZE",
+    "Bahamas": "BHS", "Bahrain": "BHR", "Bangladesh": "BGD", "Barbados": "BRB",
+    "Belarus": "BLR", "Belgium": "BEL", "Belize": "BLZ", "Benin": "BEN",
+    "Bermuda": "BMU", "Bhutan": "BTN", "Bolivia, Plurinational State of": "BOL",
+    "Bonaire, Sint Eustatius and Saba": "BES", "Bosnia and Herzegovina": "BIH", "Botswana": "BWA",
+    "Bouvet Island": "BVT", "Brazil": "BRA", "British Indian Ocean Territory": "IOT",
+    "Brunei Darussalam": "BRN", "Bulgaria": "BGR", "Burkina Faso": "BFA", "Burundi": "BDI",
+    "Cabo Verde": "CPV", "Cambodia": "KHM", "Cameroon": "CMR", "Canada": "CAN",
+    "Cayman Islands": "CYM", "Central African Republic": "CAF", "Chad": "TCD", "Chile": "CHL",
+    "China": "CHN", "Christmas Island": "CXR", "Cocos (Keeling) Islands": "CCK", "Colombia": "COL",
+    "Comoros": "COM", "Congo": "COG", "Congo, The Democratic Republic of the": "COD",
+    "Cook Islands": "COK", "Costa Rica": "CRI", "Côte d'Ivoire": "CIV", "Croatia": "HRV",
+    "Cuba": "CUB", "Curaçao": "CUW", "Cyprus": "CYP", "Czechia": "CZE",
+    "Denmark": "DNK", "Djibouti": "DJI", "Dominica": "DMA", "Dominican Republic": "DOM",
+    "Ecuador": "ECU", "Egypt": "EGY", "El Salvador": "SLV", "Equatorial Guinea": "GNQ",
+    "Eritrea": "ERI", "Estonia": "EST", "Eswatini": "SWZ", "Ethiopia": "ETH",
+    "Falkland Islands (Malvinas)": "FLK", "Faroe Islands": "FRO", "Fiji": "FJI", "Finland": "FIN",
+    "France": "FRA", "French Guiana": "GUF", "French Polynesia": "PYF",
+    "French Southern Territories": "ATF", "Gabon": "GAB", "Gambia": "GMB", "Georgia": "GEO",
+    "Germany": "DEU", "Ghana": "GHA", "Gibraltar": "GIB", "Greece": "GRC",
+    "Greenland": "GRL", "Grenada": "GRD", "Guadeloupe": "GLP", "Guam": "GUM",
+    "Guatemala": "GTM", "Guernsey": "GGY", "Guinea": "GIN", "Guinea-Bissau": "GNB",
+    "Guyana": "GUY", "Haiti": "HTI", "Heard Island and McDonald Islands": "HMD",
+    "Holy See (Vatican City State)": "VAT", "Honduras": "HND", "Hong Kong": "HKG",
+    "Hungary": "HUN", "Iceland": "ISL", "India": "IND", "Indonesia": "IDN",
+    "Iran, Islamic Republic of": "IRN", "Iraq": "IRQ", "Ireland": "IRL", "Isle of Man": "IMN",
+    "Israel": "ISR", "Italy": "ITA", "Jamaica": "JAM", "Japan": "JPN",
+    "Jersey": "JEY", "Jordan": "JOR", "Kazakhstan": "KAZ", "Kenya": "KEN",
+    "Kiribati": "KIR", "Korea, Democratic People's Republic of": "PRK", "Korea, Republic of": "KOR",
+    "Kuwait": "KWT", "Kyrgyzstan": "KGZ", "Lao People's Democratic Republic": "LAO",
+    "Latvia": "LVA", "Lebanon": "LBN", "Lesotho": "LSO", "Liberia": "LBR",
+    "Libya": "LBY", "Liechtenstein": "LIE", "Lithuania": "LTU", "Luxembourg": "LUX",
+    "Macao": "MAC", "Madagascar": "MDG", "Malawi": "MWI", "Malaysia": "MYS",
+    "Maldives": "MDV", "Mali": "MLI", "Malta": "MLT", "Marshall Islands": "MHL",
+    "Martinique": "MTQ", "Mauritania": "MRT", "Mauritius": "MUS", "Mayotte": "MYT",
+    "Mexico": "MEX", "Micronesia, Federated States of": "FSM", "Moldova, Republic of": "MDA",
+    "Monaco": "MCO", "Mongolia": "MNG", "Montenegro": "MNE", "Montserrat": "MSR",
+    "Morocco": "MAR", "Mozambique": "MOZ", "Myanmar": "MMR", "Namibia": "NAM",
+    "Nauru": "NRU", "Nepal": "NPL", "Netherlands": "NLD", "New Caledonia": "NCL",
+    "New Zealand": "NZL", "Nicaragua": "NIC", "Niger": "NER", "Nigeria": "NGA",
+    "Niue": "NIU", "Norfolk Island": "NFK", "North Macedonia": "MKD",
+    "Northern Mariana Islands": "MNP", "Norway": "NOR", "Oman": "OMN", "Pakistan": "PAK",
+    "Palau": "PLW", "Palestine, State of": "PSE", "Panama": "PAN", "Papua New Guinea": "PNG",
+    "Paraguay": "PRY", "Peru": "PER", "Philippines": "PHL", "Pitcairn": "PCN",
+    "Poland": "POL", "Portugal": "PRT", "Puerto Rico": "PRI", "Qatar": "QAT",
+    "Réunion": "REU", "Romania": "ROU", "Russian Federation": "RUS", "Rwanda": "RWA",
+    "Saint Barthélemy": "BLM", "Saint Helena, Ascension and Tristan da Cunha": "SHN",
+    "Saint Kitts and Nevis": "KNA", "Saint Lucia": "LCA", "Saint Martin (French part)": "MAF",
+    "Saint Pierre and Miquelon": "SPM", "Saint Vincent and the Grenadines": "VCT", "Samoa": "WSM",
+    "San Marino": "SMR", "Sao Tome and Principe": "STP", "Saudi Arabia": "SAU", "Senegal": "SEN",
+    "Serbia": "SRB", "Seychelles": "SYC", "Sierra Leone": "SLE", "Singapore": "SGP",
+    "Sint Maarten (Dutch part)": "SXM", "Slovakia": "SVK", "Slovenia": "SVN",
+    "Solomon Islands": "SLB", "Somalia": "SOM", "South Africa": "ZAF",
+    "South Georgia and the South Sandwich Islands": "SGS", "South Sudan": "SSD", "Spain": "ESP",
+    "Sri Lanka": "LKA", "Sudan": "SDN", "Suriname": "SUR", "Svalbard and Jan Mayen": "SJM",
+    "Sweden": "SWE", "Switzerland": "CHE", "Syrian Arab Republic": "SYR",
+    "Taiwan, Province of China": "TWN", "Tajikistan": "TJK", "Tanzania, United Republic of": "TZA",
+    "Thailand": "THA", "Timor-Leste": "TLS", "Togo": "TGO", "Tokelau": "TKL",
+    "Tonga": "TON", "Trinidad and Tobago": "TTO", "Tunisia": "TUN", "Türkiye": "TUR",
+    "Turkmenistan": "TKM", "Turks and Caicos Islands": "TCA", "Tuvalu": "TUV", "Uganda": "UGA",
+    "Ukraine": "UKR", "United Arab Emirates": "ARE", "United Kingdom": "GBR",
+    "United States": "USA", "United States Minor Outlying Islands": "UMI", "Uruguay": "URY",
+    "Uzbekistan": "UZB", "Vanuatu": "VUT", "Venezuela, Bolivarian Republic of": "VEN",
+    "Viet Nam": "VNM", "Virgin Islands, British": "VGB", "Virgin Islands, U.S.": "VIR",
+    "Wallis and Futuna": "WLF", "Western Sahara": "ESH", "Yemen": "YEM", "Zambia": "ZMB",
+    "Zimbabwe": "ZWE",
+}
+
+ISO3_RE = re.compile(r"^[A-Z]{3}$")
+
+
+def normalise_name(name):
+    """'Côte d'Ivoire' -> 'cote d ivoire' (lower case, no accents or punctuation, '&' -> 'and')."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    text = text.casefold().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def country_id(iso3):
+    """Stable integer key for an alpha-3 code (base-26: 'AAA' -> 0, 'ZZZ' -> 17575)."""
+    value = 0
+    for ch in iso3:
+        value = value * 26 + (ord(ch) - ord("A"))
+    return value
+
+
+def is_iso3(code):
+    # OWID also has aggregate codes like OWID_WRL and regions with no code
+    return isinstance(code, str) and bool(ISO3_RE.match(code))
+
+
+class CountryIndex:
+    """
+    alias -> alpha-3 lookup.
+
+        index = CountryIndex()
+        index.add_alias("South Korea", "KOR")    # e.g. from OWID Entity/Code
+        index.resolve("Korea, Republic of")      # -> "KOR"
+    """
+
+    def __init__(self):
+        self._codes = {normalise_name(name): code for name, code in ISO_ALPHA3.items()}
+        self.names = {code: name for name, code in ISO_ALPHA3.items()} # display name per code
+
+    def add_alias(self, alias, iso3):
+        if is_iso3(iso3):
+            self._codes.setdefault(normalise_name(alias), iso3)
+            self.names.setdefault(iso3, alias)
+
+    def resolve(self, name):
+        if name is None or name != name: # None / NaN
+            return None
+        return self._codes.get(normalise_name(name))
+
+    def resolve_many(self, names):
+        """{name: alpha-3 or None} for every distinct name."""
+        return {name: self.resolve(name) for name in set(names)}
@@ -0,0 +1,312 @@
+"""
+Module Name: partitions.py
+Purpose:
+    Optional platform/country-partitioned layout of the analytics database.
+    Each platform gets its own SQLite file under database/partitions/, holding
+    that platform's games, players, purchases and prices. Inside each file,
+    players and purchases are written in country order and indexed on country,
+    so a country filter reads one contiguous range instead of the whole table.
+
+    The query layer opens an in-memory connection, ATTACHes only the platform
+    files a query needs and exposes TEMP views named games / players /
+    purchases / prices over them - so the unchanged sql/ files run against
+    just the selected partitions.
+
+Dataset:
+    Input:   database/games_analytics.db
+    Output:  database/partitions/<platform>.db
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Platform keys are the lower-case folder names (playstation, steam, xbox);
+      stored column values are copied unchanged so results match the full db.
+    - purchases carries a denormalised copy of the player's country so it can
+      be pruned by country without a join.
+    - Tables that are not partitioned are read from the main db: lookup tables
+      (population, countries, ...) whole, per-platform tables (game_titles and
+      the pricing_* / value_* / sketches summaries) only for the selected
+      platforms, and by country too when they have a country column. A table
+      that cannot be narrowed to the selection - no platform column, or a
+      summary over every country when countries are given - is replaced by a
+      view that fails with "no such table: <name>: not split by ...", instead
+      of silently returning every platform's rows from the main db.
+"""
+
+import argparse
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from gma.paths import DB_DIR, DB_PATH
+from gma.sql_catalog import as_temp_view, load_catalog, ordered_views
+
+PARTITION_DIR = DB_DIR / "partitions"
+PLATFORMS = ["playstation", "steam", "xbox"]
+PARTITIONED_TABLES = ["games", "players", "purchases", "prices"]
+SHARED_TABLES = ["population", "population_by_year", "countries", "country_aliases"]
+# main-db tables with one row per platform (or per player / game on a platform): filtered on lower(platform)
+PLATFORM_SHARED_TABLES = [
+    "game_titles",
+    "pricing_bands", "pricing_regional", "pricing_regional_summary", "pricing_changes", "pricing_change_demand",
+    "pricing_elasticity",
+    "player_value", "value_platform_spend", "value_segments", "value_game_revenue",
+    "sketches",
+]
+# of those, the ones that summarise players of every country (no country column to filter on)
+ALL_COUNTRY_TABLES = [t for t in PLATFORM_SHARED_TABLES if t not in ("game_titles", "player_value")]
+
+
+''' ===== BUILD ===== '''
+
+PARTITION_SCHEMA = """
+CREATE TABLE games (
+    gameid INTEGER,
+    platform TEXT,
+    platform_raw TEXT,
+    title TEXT,
+    developers TEXT,
+    publishers TEXT,
+    genres TEXT,
+    supported_languages TEXT,
+    release_date TEXT,
+    release_date_year INTEGER,
+    release_date_month INTEGER,
+    release_date_quarter INTEGER
+);
+CREATE TABLE players (
+    playerid INTEGER,
+    platform TEXT,
+    nickname TEXT,
+    country TEXT,
+    created_date TEXT
+);
+CREATE TABLE purchases (
+    playerid INTEGER,
+    gameid INTEGER,
+    platform TEXT,
+    country TEXT
+);
+CREATE TABLE prices (
+    gameid INTEGER,
+    platform TEXT,
+    usd REAL,
+    eur REAL,
+    gbp REAL,
+    jpy REAL,
+    rub REAL,
+    date_acquired TEXT
+);
+"""
+
+PARTITION_INDEXES = """
+CREATE INDEX ix_games_gameid ON games (gameid);
+CREATE INDEX ix_players_country ON players (country, playerid);
+CREATE INDEX ix_players_playerid ON players (playerid);
+CREATE INDEX ix_purchases_country ON purchases (country, playerid);
+CREATE INDEX ix_purchases_playerid ON purchases (playerid);
+CREATE INDEX ix_purchases_gameid ON purchases (gameid);
+CREATE INDEX ix_prices_gameid ON prices (gameid, date_acquired);
+"""
+
+
+def partition_path(platform, partition_dir=PARTITION_DIR):
+    return partition_dir / f"{platform}.db"
+
+
+def build_partition(platform, src_path=DB_PATH, partition_dir=PARTITION_DIR):
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    path = partition_path(platform, partition_dir)
+    tmp_path = path.with_suffix(".db.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(PARTITION_SCHEMA)
+    conn.execute("ATTACH DATABASE ? AS src", (str(src_path),))
+
+    # rows are inserted in (country, playerid) order so each country is a contiguous range
+    conn.execute("""
+        INSERT INTO games SELECT gameid, platform, platform_raw, title, developers, publishers, genres,
+               supported_languages, release_date, release_date_year, release_date_month, release_date_quarter
+        FROM src.games WHERE lower(platform) = ? ORDER BY gameid
+    """, (platform,))
+    conn.execute("""
+        INSERT INTO players SELECT playerid, platform, nickname, country, created_date
+        FROM src.players WHERE lower(platform) = ? ORDER BY country, playerid
+    """, (platform,))
+    conn.execute("""
+        INSERT INTO purchases
+        SELECT pu.playerid, pu.gameid, pu.platform, pl.country
+        FROM src.purchases AS pu
+        LEFT JOIN (SELECT playerid, MAX(country) AS country FROM src.players
+                   WHERE lower(platform) = ? GROUP BY playerid) AS pl
+            ON pu.playerid = pl.playerid
+        WHERE lower(pu.platform) = ?
+        ORDER BY pl.country, pu.playerid
+    """, (platform, platform))
+    conn.execute("""
+        INSERT INTO prices SELECT gameid, platform, usd, eur, gbp, jpy, rub, date_acquired
+        FROM src.prices WHERE lower(platform) = ? ORDER BY gameid, date_acquired
+    """, (platform,))
+    conn.commit()
+    conn.execute("DETACH DATABASE src")
+    conn.executescript(PARTITION_INDEXES)
+    conn.execute("ANALYZE")
+    conn.commit()
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in PARTITIONED_TABLES}
+    conn.close()
+
+    tmp_path.replace(path) # swap in atomically so readers never see a half-built partition
+    return counts
+
+
+def build_partitions(platforms=PLATFORMS, src_path=DB_PATH, partition_dir=PARTITION_DIR):
+    if not src_path.exists():
+        raise FileNotFoundError(f"source database not found: {src_path} (run 05_build_sql_database.py first)")
+    for platform in platforms:
+        start = time.perf_counter()
+        counts = build_partition(platform, src_path, partition_dir)
+        summary = ", ".join(f"{t}={n}" for t, n in counts.items())
+        print(f"  ✔ {partition_path(platform, partition_dir).name}: {summary} ({time.perf_counter() - start:.1f}s)")
+
+
+''' ===== QUERY LAYER ===== '''
+
+def _normalise_platforms(platforms):
+    if platforms is None:
+        return list(PLATFORMS)
+    if isinstance(platforms, str):
+        platforms = [platforms]
+    selected = [p.lower() for p in platforms]
+    unknown = [p for p in selected if p not in PLATFORMS]
+    if unknown:
+        raise ValueError(f"unknown platform(s) {unknown}; expected some of {PLATFORMS}")
+    return selected
+
+
+def _columns(conn, schema, table):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _union_view(table, columns, schemas, country_filter):
+    branches = []
+    for schema in schemas:
+        sql = f"SELECT {', '.join(columns)} FROM {schema}.{table}"
+        if country_filter and table in ("players", "purchases"):
+            sql += f" WHERE country IN ({country_filter})"
+        branches.append(sql)
+    return f"CREATE TEMP VIEW {table} AS " + "\nUNION ALL\n".join(branches)
+
+
+@contextmanager
+def partitioned_connection(platforms=None, countries=None, partition_dir=PARTITION_DIR,
+                           main_db=DB_PATH, with_sql_views=True):
+    """
+    Yield a read-only connection whose games / players / purchases / prices
+    views cover only the requested platforms (and countries, if given).
+
+        with partitioned_connection("steam", countries=["Japan"]) as conn:
+            conn.execute("SELECT COUNT(*) FROM purchases")
+    """
+    selected = _normalise_platforms(platforms)
+    if isinstance(countries, str):
+        countries = [countries]
+
+    conn = sqlite3.connect("file::memory:", uri=True) # uri=True so ATTACH accepts mode=ro
+    try:
+        schemas = []
+        for platform in selected:
+            path = partition_path(platform, partition_dir)
+            if not path.exists():
+                raise FileNotFoundError(f"partition not built: {path} (run 09_build_partitions.py)")
+            conn.execute(f"ATTACH DATABASE ? AS p_{platform}", (f"file:{path}?mode=ro",))
+            schemas.append(f"p_{platform}")
+
+        country_filter = None
+        if countries:
+            country_filter = ", ".join("'" + c.replace("'", "''") + "'" for c in countries)
+
+        for table in PARTITIONED_TABLES:
+            columns = _columns(conn, schemas[0], table)
+            if table == "purchases":
+                columns = [c for c in columns if c != "country"] # keep the original schema
+            conn.execute(_union_view(table, columns, schemas, country_filter))
+
+        unsplit = []
+        if main_db is not None and main_db.exists():
+            conn.execute("ATTACH DATABASE ? AS full_db", (f"file:{main_db}?mode=ro",))
+            for table in SHARED_TABLES + PLATFORM_SHARED_TABLES:
+                if not conn.execute("SELECT 1 FROM full_db.sqlite_master WHERE name = ?", (table,)).fetchone():
+                    continue
+                if countries and table in ALL_COUNTRY_TABLES:
+                    unsplit.append((table, "country"))
+                    continue
+                where = ""
+                if table in PLATFORM_SHARED_TABLES: # keep the selected platforms
+                    where = " WHERE lower(platform) IN (" + ", ".join(f"'{p}'" for p in selected) + ")"
+                    if country_filter and "country" in _columns(conn, "full_db", table):
+                        where += f" AND country IN ({country_filter})"
+                conn.execute(f"CREATE TEMP VIEW {table} AS SELECT * FROM full_db.{table}{where}")
+            covered = set(PARTITIONED_TABLES + SHARED_TABLES + PLATFORM_SHARED_TABLES)
+            unsplit += [(name, "platform") for (name,) in conn.execute(
+                "SELECT name FROM full_db.sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'")
+                if name not in covered]
+
+        if with_sql_views:
+            for view in ordered_views(load_catalog()):
+                conn.execute(as_temp_view(view.sql))
+
+        # anything else in the main db would be found there, unfiltered - make reading it an error instead
+        temp = {name for (name,) in conn.execute("SELECT name FROM temp.sqlite_master")}
+        for table, by in unsplit:
+            if table not in temp:
+                conn.execute(f'CREATE TEMP VIEW "{table}" AS SELECT * FROM "{table}: not split by {by}"')
+
+        conn.execute("PRAGMA query_only = ON")
+        yield conn
+    finally:
+        conn.close()
+
+
+def run_query(name, platforms=None, countries=None, **kwargs):
+    """Run a named sql/ query (see gma.sql_catalog) on the selected partitions."""
+    catalog = load_catalog()
+    if name not in catalog:
+        raise KeyError(f"unknown query: {name}")
+    with partitioned_connection(platforms, countries, **kwargs) as conn:
+        cur = conn.execute(catalog[name].sql)
+        return [d[0] for d in cur.description], cur.fetchall()
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the platform-partitioned database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="(re)build database/partitions/<platform>.db")
+    b.add_argument("--platform", nargs="*", default=PLATFORMS)
+
+    q = sub.add_parser("query", help="run a named sql/ query on selected partitions")
+    q.add_argument("name")
+    q.add_argument("--platform", nargs="*")
+    q.add_argument("--country", nargs="*")
+    q.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print(f"Building partitions in {PARTITION_DIR}")
+        build_partitions(_normalise_platforms(args.platform))
+        return 0
+
+    start = time.perf_counter()
+    columns, rows = run_query(args.name, args.platform, args.country)
+    print(" | ".join(columns))
+    for row in rows[:args.limit]:
+        print(" | ".join(str(v) for v in row))
+    print(f"\n{len(rows)} rows in {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
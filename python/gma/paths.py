@@ -0,0 +1,30 @@
+"""
+Module Name: paths.py
+Purpose:
+    Single place for the repository folder layout so that every module
+    resolves paths relative to the repository root rather than the current
+    working directory.
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - GMA_DATA_ROOT (environment variable) moves the data folders - data_raw/,
+      data_clean/, data_external/, database/ and reports/ - to another
+      directory; sql/ stays in the repository. gma/benchmarks.py uses it to run the stages on
+      generated inputs.
+"""
+
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DATA_ROOT = Path(os.environ.get("GMA_DATA_ROOT") or REPO_ROOT)
+
+RAW_BASE = DATA_ROOT / "data_raw"
+CLEAN_DIR = DATA_ROOT / "data_clean"
+EXTERNAL_DIR = DATA_ROOT / "data_external"
+DB_DIR = DATA_ROOT / "database"
+REPORTS_DIR = DATA_ROOT / "reports"
+SQL_DIR = REPO_ROOT / "sql"
+
+DB_PATH = DB_DIR / "games_analytics.db"
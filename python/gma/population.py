@@ -0,0 +1,229 @@
+"""
+Module Name: population.py
+Purpose:
+    External population data for the market penetration analysis
+    (stages "prepare-population" and "load-population", run by
+    06_prepare_population_data.py / 07_load_population_into_sql.py or
+    `gma run prepare-population` / `gma run load-population`).
+        - prepare(): streams the OWID dataset in chunks, keeping only the
+          columns and countries that are needed (every year), and resolves
+          the player country names to ISO alpha-3 codes / integer
+          country_ids (gma/countries.py).
+        - load(): writes the tables into games_analytics.db.
+
+Dataset:
+    Input:   data_external/population.csv
+             data_clean/players_master.csv (country names to resolve)
+    Output:  data_external/population_clean.csv      (country, population) for POPULATION_YEAR
+             data_external/population_by_year.csv    (country_id, year, population)
+             data_external/countries.csv             (country_id, iso3, name)
+             data_external/country_aliases.csv       (alias, country_id)
+             database/games_analytics.db (tables of the same names)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    Data Source:
+    Ritchie, H., et al. (2023). “Population.” Our World in Data.
+    Retrieved from: https://ourworldindata.org/population
+
+    - Player names are matched on ISO code, not spelling: "Korea, Republic of"
+      and OWID's "South Korea" both resolve to KOR, so they no longer drop
+      out of the join in sql/01_market_penetration.sql.
+    - population keeps the player spellings, so existing queries joining
+      players.country = population.country work unchanged.
+    - country_aliases maps every known spelling to its country_id;
+      population_by_year is keyed on (country_id, year) for per-year joins.
+"""
+
+import csv
+import sqlite3
+import pandas as pd
+
+from gma.artifacts import ArtifactWriter
+from gma.countries import CountryIndex, ISO_ALPHA3, country_id, is_iso3
+from gma.paths import CLEAN_DIR, DB_PATH, EXTERNAL_DIR
+
+POP_CSV = EXTERNAL_DIR / "population.csv"
+POP_CLEAN_CSV = EXTERNAL_DIR / "population_clean.csv"
+POP_BY_YEAR_CSV = EXTERNAL_DIR / "population_by_year.csv"
+COUNTRIES_CSV = EXTERNAL_DIR / "countries.csv"
+COUNTRY_ALIASES_CSV = EXTERNAL_DIR / "country_aliases.csv"
+PLAYERS_CSV = CLEAN_DIR / "players_master.csv"
+
+POPULATION_YEAR = 2023 # snapshot year for the population table
+CHUNK_ROWS = 20_000
+
+OUTPUTS = {
+    "population": POP_CLEAN_CSV,
+    "population_by_year": POP_BY_YEAR_CSV,
+    "countries": COUNTRIES_CSV,
+    "country_aliases": COUNTRY_ALIASES_CSV,
+}
+
+SCHEMA = {
+    "population": """
+        CREATE TABLE population (
+            country TEXT PRIMARY KEY,
+            population INTEGER
+        )""",
+    "population_by_year": """
+        CREATE TABLE population_by_year (
+            country_id INTEGER,
+            year INTEGER,
+            population INTEGER,
+            PRIMARY KEY (country_id, year)
+        ) WITHOUT ROWID""",
+    "countries": """
+        CREATE TABLE countries (
+            country_id INTEGER PRIMARY KEY,
+            iso3 TEXT UNIQUE,
+            name TEXT
+        )""",
+    "country_aliases": """
+        CREATE TABLE country_aliases (
+            alias TEXT PRIMARY KEY,
+            country_id INTEGER REFERENCES countries(country_id)
+        )""",
+}
+
+
+def player_countries(players=None):
+    """Distinct player country names (from an in-memory players frame or players_master.csv); None if unavailable."""
+    if players is None:
+        if not PLAYERS_CSV.exists():
+            return None
+        players = pd.read_csv(PLAYERS_CSV, usecols=["country"])
+    return sorted(players["country"].dropna().astype(str).unique())
+
+
+def _population_column(path):
+    # OWID has renamed this column before ("Population (historical estimates)")
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    for col in header:
+        if col.startswith("Population"):
+            return col
+    raise ValueError(f"{path}: no population column in {header}")
+
+
+def stream_population(path, index, wanted_codes, unresolved):
+    """
+    Read population.csv in chunks, keeping only Entity/Code/Year/population
+    and only rows for the wanted codes. OWID Entity names are added to the
+    CountryIndex as they stream past, which can resolve names in `unresolved`
+    (their codes are then wanted too). Returns (rows, {code: OWID entity}).
+    """
+    pop_col = _population_column(path)
+    kept, entities = [], {}
+    reader = pd.read_csv(path, usecols=["Entity", "Code", "Year", pop_col],
+                         dtype={"Entity": str, "Code": str}, chunksize=CHUNK_ROWS)
+    for chunk in reader:
+        chunk = chunk[chunk["Code"].map(is_iso3)] # drops regions and OWID_* aggregates
+        for entity, code in chunk[["Entity", "Code"]].drop_duplicates().itertuples(index=False):
+            entities.setdefault(code, entity)
+            index.add_alias(entity, code)
+        for name in list(unresolved):
+            code = index.resolve(name)
+            if code:
+                wanted_codes.add(code)
+                unresolved.discard(name)
+        # while some names are unresolved every ISO row is a candidate; filtered again below
+        keep = chunk if unresolved else chunk[chunk["Code"].isin(wanted_codes)]
+        kept.append(keep.rename(columns={pop_col: "population"}))
+
+    rows = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(
+        columns=["Entity", "Code", "Year", "population"])
+    rows = rows[rows["Code"].isin(wanted_codes)]
+    return rows, entities
+
+
+def prepare(writer=None, players=None):
+    """
+    Build the population tables for the countries in the player data (or every
+    ISO country when no player data exists yet). Returns {table: DataFrame}.
+    """
+    writer = writer or ArtifactWriter()
+    EXTERNAL_DIR.mkdir(exist_ok=True)
+
+    index = CountryIndex()
+    names = player_countries(players)
+    if names is None:
+        print(f"  {PLAYERS_CSV.name} not found - keeping every ISO country")
+        names = sorted(ISO_ALPHA3)
+    resolved = index.resolve_many(names)
+    wanted_codes = {code for code in resolved.values() if code}
+    unresolved = {name for name, code in resolved.items() if not code}
+
+    rows, entities = stream_population(POP_CSV, index, wanted_codes, unresolved)
+    resolved = index.resolve_many(names)
+    print(f"  Resolved {sum(1 for c in resolved.values() if c)}/{len(names)} country names "
+          f"({len(rows)} population rows kept)")
+    for name in sorted(unresolved):
+        print(f"  WARNING: no ISO code for country '{name}'")
+
+    # (country_id, year) -> population, every year
+    by_year = pd.DataFrame({
+        "country_id": rows["Code"].map(country_id).astype("int64"),
+        "year": rows["Year"].astype("int64"),
+        "population": pd.to_numeric(rows["population"], errors="coerce").round().astype("Int64"),
+    })
+    by_year = by_year.drop_duplicates(["country_id", "year"], keep="last")
+    by_year = by_year.sort_values(["country_id", "year"]).reset_index(drop=True)
+
+    codes = sorted(set(rows["Code"]) | {c for c in resolved.values() if c})
+    countries = pd.DataFrame({
+        "country_id": [country_id(c) for c in codes],
+        "iso3": codes,
+        "name": [index.names.get(c) for c in codes],
+    })
+
+    # every spelling we know for the kept countries: player names, ISO names and OWID entities
+    aliases = {}
+    for name, code in resolved.items():
+        if code:
+            aliases.setdefault(name, code)
+    for code in codes:
+        for alias in (index.names.get(code), entities.get(code)):
+            if alias:
+                aliases.setdefault(alias, code)
+    country_aliases = pd.DataFrame(
+        [(alias, country_id(code)) for alias, code in sorted(aliases.items())],
+        columns=["alias", "country_id"])
+
+    # snapshot in the players' own spellings, for players.country = population.country joins
+    snapshot = by_year[by_year["year"] == POPULATION_YEAR].set_index("country_id")["population"]
+    population = pd.DataFrame({
+        "country": [n for n, c in resolved.items() if c],
+        "population": [snapshot.get(country_id(c)) for c in resolved.values() if c],
+    })
+    population = population.dropna(subset=["population"]).sort_values("country").reset_index(drop=True)
+    population["population"] = population["population"].astype("int64")
+
+    tables = {
+        "population": population,
+        "population_by_year": by_year,
+        "countries": countries,
+        "country_aliases": country_aliases,
+    }
+    for name, table in tables.items():
+        writer.write(table, OUTPUTS[name])
+    print("Population data cleaned and saved to:", EXTERNAL_DIR)
+    return tables
+
+
+def load(tables=None, db_path=DB_PATH):
+    """Write the population tables into SQLite (reads the data_external/ CSVs if none are given)."""
+    if tables is None:
+        tables = {name: pd.read_csv(path) for name, path in OUTPUTS.items()}
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for name in OUTPUTS:
+        # recreate each table so its keys are declared (to_sql "replace" would drop them)
+        cursor.execute(f"DROP TABLE IF EXISTS {name}")
+        cursor.execute(SCHEMA[name])
+        tables[name].to_sql(name, conn, if_exists="append", index=False)
+    conn.commit()
+    conn.close()
+    print("Population data successfully added to SQLite.")
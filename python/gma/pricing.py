@@ -0,0 +1,323 @@
+"""
+Module Name: pricing.py
+Purpose:
+    Pricing analytics (stage "build-pricing", after build-db) for the
+    Pricing & Value Perception chapter (sql/06_pricing_value_perception.sql).
+    Price history and purchase counts are combined with vectorised group
+    aggregations, and the results are stored as small indexed summary tables,
+    so the pricing dashboards never scan the price history.
+
+    Tables written:
+        pricing_bands              games and purchases per price band, per platform and currency
+        pricing_regional           latest price per game in every currency + ratio to the USD price
+        pricing_regional_summary   median / p10 / p90 of those ratios per platform and currency
+        pricing_changes            per game: first vs last USD observation (date_acquired order), purchases
+        pricing_change_demand      purchases per game for games whose price was cut / raised / unchanged
+        pricing_elasticity         slope of log(purchases) on log(latest USD price) per platform
+
+Dataset:
+    Input:   data_clean/prices_master_history.csv (or the in-memory history from clean-prices)
+             games_analytics.db (prices = latest price per game, purchases)
+    Output:  games_analytics.db (the six tables above)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Purchases carry no date, so the "effect" of a price change is a
+      comparison between games (how much demand games that were cut / raised
+      have), not a before-and-after per game. The same holds for the elasticity:
+      it is cross-sectional, across the games of one platform.
+    - Band edges are per currency (BANDS); a price of exactly 0 is its own "free" band.
+    - Observations without a date_acquired or a USD price are left out of the
+      price-change tables (they cannot be put in order).
+    - Purchases are matched to prices on (gameid, lower-cased platform), as in
+      gma/value_engine.py.
+    - `python -m gma.pricing check` compares pricing_bands with the same
+      banding done in SQL.
+"""
+
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from gma.dates import DateParser
+from gma.paths import CLEAN_DIR, DB_PATH
+
+CURRENCIES = ["usd", "eur", "gbp", "jpy", "rub"]
+
+# currency -> upper band edges; prices at or above the last edge share the top band
+BANDS = {
+    "usd": [5, 10, 20, 40, 60],
+    "eur": [5, 10, 20, 40, 60],
+    "gbp": [5, 10, 20, 40, 60],
+    "jpy": [500, 1000, 2500, 5000, 8000],
+    "rub": [250, 500, 1000, 2500, 4000],
+}
+HISTORY_CSV = CLEAN_DIR / "prices_master_history.csv"
+
+
+''' ===== INPUTS ===== '''
+
+def _read_tables(db_path, history=True):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        prices = pd.read_sql(f"SELECT gameid, platform, {', '.join(CURRENCIES)} FROM prices", conn)
+        demand = pd.read_sql("SELECT gameid, lower(platform) AS platform_key, COUNT(*) AS purchases "
+                             "FROM purchases GROUP BY gameid, lower(platform)", conn)
+    finally:
+        conn.close()
+    history = pd.read_csv(HISTORY_CSV) if history and HISTORY_CSV.exists() else None
+    return {"history": history, "prices": prices, "demand": demand}
+
+
+def purchase_counts(purchases):
+    """Purchases per (gameid, lower-cased platform) from a purchases frame."""
+    counts = purchases.assign(platform_key=purchases["platform"].str.lower()).groupby(
+        ["gameid", "platform_key"], sort=False).size().rename("purchases").reset_index()
+    counts["gameid"] = counts["gameid"].astype("int64")
+    return counts
+
+
+def _with_demand(games, demand):
+    # adds `purchases` (0 for games nobody bought) to a frame keyed by gameid + platform
+    keyed = games.assign(platform_key=games["platform"].str.lower())
+    keyed = keyed.merge(demand, on=["gameid", "platform_key"], how="left").drop(columns="platform_key")
+    keyed["purchases"] = keyed["purchases"].fillna(0).astype("int64")
+    return keyed
+
+
+''' ===== PRICE BANDS ===== '''
+
+def band_labels(currency):
+    edges = BANDS[currency]
+    return ["free", f"<{edges[0]:g}"] + [f"{lo:g}-{hi:g}" for lo, hi in zip(edges, edges[1:])] + [f"{edges[-1]:g}+"]
+
+
+def price_bands(latest):
+    """pricing_bands: one row per (platform, currency, band) that has games."""
+    long = latest.melt(id_vars=["platform", "gameid", "purchases"], value_vars=CURRENCIES,
+                       var_name="currency", value_name="price").dropna(subset=["price"])
+    long = long[long["price"] >= 0]
+    band = np.zeros(len(long), dtype=np.int64)
+    for currency in CURRENCIES:
+        rows = (long["currency"] == currency).to_numpy()
+        prices = long["price"].to_numpy()[rows]
+        # 0 -> free, then one band per edge interval (right edge exclusive)
+        band[rows] = np.where(prices == 0, 0, np.searchsorted(BANDS[currency], prices, side="right") + 1)
+    long["band_order"] = band
+
+    bands = long.groupby(["platform", "currency", "band_order"], sort=True).agg(
+        games=("gameid", "size"), purchases=("purchases", "sum"),
+        avg_price=("price", "mean"), min_price=("price", "min"), max_price=("price", "max")).reset_index()
+    bands["band"] = [band_labels(c)[b] for c, b in zip(bands["currency"], bands["band_order"])]
+    bands["purchases_per_game"] = (bands["purchases"] / bands["games"]).round(2)
+    totals = bands.groupby(["platform", "currency"])[["games", "purchases"]].transform("sum")
+    bands["share_of_games_pct"] = (bands["games"] / totals["games"] * 100).round(2)
+    bands["share_of_purchases_pct"] = (bands["purchases"] / totals["purchases"].where(totals["purchases"] > 0) * 100).round(2)
+    bands["avg_price"] = bands["avg_price"].round(2)
+    return bands[["platform", "currency", "band_order", "band", "games", "purchases", "purchases_per_game",
+                  "share_of_games_pct", "share_of_purchases_pct", "avg_price", "min_price", "max_price"]]
+
+
+''' ===== CROSS-REGIONAL PRICES ===== '''
+
+def regional_prices(latest):
+    """pricing_regional: latest prices per game and each currency's price / USD price."""
+    regional = latest[["platform", "gameid", *CURRENCIES, "purchases"]].copy()
+    usd = regional["usd"].where(regional["usd"] > 0)
+    for currency in CURRENCIES[1:]:
+        regional[f"{currency}_per_usd"] = (regional[currency].where(regional[currency] > 0) / usd).round(4)
+    return regional
+
+
+def regional_summary(regional):
+    """pricing_regional_summary: distribution of the price ratios per platform and currency."""
+    ratios = regional.melt(id_vars=["platform"], value_vars=[f"{c}_per_usd" for c in CURRENCIES[1:]],
+                           var_name="currency", value_name="ratio").dropna(subset=["ratio"])
+    ratios["currency"] = ratios["currency"].str.replace("_per_usd", "", regex=False)
+    grouped = ratios.groupby(["platform", "currency"], sort=True)["ratio"]
+    summary = grouped.agg(games="size", median_ratio="median").reset_index()
+    quantiles = grouped.quantile([0.1, 0.9]).unstack()
+    summary["p10_ratio"] = quantiles[0.1].to_numpy()
+    summary["p90_ratio"] = quantiles[0.9].to_numpy()
+    return summary.round({"median_ratio": 4, "p10_ratio": 4, "p90_ratio": 4})
+
+
+''' ===== PRICE CHANGES VS DEMAND ===== '''
+
+def price_changes(history, demand):
+    """pricing_changes: per game, its dated USD observations in order - first, last, number of changes."""
+    obs = history[["platform", "gameid", "usd", "date_acquired"]].copy()
+    obs["usd"] = pd.to_numeric(obs["usd"], errors="coerce")
+    obs["date_acquired"] = DateParser()(obs["date_acquired"])
+    obs = obs.dropna(subset=["gameid", "usd", "date_acquired"])
+    obs["gameid"] = obs["gameid"].astype("int64")
+    obs = obs.sort_values(["platform", "gameid", "date_acquired"], kind="stable")
+
+    step = obs.groupby(["platform", "gameid"], sort=False)["usd"].diff() # NaN on each game's first row
+    obs["cut"] = step < 0
+    obs["increase"] = step > 0
+    changes = obs.groupby(["platform", "gameid"], sort=False).agg(
+        observations=("usd", "size"), first_date=("date_acquired", "first"), last_date=("date_acquired", "last"),
+        first_usd=("usd", "first"), last_usd=("usd", "last"), cuts=("cut", "sum"), increases=("increase", "sum"),
+    ).reset_index()
+    changes["price_changes"] = changes["cuts"] + changes["increases"]
+    changes["change_pct"] = ((changes["last_usd"] - changes["first_usd"])
+                             / changes["first_usd"].where(changes["first_usd"] > 0) * 100).round(2)
+    changes["direction"] = np.select([changes["last_usd"] < changes["first_usd"], changes["last_usd"] > changes["first_usd"]],
+                                     ["cut", "increase"], "unchanged")
+    for col in ["first_date", "last_date"]:
+        changes[col] = changes[col].dt.strftime("%Y-%m-%d")
+    return _with_demand(changes, demand)
+
+
+def change_demand(changes):
+    """pricing_change_demand: demand of games that were cut / raised / unchanged, per platform."""
+    summary = changes.groupby(["platform", "direction"], sort=True).agg(
+        games=("gameid", "size"), purchases=("purchases", "sum"),
+        median_purchases=("purchases", "median"), median_change_pct=("change_pct", "median")).reset_index()
+    summary["purchases_per_game"] = (summary["purchases"] / summary["games"]).round(2)
+    platform_avg = summary.groupby("platform")["purchases"].transform("sum") / summary.groupby("platform")["games"].transform("sum")
+    summary["demand_index"] = (summary["purchases_per_game"] / platform_avg.where(platform_avg > 0)).round(3) # 1.0 = platform average
+    return summary
+
+
+def elasticity(latest):
+    """pricing_elasticity: least-squares slope of log(purchases) on log(usd) across each platform's games."""
+    games = latest[(latest["usd"] > 0) & (latest["purchases"] > 0)]
+    terms = pd.DataFrame({"platform": games["platform"], "x": np.log(games["usd"]), "y": np.log(games["purchases"])})
+    terms["xx"], terms["xy"] = terms["x"] ** 2, terms["x"] * terms["y"]
+    sums = terms.groupby("platform", sort=True).agg(games=("x", "size"), x=("x", "sum"), y=("y", "sum"),
+                                                    xx=("xx", "sum"), xy=("xy", "sum")).reset_index()
+    spread = sums["games"] * sums["xx"] - sums["x"] ** 2
+    sums["elasticity"] = ((sums["games"] * sums["xy"] - sums["x"] * sums["y"]) / spread.where(spread > 1e-12)).round(4)
+    return sums[["platform", "games", "elasticity"]]
+
+
+''' ===== BUILD ===== '''
+
+# table -> index created after loading
+INDEXES = {
+    "pricing_bands": "CREATE UNIQUE INDEX idx_pricing_bands ON pricing_bands (platform, currency, band_order)",
+    "pricing_regional": "CREATE UNIQUE INDEX idx_pricing_regional ON pricing_regional (platform, gameid)",
+    "pricing_regional_summary": "CREATE UNIQUE INDEX idx_pricing_regional_summary ON pricing_regional_summary (platform, currency)",
+    "pricing_changes": "CREATE UNIQUE INDEX idx_pricing_changes ON pricing_changes (platform, gameid)",
+    "pricing_change_demand": "CREATE UNIQUE INDEX idx_pricing_change_demand ON pricing_change_demand (platform, direction)",
+    "pricing_elasticity": "CREATE UNIQUE INDEX idx_pricing_elasticity ON pricing_elasticity (platform)",
+}
+
+
+def latest_prices(tables):
+    """Latest price per (platform, gameid) in every currency, with its purchases."""
+    demand = tables["demand"] if "demand" in tables else purchase_counts(tables["purchases"])
+    latest = tables["prices"].dropna(subset=["gameid"]).copy()
+    latest["gameid"] = latest["gameid"].astype("int64")
+    for currency in CURRENCIES: # an all-NULL column comes back from SQLite as object
+        latest[currency] = pd.to_numeric(latest[currency], errors="coerce").astype("float64")
+    return _with_demand(latest[["platform", "gameid", *CURRENCIES]], demand), demand
+
+
+def pricing_tables(tables):
+    """All pricing tables as DataFrames (the price-change tables only when a history is given)."""
+    latest, demand = latest_prices(tables)
+    regional = regional_prices(latest)
+    results = {
+        "pricing_bands": price_bands(latest),
+        "pricing_regional": regional,
+        "pricing_regional_summary": regional_summary(regional),
+        "pricing_elasticity": elasticity(latest),
+    }
+    if tables.get("history") is not None:
+        changes = price_changes(tables["history"], demand)
+        results["pricing_changes"] = changes
+        results["pricing_change_demand"] = change_demand(changes)
+    else:
+        print(f"  WARNING: no price history ({HISTORY_CSV.name} missing) - skipping pricing_changes / pricing_change_demand")
+    return results
+
+
+def build(tables=None, db_path=DB_PATH):
+    """
+    Compute the pricing tables and store them in games_analytics.db. `tables`
+    may hold the in-memory price history ("history"), latest prices ("prices")
+    and purchases from earlier stages; otherwise they are read from the
+    database and data_clean/.
+    """
+    start = time.perf_counter()
+    tables = tables if tables is not None else _read_tables(db_path)
+    results = pricing_tables(tables)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, df in results.items():
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            df.to_sql(name, conn, index=False)
+            conn.execute(INDEXES[name])
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"  ✔ pricing tables: {', '.join(f'{name} ({len(df)})' for name, df in results.items())} "
+          f"({time.perf_counter() - start:.2f}s)")
+    return results
+
+
+''' ===== CHECK AGAINST SQL ===== '''
+
+def _band_sql(currency):
+    # the BANDS banding of one currency written as a SQL CASE expression
+    edges = BANDS[currency]
+    cases = [f"WHEN pr.{currency} = 0 THEN 0"] + [f"WHEN pr.{currency} < {edge} THEN {i + 1}" for i, edge in enumerate(edges)]
+    return f"CASE {' '.join(cases)} ELSE {len(edges) + 1} END"
+
+
+def check(db_path=DB_PATH):
+    """Compare pricing_bands (games and purchases per band) with the same banding in SQL. Returns True if equal."""
+    start = time.perf_counter()
+    bands = price_bands(latest_prices(_read_tables(db_path, history=False))[0])
+    engine_seconds = time.perf_counter() - start
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        start = time.perf_counter()
+        reference = pd.concat([pd.read_sql(f"""
+            SELECT pr.platform, '{currency}' AS currency, {_band_sql(currency)} AS band_order,
+                   COUNT(*) AS games, SUM(COALESCE(d.purchases, 0)) AS purchases
+            FROM prices AS pr
+            LEFT JOIN (SELECT gameid, lower(platform) AS platform_key, COUNT(*) AS purchases
+                       FROM purchases GROUP BY gameid, lower(platform)) AS d
+                ON d.gameid = pr.gameid AND d.platform_key = lower(pr.platform)
+            WHERE pr.{currency} >= 0 AND pr.gameid IS NOT NULL
+            GROUP BY pr.platform, band_order""", conn) for currency in CURRENCIES], ignore_index=True)
+        sql_seconds = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    keys = ["platform", "currency", "band_order"]
+    merged = bands[keys + ["games", "purchases"]].merge(reference, on=keys, how="outer", suffixes=("", "_sql"))
+    ok = len(bands) == len(reference) and merged.notna().all().all() and \
+        (merged["games"] == merged["games_sql"]).all() and (merged["purchases"] == merged["purchases_sql"]).all()
+    print(f"  {'✔' if ok else '✘'} pricing_bands: {len(bands)} rows (SQL {len(reference)})")
+    print(f"engine {engine_seconds:.2f}s (incl. loading) vs SQL {sql_seconds:.2f}s")
+    return ok
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pricing analytics summary tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="(re)build the pricing tables in games_analytics.db")
+    sub.add_parser("check", help="compare pricing_bands with the same banding in SQL")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build()
+        return 0
+    return 0 if check() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
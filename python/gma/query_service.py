@@ -0,0 +1,438 @@
+"""
+Module Name: query_service.py
+Purpose:
+    Local, read-only query service for games_analytics.db. Every named query
+    in sql/01-06 (see gma.sql_catalog) is exposed through:
+        - a Python API:  QueryService().run("03_player_value.estimated_spend_per_player")
+        - an HTTP/JSON API served with asyncio (python -m gma.query_service)
+
+    Queries run on a small pool of read-only connections, results are cached
+    per database build, and per-query latency / cache hit rate is reported.
+
+Dataset:
+    Input:   database/games_analytics.db
+             sql/*.sql
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Standard library only; nothing outside the machine is contacted.
+    - Connections are opened with mode=ro and PRAGMA query_only, so the
+      service can never modify the database. Views such as players_enriched
+      are created as TEMP views on each connection.
+    - The "build id" is the inode/size/mtime signature of the database file
+      (plus its WAL file, when non-empty). When it changes (database rebuilt) the cache is cleared and pooled
+      connections are recycled.
+    - Query parameters: "limit" caps the rows returned; every other parameter
+      is an equality filter on an output column, e.g. ?platform=Steam.
+
+HTTP endpoints:
+    GET /health
+    GET /queries                 list of query names and titles
+    GET /queries/<name>?k=v      run a query (filters + limit)
+    GET /stats                   latency, hit-rate and error report
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from gma.paths import DB_PATH, SQL_DIR
+from gma.sql_catalog import as_temp_view, load_catalog, ordered_views, queries
+
+
+''' ===== ERRORS ===== '''
+
+class QueryError(Exception):
+    """Raised for unknown queries or invalid parameters (HTTP 400/404)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+''' ===== BUILD ID ===== '''
+
+def database_build_id(db_path):
+    """
+    Signature that changes whenever the database file is replaced or written to.
+    The WAL file is included once it holds data (commits land there until a
+    checkpoint); an empty WAL is ignored because opening a reader creates one.
+    """
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        raise QueryError(f"database not found: {db_path}", status=503)
+    build_id = f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    try:
+        wal = os.stat(f"{db_path}-wal")
+        if wal.st_size:
+            build_id += f"|{wal.st_size}:{wal.st_mtime_ns}"
+    except FileNotFoundError:
+        pass
+    return build_id
+
+
+''' ===== CONNECTION POOL ===== '''
+
+class ReadOnlyPool:
+    """
+    Fixed-size pool of read-only SQLite connections.
+    Connections are created lazily and tagged with a generation number;
+    reset() bumps the generation so stale connections are closed when they
+    are handed back instead of being reused.
+    """
+
+    def __init__(self, db_path, size=4, setup_sql=()):
+        self.db_path = db_path
+        self.size = size
+        self.setup_sql = list(setup_sql)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA temp_store = MEMORY")
+        for sql in self.setup_sql:
+            try:
+                conn.execute(as_temp_view(sql))
+            except sqlite3.Error as error_message:
+                # a view over a missing table should not take the whole pool down
+                print(f"  WARNING: setup statement failed: {error_message}")
+        conn.execute("PRAGMA query_only = ON") # after the TEMP views are in place
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        conn = None
+        try:
+            with self._lock:
+                generation = self._generation
+            try:
+                conn, conn_generation = self._idle.get_nowait()
+                if conn_generation != generation:
+                    conn.close()
+                    conn = None
+            except queue.Empty:
+                pass
+            if conn is None:
+                conn, conn_generation = self._connect(), generation
+            yield conn
+        finally:
+            if conn is not None:
+                with self._lock:
+                    stale = conn_generation != self._generation
+                if stale:
+                    conn.close()
+                else:
+                    self._idle.put((conn, conn_generation))
+            self._slots.release()
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+        self._drain()
+
+    def close(self):
+        self.reset()
+
+    def _drain(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+''' ===== QUERY SERVICE ===== '''
+
+class QueryService:
+
+    def __init__(self, db_path=DB_PATH, sql_dir=SQL_DIR, pool_size=4, cache_size=256):
+        self.db_path = str(db_path)
+        self.catalog = load_catalog(sql_dir)
+        self.queries = {q.name: q for q in queries(self.catalog)}
+        self.pool = ReadOnlyPool(self.db_path, size=pool_size,
+                                 setup_sql=[v.sql for v in ordered_views(self.catalog)])
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._build_id = None
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._errors = {}
+        self._columns = {}
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="gma-query")
+
+    # --- catalogue ---
+
+    def list_queries(self):
+        return [{"name": q.name, "file": q.file, "title": q.title} for q in self.queries.values()]
+
+    # --- cache / build tracking ---
+
+    def _check_build(self):
+        build_id = database_build_id(self.db_path)
+        with self._lock:
+            if build_id != self._build_id:
+                if self._build_id is not None:
+                    print(f"Database rebuilt — clearing {len(self._cache)} cached results.")
+                self._cache.clear()
+                self._columns.clear()
+                self._build_id = build_id
+                changed = True
+            else:
+                changed = False
+        if changed:
+            self.pool.reset()
+        return build_id
+
+    def _record(self, name, elapsed_ms, hit):
+        with self._lock:
+            s = self._stats.setdefault(name, {"calls": 0, "hits": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["calls"] += 1
+            s["hits"] += int(hit)
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+
+    def record_error(self, label):
+        """Count a failed query (by name) or a failed request (by path) for /stats."""
+        with self._lock:
+            self._errors[label] = self._errors.get(label, 0) + 1
+
+    # --- execution ---
+
+    def _output_columns(self, conn, name, sql):
+        with self._lock:
+            columns = self._columns.get(name)
+        if columns is None:
+            cur = conn.execute(f"SELECT * FROM ({sql}) LIMIT 0")
+            columns = [d[0] for d in cur.description]
+            with self._lock:
+                self._columns[name] = columns
+        return columns
+
+    def _build_sql(self, conn, name, sql, filters, limit):
+        if not filters and limit is None:
+            return sql, []
+        columns = self._output_columns(conn, name, sql)
+        where, args = [], []
+        for col, value in filters:
+            if col not in columns:
+                raise QueryError(f"unknown column '{col}' for {name}; available: {columns}")
+            where.append(f'"{col}" = ?')
+            args.append(value)
+        wrapped = f"SELECT * FROM ({sql})"
+        if where:
+            wrapped += " WHERE " + " AND ".join(where)
+        if limit is not None:
+            wrapped += " LIMIT ?"
+            args.append(limit)
+        return wrapped, args
+
+    def run(self, name, params=None):
+        """
+        Run a named query and return a dict with columns, rows and timing.
+        params: {"limit": n, "<column>": value, ...}
+        """
+        if name not in self.queries:
+            raise QueryError(f"unknown query: {name}", status=404)
+        params = dict(params or {})
+        limit = params.pop("limit", None)
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except (TypeError, ValueError):
+                raise QueryError(f"limit must be an integer, got {limit!r}")
+        filters = tuple(sorted(params.items()))
+        key = (name, filters, limit)
+
+        start = time.perf_counter()
+        build_id = self._check_build()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+
+        if cached is None:
+            try:
+                with self.pool.connection() as conn:
+                    # _build_sql runs the query once (LIMIT 0) for its columns, so it can fail like the query itself
+                    sql, args = self._build_sql(conn, name, self.queries[name].sql, filters, limit)
+                    cur = conn.execute(sql, args)
+                    cached = ([d[0] for d in cur.description], cur.fetchall())
+            except QueryError:
+                self.record_error(name)
+                raise
+            except sqlite3.Error as error_message:
+                self.record_error(name)
+                raise QueryError(f"{name} failed: {error_message}", status=500)
+            except Exception as error_message:
+                self.record_error(name)
+                raise QueryError(f"{name} failed: {type(error_message).__name__}: {error_message}", status=500)
+            with self._lock:
+                # only cache if the database was not rebuilt while we were running
+                if build_id == self._build_id:
+                    self._cache[key] = cached
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            hit = False
+        else:
+            hit = True
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._record(name, elapsed_ms, hit)
+        columns, rows = cached
+        return {
+            "name": name,
+            "build_id": build_id,
+            "cached": hit,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "columns": columns,
+            "rows": [list(r) for r in rows],
+        }
+
+    async def run_async(self, name, params=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.run, name, params)
+
+    # --- reporting ---
+
+    def stats(self):
+        with self._lock:
+            per_query = {}
+            calls = hits = 0
+            for name, s in sorted(self._stats.items()):
+                calls += s["calls"]
+                hits += s["hits"]
+                per_query[name] = {
+                    "calls": s["calls"],
+                    "hits": s["hits"],
+                    "hit_rate": round(s["hits"] / s["calls"], 4),
+                    "mean_ms": round(s["total_ms"] / s["calls"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                }
+            return {
+                "build_id": self._build_id,
+                "cached_results": len(self._cache),
+                "calls": calls,
+                "hit_rate": round(hits / calls, 4) if calls else None,
+                "errors": dict(sorted(self._errors.items())),
+                "queries": per_query,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+
+''' ===== HTTP SERVER (asyncio) ===== '''
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def _coerce(value):
+    # query-string values arrive as text; compare numbers as numbers
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    if re.fullmatch(r"-?\d+\.\d*", value):
+        return float(value)
+    return value
+
+
+async def _handle_request(service, method, target):
+    if method != "GET":
+        return 405, {"error": "only GET is supported"}
+    url = urlsplit(target)
+    path = unquote(url.path).rstrip("/") or "/"
+    params = {k: _coerce(v) for k, v in parse_qsl(url.query)}
+
+    if path == "/health":
+        return 200, {"status": "ok", "build_id": database_build_id(service.db_path)}
+    if path == "/queries":
+        return 200, {"queries": service.list_queries()}
+    if path == "/stats":
+        return 200, service.stats()
+    if path.startswith("/queries/"):
+        return 200, await service.run_async(path[len("/queries/"):], params)
+    return 404, {"error": f"no route for {path}"}
+
+
+def make_client_handler(service):
+
+    async def handle(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass # headers are not needed
+            try:
+                method, target, _ = request_line.split(" ", 2)
+            except ValueError:
+                method = target = None
+                status, body = 400, {"error": "malformed request line"}
+            if target is not None:
+                try:
+                    status, body = await _handle_request(service, method, target)
+                except QueryError as error_message:
+                    status, body = error_message.status, {"error": str(error_message)}
+                except Exception as error_message:
+                    # anything unexpected still gets a JSON answer instead of a dropped connection
+                    service.record_error(urlsplit(target).path)
+                    status, body = 500, {"error": f"{type(error_message).__name__}: {error_message}"}
+            payload = json.dumps(body, default=str).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(service, host="127.0.0.1", port=8765):
+    server = await asyncio.start_server(make_client_handler(service), host, port)
+    print(f"Query service on http://{host}:{port} — {len(service.queries)} queries, db: {service.db_path}")
+    async with server:
+        await server.serve_forever()
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only query service for games_analytics.db")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.db, pool_size=args.pool_size, cache_size=args.cache_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopping query service.")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
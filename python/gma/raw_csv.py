@@ -0,0 +1,261 @@
+"""
+Module Name: raw_csv.py
+Purpose:
+    One reader for the raw platform files in data_raw/<platform>/. Each file
+    may be stored as plain .csv, gzip (.csv.gz) or zstandard (.csv.zst):
+
+        path = raw_file("steam", "prices.csv")   # data_raw/steam/prices.csv[.gz|.zst]
+        df = read_raw_csv(path)                   # same DataFrame as pd.read_csv on the plain file
+
+    Compressed files are decompressed as a stream; the decompressed text is
+    cut into blocks at record boundaries and the blocks are parsed by a pool
+    of threads (pandas' CSV tokenizer releases the GIL), then concatenated.
+
+        python -m gma.raw_csv compress --format gz     # write .csv.gz next to every raw .csv
+        python -m gma.raw_csv check                    # parallel reader == pd.read_csv on every raw file
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - When a file exists in more than one form, the plain .csv wins, then .gz, then .zst.
+    - .csv.zst needs the zstandard package (or Python 3.14's compression.zstd);
+      .csv and .csv.gz need nothing beyond the standard library.
+    - Block boundaries are newlines outside double quotes, so quoted fields
+      containing line breaks are never split.
+    - Blocks are combined with pd.concat, which settles column types the
+      same way pandas does across its own internal chunks (int + float -> float).
+    - pandas is imported lazily so `gma validate` can check raw headers
+      without loading it.
+"""
+
+import argparse
+import gzip
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from gma.paths import RAW_BASE
+
+SUFFIXES = ["", ".gz", ".zst"] # tried in this order after the plain file name
+BLOCK_BYTES = 8 * 1024 * 1024 # decompressed bytes per parse task
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024 # smaller plain files are read by pd.read_csv directly
+PLATFORMS = ["playstation", "steam", "xbox"]
+
+
+''' ===== LOCATING / OPENING ===== '''
+
+def raw_file(platform, name):
+    """data_raw/<platform>/<name> in whichever form exists (plain path if none does)."""
+    base = RAW_BASE / platform / name
+    for suffix in SUFFIXES:
+        path = base.with_name(base.name + suffix)
+        if path.exists():
+            return path
+    return base
+
+
+def compression_of(path):
+    name = str(path)
+    if name.endswith(".gz"):
+        return "gz"
+    if name.endswith(".zst"):
+        return "zst"
+    return None
+
+
+def _zstd_module():
+    try:
+        from compression import zstd # Python 3.14+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise RuntimeError(".csv.zst inputs need the zstandard package (pip install zstandard)") from None
+
+
+def open_raw(path):
+    """Binary stream of the decompressed file contents."""
+    kind = compression_of(path)
+    if kind == "gz":
+        return gzip.open(path, "rb")
+    if kind == "zst":
+        zstd = _zstd_module()
+        if hasattr(zstd, "ZstdDecompressor"): # zstandard package - buffered for readline()
+            return io.BufferedReader(zstd.ZstdDecompressor().stream_reader(
+                open(path, "rb"), read_across_frames=True, closefd=True))
+        return zstd.open(path, "rb")
+    return open(path, "rb")
+
+
+def uncompressed_size(path, sample_bytes=4 * 1024 * 1024):
+    """File size after decompression - exact for plain files, estimated from the first block otherwise."""
+    size = os.path.getsize(path)
+    if compression_of(path) is None:
+        return size
+    with open(path, "rb") as raw:
+        stream = gzip.GzipFile(fileobj=raw) if compression_of(path) == "gz" else None
+        if stream is None:
+            zstd = _zstd_module()
+            stream = (zstd.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+                      if hasattr(zstd, "ZstdDecompressor") else zstd.ZstdFile(raw))
+        out = len(stream.read(sample_bytes))
+        used = raw.tell()
+    return size if not used else int(size * out / used)
+
+
+def read_header(path):
+    """Column names from the first line (no pandas)."""
+    import csv
+    with io.TextIOWrapper(open_raw(path), encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+''' ===== PARALLEL PARSING ===== '''
+
+def _last_record_end(data):
+    # position of the last newline that is outside double quotes (-1 if none); `data` starts at a record start
+    after = 0
+    pos = len(data)
+    quotes = data.count(b'"')
+    while True:
+        newline = data.rfind(b"\n", 0, pos)
+        if newline < 0:
+            return -1
+        after += data.count(b'"', newline, pos)
+        if (quotes - after) % 2 == 0:
+            return newline
+        pos = newline
+
+
+def record_blocks(stream, block_bytes=BLOCK_BYTES):
+    """Yield the stream in ~block_bytes pieces, each ending at a record boundary."""
+    carry = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            if carry:
+                yield carry
+            return
+        data = carry + data
+        cut = _last_record_end(data)
+        if cut < 0: # one record longer than a block - keep reading
+            carry = data
+            continue
+        yield data[:cut + 1]
+        carry = data[cut + 1:]
+
+
+def _parse_block(header, block, kwargs):
+    import pandas as pd
+    return pd.read_csv(io.BytesIO(header + block), **kwargs)
+
+
+def read_raw_csv(path, workers=None, block_bytes=BLOCK_BYTES, min_bytes=PARALLEL_MIN_BYTES, **kwargs):
+    """
+    pd.read_csv for a raw file in any of the supported forms. Compressed files and
+    plain files of at least `min_bytes` are parsed in blocks by `workers` threads (default: CPU count).
+    Streaming arguments (chunksize / iterator / nrows) go straight to pd.read_csv.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    workers = workers or os.cpu_count() or 1
+    streaming = any(kwargs.get(k) for k in ("chunksize", "iterator")) or "nrows" in kwargs
+    if streaming or workers == 1 or (compression_of(path) is None and os.path.getsize(path) < min_bytes):
+        if compression_of(path) is None:
+            return pd.read_csv(path, **kwargs)
+        return pd.read_csv(open_raw(path), **kwargs)
+
+    frames = []
+    with open_raw(path) as stream, ThreadPoolExecutor(workers, thread_name_prefix="gma-csv") as pool:
+        header = stream.readline()
+        pending = deque()
+        for block in record_blocks(stream, block_bytes):
+            pending.append(pool.submit(_parse_block, header, block, kwargs))
+            if len(pending) > 2 * workers: # bounded read-ahead: at most ~2 blocks per worker in memory
+                frames.append(pending.popleft().result())
+        frames += [future.result() for future in pending]
+    if not frames:
+        return pd.read_csv(io.BytesIO(header), **kwargs)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+''' ===== COMPRESS / CHECK ===== '''
+
+def raw_files(platforms=None):
+    """Every raw file that exists, in every form (games.csv and games.csv.gz are both listed)."""
+    files = []
+    for platform in platforms or PLATFORMS:
+        files += sorted(p for p in (RAW_BASE / platform).glob("*.csv*") if compression_of(p) or p.suffix == ".csv")
+    return files
+
+
+def compress(fmt="gz", remove=False, platforms=None, level=None):
+    """Write <name>.csv.gz / .csv.zst next to each plain raw .csv (streamed, never fully in memory)."""
+    for platform in platforms or PLATFORMS:
+        for path in sorted((RAW_BASE / platform).glob("*.csv")):
+            target = path.with_name(path.name + "." + fmt)
+            tmp = target.with_name(target.name + ".tmp")
+            start = time.perf_counter()
+            with open(path, "rb") as src:
+                if fmt == "gz":
+                    dst = gzip.open(tmp, "wb", compresslevel=level or 6)
+                else:
+                    zstd = _zstd_module()
+                    dst = (zstd.ZstdCompressor(level=level or 3).stream_writer(open(tmp, "wb"))
+                           if hasattr(zstd, "ZstdCompressor") else zstd.open(tmp, "wb", level=level or 3))
+                with dst:
+                    while chunk := src.read(BLOCK_BYTES):
+                        dst.write(chunk)
+            tmp.replace(target)
+            before, after = path.stat().st_size, target.stat().st_size
+            print(f"  ✔ {target.relative_to(RAW_BASE)}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+                  f"({before / max(after, 1):.1f}x, {time.perf_counter() - start:.1f}s)")
+            if remove:
+                path.unlink()
+
+
+def check(platforms=None, block_bytes=256 * 1024):
+    """Block-parallel reader == pd.read_csv on the decompressed text, for every raw file. Returns {file: bool}."""
+    import pandas as pd
+
+    results = {}
+    for path in raw_files(platforms):
+        with open_raw(path) as stream:
+            expected = pd.read_csv(io.BytesIO(stream.read()))
+        start = time.perf_counter()
+        actual = read_raw_csv(path, workers=max(os.cpu_count() or 1, 2), block_bytes=block_bytes, min_bytes=0)
+        ok = actual.equals(expected)
+        print(f"  {'✔' if ok else '✘'} {path.relative_to(RAW_BASE)}: {len(actual)} rows "
+              f"({time.perf_counter() - start:.2f}s)")
+        results[str(path)] = ok
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gma raw", description="compressed raw inputs (data_raw/)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("compress", help="write .csv.gz / .csv.zst copies of the plain raw files")
+    c.add_argument("--format", choices=["gz", "zst"], default="gz")
+    c.add_argument("--level", type=int)
+    c.add_argument("--remove", action="store_true", help="delete the plain .csv afterwards")
+    c.add_argument("--platform", nargs="*", choices=PLATFORMS)
+    k = sub.add_parser("check", help="compare the block-parallel reader with pd.read_csv")
+    k.add_argument("--platform", nargs="*", choices=PLATFORMS)
+    args = parser.parse_args(argv)
+
+    if args.command == "compress":
+        compress(args.format, args.remove, args.platform, args.level)
+        return 0
+    outcome = check(args.platform)
+    return 0 if all(outcome.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,681 @@
+"""
+Module Name: sampling.py
+Purpose:
+    Reproducible stratified sample of players for fast exploratory analysis
+    (stage "build-sample", `gma sample build`).
+        - players are stratified by platform and country; every stratum keeps
+          the same fraction of its players (at least MIN_PER_STRATUM)
+        - sampled players carry their complete libraries (all purchases) and
+          the prices of the games they own
+        - games, population and lookup tables are copied whole
+        - the result is database/games_analytics_sample.db, with the sampling
+          weights in sample_weights / sample_strata
+
+    estimate() runs any sql/ query on the sample and scales totals back up to
+    the full population, with jackknife confidence intervals:
+
+        estimate("01_market_penetration.total_players_per_country")
+        -> country | total_players | total_players_low | total_players_high
+
+Dataset:
+    Input:   database/games_analytics.db
+    Output:  database/games_analytics_sample.db
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Selection is by a seeded hash of (platform, playerid), keyed by
+      seed_key(seed) - a fixed-length digest, so every seed has its own key.
+      The same seed and data always give the same sample, and growing the
+      fraction keeps every previously sampled player.
+    - Players within each stratum are dealt into REPLICATE_GROUPS groups; the
+      confidence intervals use the delete-a-group jackknife over those groups.
+    - Columns built from COUNT(...) / SUM(...) are weighted per stratum: every
+      sampled player counts N_h / n_h (sample_weights.weight - small strata
+      keep at least MIN_PER_STRATUM players, so their weights are lower). The
+      query is run once per cell (players sharing a weight and a replicate
+      group), with the outer HAVING / LIMIT and any outer WHERE on a ranking of
+      totals (rn <= 10) removed - the full-sample run decides the rows - and
+      ROUND left out; the cell totals are multiplied by their weight and
+      summed per row. A total may sit inside ROUND / CAST / COALESCE and be
+      multiplied or divided by per-row values (units x price, players /
+      population): see is_total. Averages, shares of another total and
+      per-player rows are left as they are. Override with scale=[...].
+    - Weighted totals assume a player's contribution does not depend on other
+      players (true for COUNT / SUM over players and purchases); a ranking
+      inside a CTE orders each cell's rows, but only filters the full-sample run.
+    - Estimates are for exploration; confirm on the full database.
+      `python -m gma.sampling check` does that for the sql/ queries.
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from gma.paths import DB_DIR, DB_PATH
+from gma.sql_catalog import as_temp_view, load_catalog, ordered_views, queries
+
+SAMPLE_DB_PATH = DB_DIR / "games_analytics_sample.db"
+DEFAULT_FRACTION = 0.05
+MIN_PER_STRATUM = 2
+REPLICATE_GROUPS = 10
+
+# tables copied unchanged into the sample (if present in the full database)
+COPIED_TABLES = ["games", "population", "population_by_year", "countries", "country_aliases", "game_titles"]
+
+
+''' ===== BUILD ===== '''
+
+def seed_key(seed):
+    """16-character hash key for a seed (hash_pandas_object needs exactly 16 bytes)."""
+    return hashlib.blake2b(str(seed).encode(), digest_size=8).hexdigest()
+
+
+def select_players(players, fraction=DEFAULT_FRACTION, seed=0, min_per_stratum=MIN_PER_STRATUM,
+                   groups=REPLICATE_GROUPS):
+    """
+    Choose the sample from a players frame (playerid, platform, country).
+    Returns one row per sampled player with its stratum sizes, weight and
+    replicate group.
+    """
+    frame = players[["playerid", "platform", "country"]].copy()
+    frame["country"] = frame["country"].fillna("").astype(str)
+    key = pd.DataFrame({"platform": frame["platform"].str.lower(), "playerid": frame["playerid"]})
+    frame["hash"] = pd.util.hash_pandas_object(key, index=False, hash_key=seed_key(seed)).to_numpy()
+
+    # within each stratum keep the n_h players with the smallest hashes (a seeded random order)
+    frame = frame.sort_values(["platform", "country", "hash"], kind="stable")
+    strata = frame.groupby(["platform", "country"], sort=False)
+    frame["stratum_size"] = strata["playerid"].transform("size")
+    frame["position"] = strata.cumcount()
+    sample_size = np.ceil(frame["stratum_size"] * fraction).clip(lower=min_per_stratum)
+    frame["sample_size"] = np.minimum(sample_size, frame["stratum_size"]).astype("int64")
+    sample = frame[frame["position"] < frame["sample_size"]].copy()
+
+    sample["weight"] = sample["stratum_size"] / sample["sample_size"]
+    sample["replicate"] = sample["position"] % groups # balanced within each stratum
+    return sample[["playerid", "platform", "country", "stratum_size", "sample_size", "weight", "replicate"]]
+
+
+def _copy_schema(conn, table):
+    row = conn.execute("SELECT sql FROM src.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if row is None:
+        return False
+    conn.execute(row[0])
+    return True
+
+
+def build(fraction=DEFAULT_FRACTION, seed=0, min_per_stratum=MIN_PER_STRATUM, src_path=DB_PATH,
+          sample_path=SAMPLE_DB_PATH):
+    if not src_path.exists():
+        raise FileNotFoundError(f"source database not found: {src_path} (run `gma run build-db` first)")
+    start = time.perf_counter()
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    try:
+        players = pd.read_sql("SELECT playerid, platform, country FROM players", src)
+    finally:
+        src.close()
+    sample = select_players(players, fraction, seed, min_per_stratum)
+
+    tmp_path = sample_path.with_suffix(".db.tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{src_path}?mode=ro",))
+        sample.to_sql("sample_weights", conn, index=False)
+        conn.execute("CREATE INDEX ix_sample_weights ON sample_weights (playerid, platform)")
+
+        for table in ["players", "purchases", "prices", *COPIED_TABLES]:
+            _copy_schema(conn, table)
+        conn.execute("""
+            INSERT INTO players
+            SELECT p.* FROM src.players AS p
+            JOIN sample_weights AS w ON w.playerid = p.playerid AND w.platform = p.platform
+        """)
+        # complete libraries: every purchase of a sampled player
+        conn.execute("""
+            INSERT INTO purchases
+            SELECT pu.* FROM src.purchases AS pu
+            WHERE EXISTS (SELECT 1 FROM sample_weights AS w
+                          WHERE w.playerid = pu.playerid AND lower(w.platform) = lower(pu.platform))
+        """)
+        conn.execute("CREATE INDEX ix_purchases_player ON purchases (playerid)")
+        conn.execute("CREATE INDEX ix_purchases_game ON purchases (gameid, platform)")
+        # prices of the games those players own
+        conn.execute("""
+            INSERT INTO prices
+            SELECT pr.* FROM src.prices AS pr
+            WHERE EXISTS (SELECT 1 FROM purchases AS pu
+                          WHERE pu.gameid = pr.gameid AND lower(pu.platform) = lower(pr.platform))
+        """)
+        for table in COPIED_TABLES:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+                conn.execute(f"INSERT INTO {table} SELECT * FROM src.{table}")
+
+        strata = (sample.groupby(["platform", "country"], as_index=False)
+                  .agg(population=("stratum_size", "first"), sampled=("sample_size", "first"),
+                       weight=("weight", "first")))
+        strata.to_sql("sample_strata", conn, index=False)
+        info = pd.DataFrame({"key": ["fraction", "seed", "min_per_stratum", "replicate_groups", "source"],
+                             "value": [fraction, seed, min_per_stratum, REPLICATE_GROUPS, str(src_path)]})
+        info.astype(str).to_sql("sample_info", conn, index=False)
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ["players", "purchases", "prices"]}
+    finally:
+        conn.close()
+    tmp_path.replace(sample_path)
+
+    print(f"  ✔ {sample_path.name}: {counts['players']} of {len(players)} players "
+          f"({len(strata)} strata), {counts['purchases']} purchases, {counts['prices']} prices "
+          f"({time.perf_counter() - start:.1f}s)")
+    return counts
+
+
+''' ===== ESTIMATION ===== '''
+
+FUNCTION_RE = re.compile(r"^(\w+)\s*\(")
+ANY_AGGREGATE_RE = re.compile(r"\b(?:COUNT|SUM|TOTAL|AVG|MIN|MAX|GROUP_CONCAT)\s*\(", re.IGNORECASE)
+WRAPPERS = ("ROUND", "CAST", "COALESCE", "IFNULL")
+CAST_TYPE_RE = re.compile(r"(?is)\s+AS\s+\w+(?:\s*\([^()]*\))?\s*$")
+PLAYER_ID_RE = re.compile(r"(?:player|buyer)id$", re.IGNORECASE) # COUNT(DISTINCT) adds up over players only
+KEY_NAME_RE = re.compile(r"(?:^|_)(?:\w*id|year|month|quarter|rn|rank)$", re.IGNORECASE)
+
+
+def _top_level_split(text, sep=","):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _outer_select_list(sql):
+    # the last SELECT ... FROM at parenthesis depth 0 is the statement's own select list
+    depth, positions = 0, []
+    upper = sql.upper()
+    for i, ch in enumerate(sql):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0 and upper.startswith("SELECT", i) and not upper[i - 1:i].isalnum():
+            positions.append(i)
+    if not positions:
+        return []
+    start = positions[-1] + len("SELECT")
+    depth = 0
+    for i in range(start, len(sql)):
+        ch = sql[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0 and upper.startswith("FROM", i) and not upper[i - 1].isalnum():
+            return _top_level_split(sql[start:i])
+    return _top_level_split(sql[start:])
+
+
+def _split_operators(text, operators):
+    # [(operator, operand), ...] at parenthesis depth 0; the first operand has operator None
+    parts, depth, start, op = [], 0, 0, None
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch in operators and depth == 0:
+            parts.append((op, text[start:i]))
+            op, start = ch, i + 1
+    parts.append((op, text[start:]))
+    return parts
+
+
+def _closing(text, start):
+    # index of the parenthesis closing the one opened at text[start]
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def _without_parens(expr):
+    expr = expr.strip()
+    while expr.startswith("(") and _closing(expr, 0) == len(expr) - 1:
+        expr = expr[1:-1].strip()
+    return expr
+
+
+def is_total(expr, defined=lambda name: False):
+    """
+    True when `expr` adds up over players: COUNT / SUM (or a COUNT(DISTINCT)
+    of a player id), optionally inside ROUND / CAST / COALESCE / IFNULL,
+    multiplied or divided by per-row values (not by another aggregate), or a
+    sum of such terms. defined(name) says whether a bare column is a total defined
+    elsewhere in the statement (a CTE or subquery).
+    """
+    expr = _without_parens(expr)
+    terms = [term for _, term in _split_operators(expr, "+-") if term.strip()]
+    if len(terms) > 1:
+        return all(is_total(term, defined) for term in terms)
+    factors = _split_operators(expr, "*/")
+    if len(factors) > 1:
+        totals = [(op, factor) for op, factor in factors if is_total(factor, defined)]
+        others = [(op, factor) for op, factor in factors if not is_total(factor, defined)]
+        return (len(totals) == 1 and totals[0][0] != "/"
+                and not any(ANY_AGGREGATE_RE.search(factor) for _, factor in others))
+
+    call = FUNCTION_RE.match(expr)
+    if call:
+        end = _closing(expr, call.end() - 1)
+        name, args, rest = call.group(1).upper(), expr[call.end():end], expr[end + 1:].strip()
+        if name in WRAPPERS:
+            if rest:
+                return False
+            first, *others = _top_level_split(args)
+            if name == "CAST":
+                first = CAST_TYPE_RE.sub("", first)
+            return is_total(first, defined) and not any(ANY_AGGREGATE_RE.search(arg) for arg in others)
+        if name in ("COUNT", "SUM", "TOTAL") and (not rest or rest.upper().startswith("OVER")):
+            distinct = re.match(r"(?is)^\s*DISTINCT\s+(.*)$", args)
+            return not distinct or bool(PLAYER_ID_RE.search(distinct.group(1).strip()))
+        return False
+    if re.fullmatch(r"[\w.\"]+", expr):
+        return defined(expr.replace('"', "").split(".")[-1].lower())
+    return False
+
+
+def _alias_definitions(sql, alias):
+    # every expression defined "AS alias" anywhere in the statement (select lists of CTEs and subqueries)
+    found = []
+    for match in re.finditer(rf"(?i)\bAS\s+\"?{re.escape(alias)}\"?(?![\w\"])", sql):
+        depth, i = 0, match.start() - 1
+        while i >= 0:
+            ch = sql[i]
+            if ch == ")":
+                depth += 1
+            elif ch == "(":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0 and ch == ",":
+                break
+            elif depth == 0 and re.match(r"(?i)(?:SELECT|DISTINCT)\b", sql[i:]) and not re.match(r"[\w]", sql[i - 1:i]):
+                i += len(re.match(r"(?i)\w+", sql[i:]).group(0)) - 1
+                break
+            i -= 1
+        found.append(sql[i + 1:match.start()].strip())
+    return found
+
+
+def additive_columns(sql, columns):
+    """
+    Columns that are totals (see is_total) and so scale with the number of
+    players - either in the outer select list or, for aliases defined in a
+    CTE / subquery, wherever the alias is defined.
+    """
+    sql = re.sub(r"--[^\n]*", "", sql)
+    expressions = {}
+    for item in _outer_select_list(sql):
+        match = re.match(r"(?is)^\s*(.*?)\s+AS\s+\"?(\w+)\"?\s*$", item.strip())
+        if match:
+            expressions[match.group(2).lower()] = match.group(1)
+        else:
+            expressions[item.strip().split(".")[-1].lower()] = item.strip()
+
+    def defined(name, seen=()):
+        if name in seen:
+            return False
+        return any(is_total(expr, lambda other: defined(other, (*seen, name)))
+                   for expr in _alias_definitions(sql, name))
+
+    return [col for col in columns if is_total(expressions.get(col.lower(), col), defined)]
+
+
+ROW_FILTER_RE = re.compile(r"\b(WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b", re.IGNORECASE)
+RANKING_RE = re.compile(r"\b(?:ROW_NUMBER|RANK|DENSE_RANK|NTILE)\s*\([^()]*\)\s*OVER\s*\(", re.IGNORECASE)
+
+
+def _ranked_by_totals(sql):
+    # aliases of rankings ordered by an aggregate ("ROW_NUMBER() OVER (... ORDER BY COUNT(*) DESC) AS rn")
+    aliases = []
+    for match in RANKING_RE.finditer(sql):
+        end = _closing(sql, match.end() - 1)
+        alias = re.match(r"(?is)\s*AS\s+\"?(\w+)", sql[end + 1:])
+        if alias and ANY_AGGREGATE_RE.search(sql[match.end():end]):
+            aliases.append(alias.group(1))
+    return aliases
+
+
+def _without_row_filters(sql):
+    """
+    The statement without its outer HAVING / LIMIT, and without outer WHERE
+    conditions on a ranking of totals (WHERE rn <= 10); CTEs and subqueries
+    are untouched. Cell totals are matched to the full-sample rows by key, so
+    every contribution to a row has to come back, not only a cell's top rows.
+    """
+    text = sql.strip().rstrip(";")
+    depth, clauses, i = 0, [], 0
+    while i < len(text):
+        ch = text[i]
+        if text.startswith("--", i): # comments and string literals are skipped whole
+            end = text.find("\n", i)
+            i = end if end >= 0 else len(text)
+            continue
+        if ch in "'\"":
+            end = text.find(ch, i + 1)
+            i = end + 1 if end >= 0 else len(text)
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0 and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == "_")):
+            match = ROW_FILTER_RE.match(text, i)
+            if match:
+                clauses.append((i, match.group(1).split()[0].upper()))
+        i += 1
+    ranked = _ranked_by_totals(text)
+    kept, ends = [text[:clauses[0][0]] if clauses else text], [start for start, _ in clauses[1:]] + [len(text)]
+    for (start, kind), end in zip(clauses, ends):
+        if kind == "WHERE" and ranked:
+            body = text[start + len("WHERE"):end]
+            conditions = [body] if re.search(r"(?i)\bBETWEEN\b", body) else re.split(r"(?i)\bAND\b", body)
+            conditions = [c for c in conditions if not any(re.search(rf"\b{re.escape(r)}\b", c) for r in ranked)]
+            if conditions:
+                kept.append("WHERE " + " AND ".join(c.strip() for c in conditions))
+        elif kind not in ("HAVING", "LIMIT"):
+            kept.append(text[start:end])
+    return " ".join(part.strip() for part in kept)
+
+
+def _sample_connection(sample_path, catalog, names, exclude_group=None, cells=None):
+    """
+    In-memory connection over the sample. With exclude_group, that replicate
+    group's players are left out. With cells (playerid, platform, cell), the
+    players / purchases views only show the cell named in sample_cell.
+    """
+    conn = sqlite3.connect("file::memory:", uri=True)
+    conn.execute("ATTACH DATABASE ? AS s", (f"file:{sample_path}?mode=ro",))
+    if cells is not None:
+        cells.to_sql("sample_cells", conn, index=False)
+        conn.execute("CREATE TABLE sample_cell (id INTEGER)")
+        conn.execute("INSERT INTO sample_cell VALUES (-1)")
+    tables = [r[0] for r in conn.execute("SELECT name FROM s.sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        platform = "lower(w.platform) = lower(t.platform)" if table == "purchases" else "w.platform = t.platform"
+        if cells is not None and table in ("players", "purchases"):
+            # each cell's rows copied once, indexed by cell, so a cell run reads only its own players
+            columns = ", ".join(f"t.{r[1]}" for r in conn.execute(f"PRAGMA s.table_info({table})"))
+            conn.execute(f"CREATE TABLE cell_{table} AS SELECT w.cell AS cell_id, {columns} FROM s.{table} AS t "
+                         f"JOIN sample_cells AS w ON w.playerid = t.playerid AND {platform}")
+            conn.execute(f"CREATE INDEX ix_cell_{table} ON cell_{table} (cell_id)")
+            conn.execute(f"CREATE TEMP VIEW {table} AS SELECT {columns.replace('t.', '')} FROM cell_{table} "
+                         f"WHERE cell_id = (SELECT id FROM sample_cell)")
+            continue
+        where = ""
+        if exclude_group is not None and table in ("players", "purchases"):
+            where = (f" WHERE NOT EXISTS (SELECT 1 FROM s.sample_weights AS w WHERE w.playerid = t.playerid"
+                     f" AND {platform} AND w.replicate = {int(exclude_group)})")
+        conn.execute(f"CREATE TEMP VIEW {table} AS SELECT * FROM s.{table} AS t{where}")
+    for view in ordered_views(catalog, names):
+        conn.execute(as_temp_view(view.sql))
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def _row_index(df, keys):
+    # rows identified by their key columns; missing keys as None on every side (an all-NULL column
+    # comes back as object None, a mixed one as NaN in a str column)
+    if not keys:
+        return df.index
+    frame = df[keys].astype(object)
+    frame = frame.where(frame.notna(), None)
+    return pd.MultiIndex.from_frame(frame) if len(keys) > 1 else pd.Index(frame[keys[0]], dtype=object)
+
+
+def _aligned(df, keys, index, columns):
+    # a run's value columns in the row order of the full-sample result (missing rows -> NaN)
+    df = df.drop_duplicates(keys) if keys else df.reset_index(drop=True)
+    values = df[columns].set_axis(_row_index(df, keys))
+    return values.reindex(index).to_numpy(dtype=np.float64)
+
+
+def _weighted_totals(sql, scaled, keys, index, weights, sample_path, catalog, names):
+    """
+    Totals weighted by stratum: the query is run once per cell (players with
+    the same weight N_h / n_h and replicate group) and each cell's totals are
+    multiplied by its weight. Returns (point, replicates) for the scaled
+    columns: arrays [row, column] and [group, row, column].
+    """
+    weights = weights.copy()
+    weights["cell"] = weights.groupby(["weight", "replicate"], sort=True).ngroup()
+    cells = weights.groupby("cell").agg(weight=("weight", "first"), group=("replicate", "first"),
+                                        players=("playerid", "size"))
+    groups = np.sort(weights["replicate"].unique())
+
+    conn = _sample_connection(sample_path, catalog, names, cells=weights[["playerid", "platform", "cell"]])
+    # cell totals are summed unrounded: ROUND(x, 4) of one cell's share of a percentage can lose most of it
+    conn.create_function("round", 1, lambda x: x, deterministic=True)
+    conn.create_function("round", 2, lambda x, digits: x, deterministic=True)
+    cell_sql = _without_row_filters(sql)
+    totals = {}
+    try:
+        for cell in cells.index:
+            conn.execute("PRAGMA query_only = OFF")
+            conn.execute("UPDATE sample_cell SET id = ?", (int(cell),))
+            conn.execute("PRAGMA query_only = ON")
+            totals[cell] = np.nan_to_num(_aligned(pd.read_sql(cell_sql, conn), keys, index, scaled))
+    finally:
+        conn.close()
+
+    point = np.zeros((len(index), len(scaled)))
+    replicates = np.zeros((len(groups), len(index), len(scaled)))
+    for weight, members in cells.groupby("weight"):
+        # one weight class; its replicate estimates drop a group and reweight the rest, n / (n - n_g)
+        class_total = sum(totals[cell] for cell in members.index)
+        point += weight * class_total
+        sampled = members["players"].sum()
+        by_group = members.reset_index().set_index("group")
+        for g, group in enumerate(groups):
+            if group not in by_group.index:
+                replicates[g] += weight * class_total
+                continue
+            dropped = by_group.loc[group]
+            if dropped["players"] == sampled: # the class sits in one group: it adds no variance
+                replicates[g] += weight * class_total
+                continue
+            replicates[g] += weight * sampled / (sampled - dropped["players"]) * (class_total - totals[dropped["cell"]])
+    return point, replicates
+
+
+def estimate_sql(sql, scale=None, confidence=0.95, sample_path=SAMPLE_DB_PATH, catalog=None, names=None):
+    """
+    Run `sql` on the sample; returns a DataFrame with each numeric column
+    weighted up to the population (if it is a total) plus <col>_low / <col>_high
+    confidence bounds.
+    """
+    if not sample_path.exists():
+        raise FileNotFoundError(f"sample not built: {sample_path} (run `gma sample build`)")
+    catalog = catalog if catalog is not None else load_catalog()
+    names = names or []
+
+    conn = _sample_connection(sample_path, catalog, names)
+    try:
+        weights = pd.read_sql("SELECT playerid, platform, weight, replicate FROM sample_weights", conn)
+        result = pd.read_sql(sql, conn)
+    finally:
+        conn.close()
+
+    numeric = [c for c in result.columns if pd.api.types.is_numeric_dtype(result[c])]
+    values = [c for c in numeric if not KEY_NAME_RE.search(c)]
+    keys = [c for c in result.columns if c not in values] # text columns and id/year columns identify a row
+    if scale is not None:
+        scaled = [c for c in scale if c in values]
+    elif any(PLAYER_ID_RE.search(c) for c in keys): # one row per sampled player: nothing to weight up
+        scaled = []
+    else:
+        scaled = additive_columns(sql, values)
+    unscaled = [c for c in values if c not in scaled]
+    index = _row_index(result, keys)
+    groups = np.sort(weights["replicate"].unique())
+
+    # delete-a-group jackknife replicates, one [row, column] array per group
+    replicates = np.zeros((len(groups), len(result), len(values)))
+    if scaled:
+        point, weighted = _weighted_totals(sql, scaled, keys, index, weights, sample_path, catalog, names)
+        result[scaled] = point
+        replicates[:, :, [values.index(c) for c in scaled]] = weighted
+    if unscaled:
+        # averages / ratios are not rescaled: their replicates simply rerun without each group
+        for g, group in enumerate(groups):
+            conn = _sample_connection(sample_path, catalog, names, exclude_group=group)
+            try:
+                rep = pd.read_sql(sql, conn)
+            finally:
+                conn.close()
+            replicates[g][:, [values.index(c) for c in unscaled]] = _aligned(rep, keys, index, unscaled)
+
+    n_groups = len(groups)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    for i, col in enumerate(values):
+        point = result[col].to_numpy(dtype=np.float64)
+        reps = replicates[:, :, i].T
+        # rows missing from a replicate (e.g. past a LIMIT) are skipped; missing from all -> no interval
+        counted = (~np.isnan(reps)).sum(axis=1)
+        mean = np.nansum(reps, axis=1) / np.maximum(counted, 1)
+        margin = z * np.sqrt((n_groups - 1) / n_groups * np.nansum((reps - mean[:, None]) ** 2, axis=1))
+        margin[counted == 0] = np.nan
+        result[f"{col}_low"] = point - margin
+        result[f"{col}_high"] = point + margin
+    result.attrs["scaled_columns"] = scaled
+    return result
+
+
+def estimate(name, scale=None, confidence=0.95, sample_path=SAMPLE_DB_PATH):
+    """estimate_sql() for a named sql/ query (see gma.sql_catalog)."""
+    catalog = load_catalog()
+    if name not in catalog:
+        raise KeyError(f"unknown query: {name}")
+    return estimate_sql(catalog[name].sql, scale, confidence, sample_path, catalog, [name])
+
+
+''' ===== CHECK ===== '''
+
+CHECK_TOLERANCE = 0.1 # largest relative error of a column's total (over the rows both runs return)
+
+
+def _reason(error):
+    # "Execution failed on sql '<statement>': no such table: x" -> "no such table: x"
+    return str(error).rsplit("': ", 1)[-1]
+
+
+def _full_result(sql, catalog, names, src_path):
+    conn = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    try:
+        for view in ordered_views(catalog, names):
+            conn.execute(as_temp_view(view.sql))
+        return pd.read_sql(sql, conn)
+    finally:
+        conn.close()
+
+
+def check(names=None, tolerance=CHECK_TOLERANCE, sample_path=SAMPLE_DB_PATH, src_path=DB_PATH):
+    """
+    Estimate each catalog query on the sample and compare every value column
+    with the full database: the column's total over the rows both return must
+    be within `tolerance`, or else inside the sum of the rows' confidence
+    intervals. A total left unweighted is off by about the sampling fraction,
+    a weighted average by its inverse. Returns True if all match.
+    """
+    catalog = load_catalog()
+    names = names or [q.name for q in queries(catalog)]
+    ok = True
+    for name in names:
+        try:
+            full = _full_result(catalog[name].sql, catalog, [name], src_path)
+        except Exception as error_message: # broken on the full database too: nothing to compare
+            print(f"  ! {name}: {_reason(error_message)}")
+            continue
+        try:
+            est = estimate(name, sample_path=sample_path)
+        except Exception as error_message:
+            print(f"  - {name}: not available on the sample ({_reason(error_message)})")
+            continue
+        values = [c for c in full.columns if f"{c}_low" in est.columns]
+        keys = [c for c in full.columns if c not in values]
+        common = _row_index(est, keys).intersection(_row_index(full, keys))
+        errors, bad = {}, []
+        for col in values:
+            mine, low, high = _aligned(est, keys, common, [col, f"{col}_low", f"{col}_high"]).T
+            truth = _aligned(full, keys, common, [col])[:, 0]
+            known = ~np.isnan(mine) & ~np.isnan(truth)
+            total = np.abs(truth[known]).sum()
+            errors[col] = abs(mine[known].sum() - truth[known].sum()) / total if total else 0.0
+            # sampling noise on a few rows (e.g. each country's top game) may exceed the tolerance,
+            # but then the full-database total stays inside the summed intervals
+            if errors[col] > tolerance and not np.nansum(low[known]) <= truth[known].sum() <= np.nansum(high[known]):
+                bad.append(col)
+        ok &= not bad
+        scaled = est.attrs["scaled_columns"]
+        detail = ", ".join(f"{c}{'*' if c in scaled else ''} {errors[c]:.1%}" for c in values) or "no value columns"
+        print(f"  {'✘' if bad else '✔'} {name} ({len(common)} of {len(full)} rows): {detail}")
+    print(f"  (* weighted by stratum; a column fails when its total is off by more than {tolerance:.0%} "
+          f"and outside its confidence intervals)")
+    return ok
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stratified player sample and scaled estimates")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="(re)build database/games_analytics_sample.db")
+    b.add_argument("--fraction", type=float, default=DEFAULT_FRACTION)
+    b.add_argument("--seed", type=int, default=0)
+    b.add_argument("--min-per-stratum", type=int, default=MIN_PER_STRATUM)
+    e = sub.add_parser("estimate", help="run a named sql/ query on the sample with confidence intervals")
+    e.add_argument("name")
+    e.add_argument("--scale", nargs="*", help="columns to scale as totals (default: COUNT/SUM columns)")
+    e.add_argument("--confidence", type=float, default=0.95)
+    e.add_argument("--limit", type=int, default=20)
+    c = sub.add_parser("check", help="compare the estimates of sql/ queries with the full database")
+    c.add_argument("names", nargs="*")
+    c.add_argument("--tolerance", type=float, default=CHECK_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.fraction, args.seed, args.min_per_stratum)
+        return 0
+
+    if args.command == "check":
+        return 0 if check(args.names, args.tolerance) else 1
+
+    start = time.perf_counter()
+    result = estimate(args.name, args.scale, args.confidence)
+    with pd.option_context("display.width", 200, "display.max_columns", 30):
+        print(result.head(args.limit).to_string(index=False))
+    print(f"\n{len(result)} rows in {time.perf_counter() - start:.2f}s "
+          f"(weighted by stratum: {', '.join(result.attrs['scaled_columns']) or 'none'})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,426 @@
+"""
+Module Name: sketches.py
+Purpose:
+    Approximate analytics for the purchases table. Instead of an exact
+    COUNT(DISTINCT ...) or a full sort over every purchase, small mergeable
+    sketches are built once (stage "build-sketches", after build-db) and
+    stored in games_analytics.db. Dashboards then read and merge a handful of
+    sketches - the cost depends on how many sketches are selected, not on
+    how many purchases exist.
+
+    Sketches:
+        - HyperLogLog   distinct counts (purchasing players)
+        - t-digest      quantiles (purchases per player, estimated spend per player)
+
+    Families stored (table sketches, one row per family / platform / part):
+        purchasers            HLL of purchasing players        part = country
+        game_players          HLL of players who own the game  part = gameid
+        purchases_per_player  t-digest of games per buyer      part = country
+        spend_per_player      t-digest of USD spend per buyer  part = country
+
+        approx_distinct("game_players", parts=["570"])               -> unique owners of one game
+        approx_distinct("purchasers", platforms=["steam"])           -> buyers on Steam, all countries
+        approx_quantiles("spend_per_player", [0.5, 0.9], platforms=["xbox"])
+
+Dataset:
+    Input:   games_analytics.db (players, purchases, prices) or the in-memory clean tables
+    Output:  games_analytics.db (sketches table)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    Error bounds:
+    - HyperLogLog with HLL_PRECISION = 12 (4096 registers): standard error
+      1.04 / sqrt(4096) = 1.6%; about 95% of estimates fall within ±3.3%.
+      Small counts (below ~10,000) use linear counting and are close to
+      exact. Merging sketches does not add error.
+    - t-digest with TDIGEST_COMPRESSION = 200 (at most ~200 centroids):
+      quantile rank error well under 1% in the middle of the distribution
+      and far smaller near the tails (p1, p99). For whole-number data (games
+      per buyer) quantiles are rounded to a whole number.
+    - `python -m gma.sketches check` measures both against exact values.
+    - Players are identified by (platform, playerid): the same numeric id on
+      two platforms is two people.
+    - Empty countries are stored under part = "" (players with no country).
+"""
+
+import argparse
+import math
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from gma.paths import DB_PATH
+
+HLL_PRECISION = 12
+TDIGEST_COMPRESSION = 200
+
+
+''' ===== HYPERLOGLOG ===== '''
+
+def hash_values(frame):
+    """Deterministic 64-bit hash per row (same key -> same hash across runs)."""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(values):
+    # bit length of uint64 values, via frexp on the two 32-bit halves (exact below 2**53)
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def hll_registers(hashes, p=HLL_PRECISION):
+    """(register index, rank) per hash: first p bits pick the register, rank = leading zeros + 1 of the rest."""
+    idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    rank = (64 - p) - _bit_length(rest) + 1
+    return idx, rank.astype(np.uint8)
+
+
+class HyperLogLog:
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        idx, rank = hll_registers(hashes, self.p)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros) # linear counting for small cardinalities
+        return float(raw)
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def to_bytes(self):
+        # sparse (index, rank) pairs while few registers are set - small games stay small
+        nonzero = np.flatnonzero(self.registers)
+        if len(nonzero) * 3 < self.m:
+            pairs = np.empty(len(nonzero), dtype=[("idx", "<u2"), ("rank", "u1")])
+            pairs["idx"], pairs["rank"] = nonzero, self.registers[nonzero]
+            return b"S" + bytes([self.p]) + pairs.tobytes()
+        return b"D" + bytes([self.p]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        kind, p = data[:1], data[1]
+        sketch = cls(p)
+        if kind == b"S":
+            pairs = np.frombuffer(data[2:], dtype=[("idx", "<u2"), ("rank", "u1")])
+            sketch.registers[pairs["idx"]] = pairs["rank"]
+        else:
+            sketch.registers = np.frombuffer(data[2:], dtype=np.uint8).copy()
+        return sketch
+
+
+''' ===== T-DIGEST ===== '''
+
+class TDigest:
+    """Merging t-digest (k1 scale function), compressed in one vectorised pass."""
+
+    def __init__(self, compression=TDIGEST_COMPRESSION, means=None, weights=None, vmin=math.inf, vmax=-math.inf,
+                 integer=True):
+        self.compression = compression
+        self.means = np.empty(0) if means is None else means
+        self.weights = np.empty(0) if weights is None else weights
+        self.min = vmin
+        self.max = vmax
+        self.integer = integer # every value seen was a whole number -> quantiles are rounded
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def add_values(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.integer = self.integer and bool(np.all(values == np.round(values)))
+        self.means = np.concatenate([self.means, values])
+        self.weights = np.concatenate([self.weights, weights])
+        return self._compress()
+
+    def merge(self, other):
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.integer = self.integer and other.integer
+        self.means = np.concatenate([self.means, other.means])
+        self.weights = np.concatenate([self.weights, other.weights])
+        return self._compress()
+
+    def _compress(self):
+        order = np.argsort(self.means, kind="stable")
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        # k1 scale: clusters are small near q=0 and q=1, large in the middle
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q_left - 1)
+        bucket = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+        return self
+
+    def quantile(self, q):
+        if not len(self.means):
+            return math.nan
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        x = np.r_[0.0, centres, total]
+        y = np.r_[self.min, self.means, self.max]
+        value = float(np.interp(q * total, x, y))
+        return float(round(value)) if self.integer else value
+
+    def to_bytes(self):
+        header = np.array([self.compression, self.min, self.max, self.integer], dtype="<f8")
+        return b"T" + header.tobytes() + np.stack([self.means, self.weights]).astype("<f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        compression, vmin, vmax, integer = np.frombuffer(data[1:33], dtype="<f8")
+        body = np.frombuffer(data[33:], dtype="<f8").reshape(2, -1)
+        return cls(float(compression), body[0].copy(), body[1].copy(), float(vmin), float(vmax), bool(integer))
+
+
+''' ===== BUILD ===== '''
+
+SKETCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sketches (
+    family TEXT,
+    platform TEXT,
+    part TEXT,
+    kind TEXT,
+    n INTEGER,
+    data BLOB,
+    PRIMARY KEY (family, platform, part)
+) WITHOUT ROWID
+"""
+
+FAMILIES = {
+    "purchasers": "hll",
+    "game_players": "hll",
+    "purchases_per_player": "tdigest",
+    "spend_per_player": "tdigest",
+}
+
+
+def _read_tables(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return {
+            "players": pd.read_sql("SELECT playerid, platform, country FROM players", conn),
+            "purchases": pd.read_sql("SELECT playerid, gameid, platform FROM purchases", conn),
+            "prices": pd.read_sql("SELECT gameid, platform, usd FROM prices", conn),
+        }
+    finally:
+        conn.close()
+
+
+def purchase_frame(players, purchases, prices):
+    """One row per purchase: platform key (lower case), playerid, gameid, country, usd."""
+    pu = purchases[["playerid", "gameid", "platform"]].copy()
+    pu["platform"] = pu["platform"].str.lower() # purchases say "Playstation", players/prices "PlayStation"
+    pl = players[["playerid", "platform", "country"]].copy()
+    pl["platform"] = pl["platform"].str.lower()
+    pl = pl.drop_duplicates(["platform", "playerid"])
+    pr = prices[["gameid", "platform", "usd"]].copy()
+    pr["platform"] = pr["platform"].str.lower()
+    pr = pr.drop_duplicates(["platform", "gameid"], keep="last")
+
+    frame = pu.merge(pl, on=["platform", "playerid"], how="left").merge(pr, on=["platform", "gameid"], how="left")
+    frame["country"] = frame["country"].fillna("").astype(str)
+    return frame
+
+
+def _hll_rows(family, frame, part_col):
+    """Grouped HLL build: one vectorised register pass, then one sketch per (platform, part)."""
+    hashes = hash_values(frame[["platform", "playerid"]])
+    idx, rank = hll_registers(hashes)
+    regs = pd.DataFrame({"platform": frame["platform"].to_numpy(), "part": frame[part_col].astype(str).to_numpy(),
+                         "idx": idx, "rank": rank})
+    regs = regs.groupby(["platform", "part", "idx"], sort=False)["rank"].max().reset_index()
+    rows = []
+    for (platform, part), group in regs.groupby(["platform", "part"], sort=False):
+        sketch = HyperLogLog()
+        sketch.registers[group["idx"].to_numpy()] = group["rank"].to_numpy()
+        rows.append((family, platform, part, "hll", len(group), sketch.to_bytes()))
+    return rows
+
+
+def _tdigest_rows(family, per_player, value_col):
+    rows = []
+    for (platform, part), group in per_player.groupby(["platform", "country"], sort=False):
+        sketch = TDigest().add_values(group[value_col].to_numpy())
+        rows.append((family, platform, part, "tdigest", len(group), sketch.to_bytes()))
+    return rows
+
+
+def build(tables=None, db_path=DB_PATH):
+    """
+    Build every sketch family and store it in the sketches table. `tables`
+    may hold the in-memory players / purchases / prices frames from earlier
+    stages; otherwise they are read from the database.
+    """
+    start = time.perf_counter()
+    tables = tables if tables is not None else _read_tables(db_path)
+    frame = purchase_frame(tables["players"], tables["purchases"], tables["prices"])
+
+    per_player = frame.groupby(["platform", "country", "playerid"], sort=False).agg(
+        purchases=("gameid", "size"), spend=("usd", "sum")).reset_index()
+
+    rows = []
+    rows += _hll_rows("purchasers", frame, "country")
+    rows += _hll_rows("game_players", frame, "gameid")
+    rows += _tdigest_rows("purchases_per_player", per_player, "purchases")
+    rows += _tdigest_rows("spend_per_player", per_player, "spend")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS sketches")
+        conn.execute(SKETCH_SCHEMA)
+        conn.executemany("INSERT INTO sketches VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    size = sum(len(r[5]) for r in rows)
+    print(f"  ✔ sketches: {len(rows)} sketches, {size / 1e6:.2f} MB "
+          f"({len(frame)} purchases, {time.perf_counter() - start:.1f}s)")
+    return len(rows)
+
+
+''' ===== QUERY (merge at query time) ===== '''
+
+def _load(family, platforms=None, parts=None, conn=None, db_path=DB_PATH):
+    owned = conn is None
+    if owned:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        sql, params = "SELECT kind, data FROM sketches WHERE family = ?", [family]
+        if platforms:
+            sql += f" AND platform IN ({', '.join('?' * len(platforms))})"
+            params += [p.lower() for p in platforms]
+        if parts:
+            sql += f" AND part IN ({', '.join('?' * len(parts))})"
+            params += [str(p) for p in parts]
+        return conn.execute(sql, params).fetchall()
+    finally:
+        if owned:
+            conn.close()
+
+
+def merged_sketch(family, platforms=None, parts=None, conn=None, db_path=DB_PATH):
+    """Merge every stored sketch of a family matching the platform / part filters (None if nothing matches)."""
+    merged = None
+    for kind, data in _load(family, platforms, parts, conn, db_path):
+        sketch = HyperLogLog.from_bytes(data) if kind == "hll" else TDigest.from_bytes(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+def approx_distinct(family="purchasers", platforms=None, parts=None, conn=None, db_path=DB_PATH):
+    """Approximate distinct players -> (estimate, low, high), the bounds at ~95% (±2 standard errors)."""
+    sketch = merged_sketch(family, platforms, parts, conn, db_path)
+    if sketch is None:
+        return 0.0, 0.0, 0.0
+    estimate = sketch.estimate()
+    margin = 2 * sketch.relative_error() * estimate
+    return estimate, max(0.0, estimate - margin), estimate + margin
+
+
+def approx_quantiles(family, qs=(0.5, 0.9, 0.99), platforms=None, parts=None, conn=None, db_path=DB_PATH):
+    """Approximate quantiles -> {q: value}."""
+    sketch = merged_sketch(family, platforms, parts, conn, db_path)
+    return {q: (sketch.quantile(q) if sketch is not None else math.nan) for q in qs}
+
+
+''' ===== ACCURACY CHECK ===== '''
+
+def check(db_path=DB_PATH):
+    """Compare sketch answers with exact pandas answers on the current database."""
+    tables = _read_tables(db_path)
+    frame = purchase_frame(tables["players"], tables["purchases"], tables["prices"])
+    per_player = frame.groupby(["platform", "country", "playerid"], sort=False).agg(
+        purchases=("gameid", "size"), spend=("usd", "sum")).reset_index()
+
+    print("Distinct purchasers (HLL):")
+    for platform in [None, *sorted(frame["platform"].unique())]:
+        subset = frame if platform is None else frame[frame["platform"] == platform]
+        exact = len(subset.drop_duplicates(["platform", "playerid"]))
+        estimate, low, high = approx_distinct("purchasers", [platform] if platform else None, db_path=db_path)
+        error = (estimate - exact) / exact * 100 if exact else 0.0
+        print(f"  {platform or 'all':<12} exact {exact:>9}  approx {estimate:>11.0f}  ({error:+.2f}%)  "
+              f"{'✔' if low <= exact <= high else '✘'} within bounds")
+
+    print("Quantiles (t-digest), as rank error in percentage points:")
+    for family, col in [("purchases_per_player", "purchases"), ("spend_per_player", "spend")]:
+        values = np.sort(per_player[col].to_numpy(dtype=np.float64))
+        approx = approx_quantiles(family, (0.01, 0.5, 0.9, 0.99), db_path=db_path)
+        errors = []
+        for q, value in approx.items():
+            rank_low = np.searchsorted(values, value, side="left") / len(values)
+            rank_high = np.searchsorted(values, value, side="right") / len(values)
+            errors.append(0.0 if rank_low <= q <= rank_high else min(abs(rank_low - q), abs(rank_high - q)) * 100)
+        summary = ", ".join(f"p{int(q * 100)}={v:.2f} ({e:.2f})" for (q, v), e in zip(approx.items(), errors))
+        print(f"  {family}: {summary}")
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approximate distinct counts and quantiles from stored sketches")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="(re)build the sketches table in games_analytics.db")
+    d = sub.add_parser("distinct", help="approximate distinct players")
+    d.add_argument("family", nargs="?", default="purchasers", choices=[f for f, k in FAMILIES.items() if k == "hll"])
+    d.add_argument("--platform", nargs="*")
+    d.add_argument("--part", nargs="*", help="countries (purchasers) or gameids (game_players)")
+    q = sub.add_parser("quantiles", help="approximate quantiles")
+    q.add_argument("family", choices=[f for f, k in FAMILIES.items() if k == "tdigest"])
+    q.add_argument("--q", type=float, nargs="*", default=[0.5, 0.9, 0.99])
+    q.add_argument("--platform", nargs="*")
+    q.add_argument("--part", nargs="*", help="countries")
+    sub.add_parser("check", help="compare sketch answers with exact values")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build()
+        return 0
+    if args.command == "check":
+        check()
+        return 0
+
+    start = time.perf_counter()
+    if args.command == "distinct":
+        estimate, low, high = approx_distinct(args.family, args.platform, args.part)
+        print(f"{estimate:.0f} (95% bounds {low:.0f} – {high:.0f})")
+    else:
+        for q_value, value in approx_quantiles(args.family, args.q, args.platform, args.part).items():
+            print(f"p{q_value * 100:g}: {value:.2f}")
+    print(f"\nanswered in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,455 @@
+"""
+Module Name: spill.py
+Purpose:
+    Memory budget for the cleaning stages (`gma run ... --memory-budget 2GB`).
+    When a stage's inputs are estimated to need more memory than the budget,
+    its whole-table operations switch to external (on-disk) versions:
+        - explode / row-wise cleaning   -> read and processed in chunks
+        - dedup (latest row per key)    -> chunks sorted into runs on disk, k-way
+                                           merged by key, reduced one batch of whole
+                                           key groups at a time, then merged back
+                                           into input order
+        - pd.concat of the platforms    -> SpilledFrame blocks streamed straight
+                                           to the master CSV
+
+        budget = MemoryBudget("512MB")
+        rows = budget.chunk_rows(budget.estimate_csv(path)[1])
+        with budget.scratch() as scratch:
+            frame = SpilledFrame(scratch / "players.pkl")
+            for block in external_drop_duplicates(read_csv_chunks(path, rows), ["playerid"], scratch, rows):
+                frame.append(block)
+            write_csv(frame.chunks(), CLEAN_DIR / "players_master.csv", frame.template())
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Output is byte for byte the file the in-memory path writes:
+        - blocks are cast to the dtypes pd.concat gives the whole table
+          (a chunk without NaT has an int year column, the whole table a float one)
+        - dates are parsed with the format pandas infers from the first value of
+          the whole column (gma.dates.DateParser), not re-inferred per chunk
+        - ties are broken by input position, exactly as in gma/dedup.py
+        - datetime columns are written as gma.artifacts.CSV_DATE_FORMAT in
+          every block, as gma.artifacts.write_frame does for the whole table
+          (left to itself, to_csv writes a block whose datetimes are all at
+          midnight date-only)
+    - Estimates come from the first SAMPLE_ROWS rows of each CSV; OVERHEAD
+      allows for the copies whole-table pandas operations make.
+    - Runs are written in blocks of 1/MERGE_BLOCKS of a chunk and a merge
+      buffers about one chunk in total, so one merge pass stays within the
+      budget for inputs up to ~MERGE_BLOCKS times the budget.
+    - Spill files live in a temporary directory (--spill-dir, default the
+      system temp dir) that is removed when the stage ends.
+    - Parity check against the in-memory primitives: python -m gma.spill
+"""
+
+import itertools
+import pickle
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gma.artifacts import CSV_DATE_FORMAT, write_frame
+from gma.dates import DateParser
+from gma.dedup import latest_non_null_per_key, latest_per_key
+from gma.raw_csv import open_raw, read_raw_csv, uncompressed_size
+
+UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+OVERHEAD = 3 # whole-table operations hold ~3 copies of a frame at their peak
+SAMPLE_ROWS = 2_000
+MIN_CHUNK_ROWS = 1_000
+MERGE_BLOCKS = 64
+MIN_BLOCK_ROWS = 256 # smaller merge blocks only add per-block overhead
+POSITION = "_spill_pos"
+
+
+''' ===== BUDGET ===== '''
+
+def parse_size(text):
+    """'512MB', '2g', '1.5GiB' or a plain byte count -> bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"not a memory size: {text!r} (examples: 512MB, 2GB)")
+    return int(float(match.group(1)) * UNITS[match.group(2).lower()])
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+class MemoryBudget:
+    """
+    limit=None means no budget: every stage stays in memory (the default).
+    """
+
+    def __init__(self, limit=None, spill_dir=None):
+        self.limit = parse_size(limit) if isinstance(limit, str) else limit
+        self.spill_dir = spill_dir
+
+    def fits(self, nbytes):
+        return self.limit is None or nbytes * OVERHEAD <= self.limit
+
+    def spills(self, nbytes, what):
+        """True (and says so) when `what` is estimated not to fit in the budget."""
+        if self.fits(nbytes):
+            return False
+        print(f"  {what}: ~{nbytes / 1e6:.1f} MB in memory (x{OVERHEAD} while processing) exceeds the "
+              f"{self.limit / 1e6:.1f} MB budget - processing it in chunks")
+        return True
+
+    def chunk_rows(self, bytes_per_row):
+        """Rows per chunk so that working on one chunk stays within the budget."""
+        if self.limit is None:
+            return None
+        return max(MIN_CHUNK_ROWS, int(self.limit / (OVERHEAD * max(bytes_per_row, 1.0))))
+
+    def estimate_csv(self, path, prepare=None):
+        """
+        (estimated bytes in memory, bytes per input row) for the whole CSV,
+        after `prepare` (e.g. an explode that turns one row into many).
+        """
+        with open_raw(path) as f:
+            head = list(itertools.islice(f, SAMPLE_ROWS + 1))
+        sample = read_raw_csv(path, nrows=SAMPLE_ROWS)
+        if len(sample) == 0:
+            return 0, 0.0
+        if prepare is not None:
+            sample = prepare(sample)
+        per_row = frame_bytes(sample) / len(head[1:])
+        total_rows = uncompressed_size(path) * len(head[1:]) / max(sum(len(line) for line in head), 1)
+        return per_row * total_rows, per_row
+
+    @contextmanager
+    def scratch(self):
+        path = Path(tempfile.mkdtemp(prefix="gma-spill-", dir=self.spill_dir))
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+''' ===== READING IN CHUNKS ===== '''
+
+def _sample_row(df):
+    # one row that is non-null wherever the block has a value: pd.concat of these rows gives
+    # the same dtypes as pd.concat of the blocks themselves (all-NA columns included)
+    if df.empty:
+        return df.iloc[:0]
+    columns = {}
+    for col in df.columns:
+        notna = df[col].notna().to_numpy()
+        pos = int(notna.argmax()) if notna.any() else 0
+        columns[col] = df[col].iloc[pos:pos + 1].reset_index(drop=True)
+    return pd.DataFrame(columns)
+
+
+def combined_template(samples):
+    """Empty frame with the columns / dtypes pd.concat of the sampled blocks would have."""
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return pd.DataFrame()
+    return pd.concat(samples, ignore_index=True, sort=False).iloc[:0]
+
+
+def conform(df, template):
+    """Cast a block to the template's columns and dtypes (values unchanged, as in pd.concat)."""
+    if list(df.columns) != list(template.columns):
+        df = df.reindex(columns=template.columns)
+    for col, dtype in template.dtypes.items():
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_csv_chunks(path, rows, **kwargs):
+    """
+    pd.read_csv in chunks of `rows` (plain or compressed, see gma/raw_csv.py). Columns whose inferred type differs
+    between chunks (ints in one, floats in another) are read with the type a
+    whole-file read settles on.
+    """
+    samples, dtypes = [], {}
+    for chunk in read_raw_csv(path, chunksize=rows, **kwargs):
+        samples.append(_sample_row(chunk))
+        for col, dtype in chunk.dtypes.items():
+            dtypes.setdefault(col, set()).add(str(dtype))
+    template = combined_template(samples)
+    mixed = {col: template[col].dtype for col, seen in dtypes.items() if len(seen) > 1}
+    return read_raw_csv(path, chunksize=rows, dtype=mixed or None, **kwargs)
+
+
+''' ===== SPILLED FRAMES ===== '''
+
+class SpilledFrame:
+    """
+    A table kept on disk as a sequence of pickled blocks. chunks() gives the
+    blocks back cast to the dtypes the whole table would have in memory.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.rows = 0
+        self.samples = []
+        self._file = open(self.path, "wb")
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, df):
+        pickle.dump(df, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.samples.append(_sample_row(df))
+        self.rows += len(df)
+
+    def template(self):
+        return combined_template(self.samples)
+
+    def blocks(self):
+        if not self._file.closed:
+            self._file.flush()
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def chunks(self, template=None):
+        template = self.template() if template is None else template
+        for block in self.blocks():
+            yield conform(block, template)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def concat_chunks(frames):
+    """Stream of blocks equal to pd.concat([f ...], ignore_index=True, sort=False) of the SpilledFrames."""
+    template = combined_template([s for frame in frames for s in frame.samples])
+    for frame in frames:
+        yield from frame.chunks(template)
+
+
+def write_csv(chunks, path, template):
+    """
+    Write blocks to one CSV (header once, no index) - the same bytes
+    gma.artifacts.write_frame writes for the whole table. Returns the row count.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows, header = 0, True
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=header, date_format=CSV_DATE_FORMAT)
+            header = False
+            rows += len(chunk)
+        if header: # no blocks at all - header only, like an empty frame's to_csv
+            template.iloc[:0].to_csv(f, index=False)
+    tmp_path.replace(path)
+    return rows
+
+
+''' ===== EXTERNAL SORT / REDUCE ===== '''
+
+def _same_key_as_last(df, keys):
+    # True for the trailing rows of a key-sorted block whose key equals the last row's (NA == NA)
+    mask = np.ones(len(df), dtype=bool)
+    last = df.iloc[-1]
+    for key in keys:
+        values = df[key]
+        mask &= values.isna().to_numpy() if pd.isna(last[key]) else values.eq(last[key]).fillna(False).to_numpy()
+    return mask
+
+
+def _batched(blocks, n):
+    while True:
+        batch = list(itertools.islice(blocks, n))
+        if not batch:
+            return
+        yield pd.concat(batch, ignore_index=True) if len(batch) > 1 else batch[0]
+
+
+class ExternalSort:
+    """
+    Stable sort of a stream of chunks by `by` (ending with a unique column,
+    e.g. POSITION): each chunk is sorted in memory and written as a run, and
+    iterating merges the runs back from disk.
+    """
+
+    def __init__(self, by, scratch, block_rows):
+        self.by = list(by)
+        self.scratch = Path(scratch)
+        self.block_rows = max(block_rows // MERGE_BLOCKS, MIN_BLOCK_ROWS)
+        self.runs = []
+        self.samples = []
+
+    def add(self, chunk):
+        self.samples.append(_sample_row(chunk))
+        if chunk.empty:
+            return
+        run = SpilledFrame(self.scratch / f"run_{id(self)}_{len(self.runs)}.pkl")
+        chunk = chunk.sort_values(self.by, kind="stable", na_position="last")
+        for start in range(0, len(chunk), self.block_rows):
+            run.append(chunk.iloc[start:start + self.block_rows])
+        run.close()
+        self.runs.append(run)
+
+    def template(self):
+        return combined_template(self.samples)
+
+    def __iter__(self):
+        template = self.template()
+        # the merge holds about one chunk in total: with few runs, each buffer takes several blocks
+        per_buffer = max(MERGE_BLOCKS // max(len(self.runs), 1), 1)
+        readers = [_batched(run.chunks(template), per_buffer) for run in self.runs]
+        buffers = [next(reader, None) for reader in readers]
+        while any(b is not None for b in buffers):
+            live = [i for i, b in enumerate(buffers) if b is not None]
+            merged = pd.concat([buffers[i] for i in live], ignore_index=True)
+            order = merged[self.by].sort_values(self.by, kind="stable", na_position="last").index.to_numpy()
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+
+            # every row up to the earliest-sorting "last buffered row" of a run is final
+            ends = np.cumsum([len(buffers[i]) for i in live])
+            cut = int(rank[ends - 1].min()) + 1
+            yield merged.take(order[:cut]).reset_index(drop=True)
+
+            # each run's buffer is sorted, so what was taken from it is a prefix
+            taken = np.bincount(np.searchsorted(ends, order[:cut], side="right"), minlength=len(live))
+            for slot, i in enumerate(live):
+                left = buffers[i].iloc[taken[slot]:]
+                buffers[i] = left if len(left) else next(readers[i], None)
+
+
+def external_reduce(chunks, keys, reduce, scratch, block_rows, restore_order=True):
+    """
+    Apply `reduce` (a per-key-group operation such as latest_per_key) to a
+    table too large for memory. Rows are sorted by key on disk and `reduce`
+    sees whole key groups only; with restore_order the result comes back in
+    input order, otherwise in key order.
+    """
+    by_key = ExternalSort(keys + [POSITION], scratch, block_rows)
+    offset = 0
+    for chunk in chunks:
+        chunk = chunk.copy()
+        chunk[POSITION] = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        by_key.add(chunk)
+    template = by_key.template()
+
+    def reduced():
+        carry = None
+        for block in itertools.chain(by_key, [None]):
+            if block is not None:
+                block = block if carry is None else pd.concat([carry, block], ignore_index=True)
+                tail = _same_key_as_last(block, keys)
+                first_tail = len(block) - int(np.argmin(tail[::-1])) if not tail.all() else 0
+                carry, block = block.iloc[first_tail:], block.iloc[:first_tail]
+            else:
+                block, carry = carry, None
+            if block is not None and len(block):
+                yield reduce(conform(block.reset_index(drop=True), template))
+
+    if not restore_order:
+        for block in reduced():
+            yield block.drop(columns=[POSITION])
+        return
+    by_position = ExternalSort([POSITION], scratch, block_rows)
+    for block in reduced():
+        by_position.add(block)
+    for block in by_position:
+        yield block.drop(columns=[POSITION])
+
+
+def external_latest_per_key(chunks, keys, order_col, scratch, block_rows, ties="first", missing="oldest"):
+    """latest_per_key (gma/dedup.py) over chunks; rows come back in input order."""
+    return external_reduce(chunks, keys, lambda df: latest_per_key(df, keys, order_col, ties, missing),
+                           scratch, block_rows)
+
+
+def external_drop_duplicates(chunks, keys, scratch, block_rows):
+    """df.drop_duplicates(keys, keep="first") over chunks; rows come back in input order."""
+    return external_reduce(chunks, keys, lambda df: df.drop_duplicates(keys, keep="first"), scratch, block_rows)
+
+
+def external_latest_non_null_per_key(chunks, keys, order_col, scratch, block_rows, ties="last", missing="newest"):
+    """latest_non_null_per_key (gma/dedup.py) over chunks; rows come back sorted by key."""
+    return external_reduce(chunks, keys, lambda df: latest_non_null_per_key(df, keys, order_col, ties, missing),
+                           scratch, block_rows, restore_order=False)
+
+
+''' ===== PARITY CHECK ===== '''
+
+def _csv_text(write):
+    with tempfile.TemporaryDirectory(prefix="gma-spill-check-") as tmp:
+        path = Path(tmp) / "out.csv"
+        write(path)
+        return path.read_text(encoding="utf-8")
+
+
+def _spilled_csv(blocks, scratch, name):
+    frame = SpilledFrame(scratch / f"{name}.pkl")
+    for block in blocks:
+        frame.append(block)
+    frame.close()
+    return _csv_text(lambda path: write_csv(frame.chunks(), path, frame.template()))
+
+
+def check_parity(rows=60_000, seed=0, block_rows=5_000):
+    """
+    Compare the external operations with the in-memory ones on generated
+    data (duplicate keys, equal and missing timestamps, NaN keys, blocks whose
+    dates are all at midnight) byte for byte on the CSVs they produce.
+    Returns {check: bool}.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.to_datetime("2015-01-01") + pd.to_timedelta(rng.integers(0, 60 * 86_400, rows), unit="s"))
+    df = pd.DataFrame({
+        "gameid": pd.array(rng.integers(0, rows // 5, rows), dtype="Int64"),
+        "title": rng.integers(0, 100, rows).astype(str),
+        "usd": rng.choice([4.99, 9.99, np.nan], rows),
+        "date": dates.mask(rng.random(rows) < 0.1),
+    })
+    df.loc[rng.random(rows) < 0.01, "gameid"] = pd.NA
+    df["year"] = df["date"].dt.year # float64 overall, int32 in chunks without NaT
+    df.loc[:rows // 2, "date"] = df.loc[:rows // 2, "date"].dt.normalize() # blocks whose dates are all at midnight
+    chunks = lambda: (df.iloc[i:i + block_rows].copy() for i in range(0, rows, block_rows))
+    results = {}
+    budget = MemoryBudget(spill_dir=None)
+    with budget.scratch() as scratch:
+        expected = _csv_text(lambda path: write_frame(df, path))
+        results["write_csv == write_frame"] = _spilled_csv(chunks(), scratch, "plain") == expected
+
+        expected = _csv_text(lambda path: write_frame(latest_per_key(df, ["gameid"], "date"), path))
+        actual = external_latest_per_key(chunks(), ["gameid"], "date", scratch, block_rows)
+        results["external_latest_per_key == latest_per_key"] = _spilled_csv(actual, scratch, "latest") == expected
+
+        expected = _csv_text(lambda path: write_frame(df.drop_duplicates(["title"], keep="first"), path))
+        actual = external_drop_duplicates(chunks(), ["title"], scratch, block_rows)
+        results["external_drop_duplicates == drop_duplicates"] = _spilled_csv(actual, scratch, "dupes") == expected
+
+        valid = df[df["gameid"].notna()]
+        expected = latest_non_null_per_key(valid, ["gameid"], "date").sort_values("gameid").reset_index(drop=True)
+        expected = _csv_text(lambda path: write_frame(expected, path))
+        valid_chunks = (valid.iloc[i:i + block_rows] for i in range(0, len(valid), block_rows))
+        actual = external_latest_non_null_per_key(valid_chunks, ["gameid"], "date", scratch, block_rows)
+        results["external_latest_non_null_per_key == in memory + sort"] = \
+            _spilled_csv(actual, scratch, "nonnull") == expected
+
+        text = pd.Series(["2019-03-04"] * 10 + ["04/05/2019"] * 10 + [None] * 5)
+        parse = DateParser()
+        parsed = pd.concat([parse(text.iloc[i:i + 7]) for i in range(0, len(text), 7)])
+        results["DateParser chunks == whole-column to_datetime"] = parsed.equals(pd.to_datetime(text, errors="coerce"))
+    return results
+
+
+if __name__ == "__main__":
+    outcome = check_parity()
+    for name, ok in outcome.items():
+        print(f"  {'✔' if ok else '✘'} {name}")
+    raise SystemExit(0 if all(outcome.values()) else 1)
@@ -0,0 +1,243 @@
+"""
+Module Name: sql_catalog.py
+Purpose:
+    Parse the analysis files in sql/ into individually addressable statements.
+    Each statement is named after the comment banner that precedes it, e.g.
+
+        /* ===== QUERY 4: Estimated Spend Per Player ===== */
+
+    in 03_player_value.sql becomes "03_player_value.estimated_spend_per_player".
+
+Dataset:
+    Input:   sql/*.sql
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - CREATE VIEW statements are returned with kind="view"; they are setup
+      steps that must run before the queries that read from them.
+    - dependency_graph() links each statement to the views it reads from, so
+      runners can create views (and views built on views) before the queries.
+    - The parser understands line comments, block comments and quoted
+      strings, so semicolons inside any of those do not split a statement.
+"""
+
+import re
+from collections import OrderedDict
+from graphlib import TopologicalSorter
+from dataclasses import dataclass
+from pathlib import Path
+
+from gma.paths import SQL_DIR
+
+
+''' ===== DATA STRUCTURES ===== '''
+
+@dataclass(frozen=True)
+class SqlStatement:
+    name: str      # "<file stem>.<slug>" - unique across the catalogue
+    file: str      # file name the statement came from
+    title: str     # human readable title taken from the comment banner
+    kind: str      # "view", "query" or "other"
+    sql: str       # statement text without the trailing semicolon
+
+
+BANNER_RE = re.compile(r"^=+\s*(?:QUERY\s+\d+\s*:\s*)?(.*?)\s*=*$", re.IGNORECASE)
+SOURCE_RE = re.compile(r"\b(?:FROM|JOIN)\s+\"?(\w+)\"?", re.IGNORECASE)
+VIEW_RE = re.compile(r"^\s*CREATE\s+(?:TEMP\s+|TEMPORARY\s+)?VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w\"]+)",
+                     re.IGNORECASE)
+
+
+''' ===== HELPERS ===== '''
+
+def slugify(text):
+    slug = re.sub(r"[^0-9a-zA-Z]+", "_", text).strip("_").lower()
+    return slug or "statement"
+
+
+def _title_from_comments(block_comments, line_comments):
+    # Prefer the last block comment (the "===== QUERY n: ... =====" banners),
+    # fall back to the last "--" comment.
+    for text in reversed(block_comments):
+        text = text.strip()
+        if text.lower().startswith("file name:"):
+            continue # file header, not a statement title
+        first_line = text.splitlines()[0].strip() if text else ""
+        match = BANNER_RE.match(first_line)
+        title = match.group(1) if match else first_line
+        title = title.strip("= ").strip()
+        if title:
+            return title
+    for text in reversed(line_comments):
+        if text.strip():
+            return text.strip()
+    return ""
+
+
+def _statement_kind(sql):
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if VIEW_RE.match(sql):
+        return "view"
+    if head in ("SELECT", "WITH"):
+        return "query"
+    return "other"
+
+
+def split_sql(text):
+    """
+    Split a SQL script into (statement_sql, block_comments, line_comments)
+    tuples, where the comments are the ones seen since the previous statement.
+    """
+    statements = []
+    current = []
+    blocks, lines = [], []
+    i, n = 0, len(text)
+
+    def flush():
+        sql = "".join(current).strip()
+        if sql:
+            statements.append((sql, list(blocks), list(lines)))
+            blocks.clear()
+            lines.clear()
+        current.clear()
+
+    while i < n:
+        ch = text[i]
+        nxt = text[i + 1] if i + 1 < n else ""
+
+        if ch == "-" and nxt == "-":
+            end = text.find("\n", i)
+            end = n if end == -1 else end
+            if "".join(current).strip():
+                current.append(text[i:end]) # comment inside a statement - keep it
+            else:
+                lines.append(text[i + 2:end])
+            i = end
+        elif ch == "/" and nxt == "*":
+            end = text.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            if "".join(current).strip():
+                current.append(text[i:end])
+            else:
+                blocks.append(text[i + 2:end - 2])
+            i = end
+        elif ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if text[end] == ch:
+                    if end + 1 < n and text[end + 1] == ch: # escaped quote ('')
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(text[i:end + 1])
+            i = end + 1
+        elif ch == ";":
+            flush()
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+
+    flush()
+    return statements
+
+
+''' ===== CATALOGUE ===== '''
+
+def parse_sql_file(path):
+    path = Path(path)
+    if not path.exists():
+        path = SQL_DIR / path.name # allow "03_player_value.sql" as shorthand
+    text = path.read_text(encoding="utf-8")
+    stem = path.stem
+    seen = {}
+    parsed = []
+
+    for sql, blocks, lines in split_sql(text):
+        kind = _statement_kind(sql)
+        title = _title_from_comments(blocks, lines)
+        if kind == "view":
+            slug = slugify(VIEW_RE.match(sql).group(1).strip('"'))
+            title = title or slug
+        else:
+            slug = slugify(title) if title else f"statement_{len(parsed) + 1}"
+
+        seen[slug] = seen.get(slug, 0) + 1
+        if seen[slug] > 1:
+            slug = f"{slug}_{seen[slug]}"
+
+        parsed.append(SqlStatement(
+            name=f"{stem}.{slug}",
+            file=path.name,
+            title=title,
+            kind=kind,
+            sql=sql,
+        ))
+    return parsed
+
+
+def load_catalog(sql_dir=SQL_DIR):
+    """Return an ordered {name: SqlStatement} mapping for every sql/*.sql file."""
+    catalog = OrderedDict()
+    for path in sorted(sql_dir.glob("*.sql")):
+        for stmt in parse_sql_file(path):
+            catalog[stmt.name] = stmt
+    return catalog
+
+
+def queries(catalog):
+    return [s for s in catalog.values() if s.kind == "query"]
+
+
+def views(catalog):
+    return [s for s in catalog.values() if s.kind == "view"]
+
+
+def as_temp_view(sql):
+    """
+    Rewrite "CREATE VIEW" as "CREATE TEMP VIEW" so the view can be created
+    on a read-only connection (temp objects live outside the database file).
+    """
+    return re.sub(r"^\s*CREATE\s+VIEW", "CREATE TEMP VIEW", sql, count=1, flags=re.IGNORECASE)
+
+
+''' ===== DEPENDENCIES ===== '''
+
+def view_name(stmt):
+    return VIEW_RE.match(stmt.sql).group(1).strip('"')
+
+
+def dependency_graph(catalog):
+    """
+    Return {statement name: set of view statement names it reads from}.
+    Tables and CTE names are ignored - only views defined in sql/ create
+    ordering constraints.
+    """
+    view_by_table = {view_name(v).lower(): v.name for v in views(catalog)}
+    graph = {}
+    for stmt in catalog.values():
+        sources = {m.lower() for m in SOURCE_RE.findall(stmt.sql)}
+        deps = {view_by_table[s] for s in sources if s in view_by_table}
+        deps.discard(stmt.name)
+        graph[stmt.name] = deps
+    return graph
+
+
+def ordered_views(catalog, names=None):
+    """
+    Views in creation order. If names is given, only the views those
+    statements need (directly or through other views) are returned.
+    """
+    graph = dependency_graph(catalog)
+    if names is None:
+        wanted = {v.name for v in views(catalog)}
+    else:
+        wanted, stack = set(), list(names)
+        while stack:
+            for dep in graph[stack.pop()]:
+                if dep not in wanted:
+                    wanted.add(dep)
+                    stack.append(dep)
+    order = TopologicalSorter({n: graph[n] for n in wanted}).static_order()
+    return [catalog[n] for n in order if n in wanted]
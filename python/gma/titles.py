@@ -0,0 +1,265 @@
+"""
+Module Name: titles.py
+Purpose:
+    Indexed game-title lookups. The build adds two structures next to the
+    games table:
+        - game_titles: (gameid, platform, title, title_key) with an index on
+          title_key, where title_key is a normalised title (case-folded,
+          accents and punctuation removed, edition / platform suffixes such as
+          "- Game of the Year Edition" or "(PS4)" trimmed). Equal keys mean
+          "same game" across platforms, so cross-platform matching is an
+          index lookup instead of a scan.
+        - games_fts: an FTS5 full-text index over title and title_key, so
+          title search no longer needs LIKE '%...%' over every row.
+
+        search_titles("witcher wild hunt")       -> [(gameid, platform), ...]
+        match_title("The Witcher 3 (GOTY)")      -> same game on every platform
+
+Dataset:
+    Input:   games table (games_analytics.db)
+    Output:  game_titles, games_fts (games_analytics.db)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Built by the build-db stage (gma/build_database.py); run
+      `python -m gma.titles build` to add it to an existing database.
+    - If the SQLite library has no FTS5, game_titles is still built and
+      search_titles() falls back to the title_key index (prefix match).
+    - "cut" / "version" are only trimmed after an edition word ("Director's
+      Cut", "Definitive Version"); "Paper Cut" keeps its last word.
+    - `python -m gma.titles check` runs normalise_title over CHECK_CASES.
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+import unicodedata
+
+from gma.paths import DB_PATH
+
+# words that may appear in an edition suffix ("Digital Deluxe Edition", "Game of the Year Edition")
+EDITION_WORDS = (
+    "the|digital|deluxe|standard|gold|silver|platinum|ultimate|complete|definitive|enhanced|special|"
+    "collectors|limited|anniversary|premium|legendary|game|of|year|goty|royal|launch|day|one|"
+    "super|directors|final|extended|champions|founders|hd|4k|remastered|"
+    r"\d+(?:st|nd|rd|th)|xbox|playstation|ps4|ps5|pc|windows|10|series|x|s"
+)
+# "cut" / "version" alone are ordinary words ("Paper Cut"); they only end an edition after one of these
+CUT_QUALIFIERS = (
+    "digital|deluxe|standard|gold|platinum|ultimate|complete|definitive|enhanced|special|collectors|limited|"
+    "anniversary|premium|legendary|year|goty|royal|launch|directors|final|extended|hd|4k|remastered|"
+    "xbox|one|playstation|ps4|ps5|pc|windows"
+)
+EDITION_SUFFIX_RE = re.compile(
+    rf"[\s:\-–—,]*\b(?:(?:{EDITION_WORDS})\s+)*(?:edition|(?:{CUT_QUALIFIERS})\s+(?:version|cut))\s*$")
+PLATFORM_SUFFIX_RE = re.compile(
+    r"[\s:\-–—,]+(?:for\s+)?(?:windows(?:\s+10)?|pc|ps4|ps5|ps4\s*(?:&|and|/)\s*ps5|"
+    r"xbox\s+one|xbox\s+series\s+x\s*(?:\||/)?\s*s?|goty)\s*$")
+BRACKET_SUFFIX_RE = re.compile(r"\s*[\(\[]([^\(\)\[\]]*)[\)\]]\s*$")
+BRACKET_WORDS_RE = re.compile(r"\b(?:edition|version|cut|goty|remaster(?:ed)?|pc|ps4|ps5|xbox|windows)\b")
+TRADEMARKS_RE = re.compile("[\u2122\u00ae\u00a9]") # ™ ® ©
+
+
+def normalise_title(title):
+    """'The Witcher® 3: Wild Hunt – Game of the Year Edition' -> 'the witcher 3 wild hunt'."""
+    if title is None or title != title: # None / NaN
+        return ""
+    text = TRADEMARKS_RE.sub("", str(title))
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"['’]", "", text) # "Meier's" -> "meiers", not "meier s"
+    text = " ".join(text.casefold().replace("&", " and ").split())
+    while True:
+        trimmed = text
+        bracket = BRACKET_SUFFIX_RE.search(trimmed)
+        if bracket and BRACKET_WORDS_RE.search(bracket.group(1)):
+            trimmed = trimmed[:bracket.start()]
+        trimmed = PLATFORM_SUFFIX_RE.sub("", trimmed)
+        if trimmed.endswith(("edition", "version", "cut")): # cheap check before the suffix regex
+            trimmed = EDITION_SUFFIX_RE.sub("", trimmed)
+        if trimmed == text or not trimmed.strip():
+            break
+        text = trimmed
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+''' ===== BUILD ===== '''
+
+TITLE_SCHEMA = """
+DROP TABLE IF EXISTS game_titles;
+DROP TABLE IF EXISTS games_fts;
+CREATE TABLE game_titles (
+    gameid INTEGER,
+    platform TEXT,
+    title TEXT,
+    title_key TEXT
+);
+"""
+
+TITLE_INDEXES = """
+CREATE INDEX ix_game_titles_key ON game_titles (title_key, platform);
+CREATE INDEX ix_game_titles_game ON game_titles (gameid, platform);
+"""
+
+
+def has_fts5(conn):
+    return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+def build_title_index(conn):
+    """(Re)build game_titles and games_fts from the games table; returns the number of titles."""
+    rows = conn.execute("SELECT gameid, platform, title FROM games").fetchall()
+    conn.executescript(TITLE_SCHEMA)
+    conn.executemany("INSERT INTO game_titles VALUES (?, ?, ?, ?)",
+                     [(gameid, platform, title, normalise_title(title)) for gameid, platform, title in rows])
+    conn.executescript(TITLE_INDEXES)
+    if has_fts5(conn):
+        # remove_diacritics: "Pokémon" matches "pokemon"
+        conn.execute("""
+            CREATE VIRTUAL TABLE games_fts USING fts5(
+                title, title_key, gameid UNINDEXED, platform UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )""")
+        conn.execute("INSERT INTO games_fts SELECT title, title_key, gameid, platform FROM game_titles")
+        conn.execute("INSERT INTO games_fts (games_fts) VALUES ('optimize')")
+    else:
+        print("  WARNING: SQLite built without FTS5 — title search uses the title_key index only")
+    conn.commit()
+    return len(rows)
+
+
+''' ===== LOOKUPS ===== '''
+
+def _connect(conn, db_path):
+    if conn is not None:
+        return conn, False
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True), True
+
+
+def _fts_query(text):
+    # every word must match; the last one may be a prefix ("witch" finds "witcher")
+    words = normalise_title(text).split()
+    if not words:
+        return None
+    quoted = [f'"{w}"' for w in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_titles(text, conn=None, db_path=DB_PATH, platforms=None, limit=20, with_titles=False):
+    """
+    Full-text title search. Returns [(gameid, platform), ...] best match first
+    (or [(gameid, platform, title), ...] with with_titles=True).
+    """
+    conn, owned = _connect(conn, db_path)
+    try:
+        query = _fts_query(text)
+        if query is None:
+            return []
+        platform_filter, params = "", []
+        if platforms:
+            platforms = [platforms] if isinstance(platforms, str) else platforms
+            platform_filter = f" AND lower(platform) IN ({', '.join('?' * len(platforms))})"
+            params = [p.lower() for p in platforms]
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'games_fts'").fetchone():
+            sql = (f"SELECT gameid, platform, title FROM games_fts WHERE games_fts MATCH ?{platform_filter} "
+                   f"ORDER BY bm25(games_fts) LIMIT ?")
+            rows = conn.execute(sql, [query, *params, limit]).fetchall()
+        else:
+            key = normalise_title(text)
+            sql = (f"SELECT gameid, platform, title FROM game_titles WHERE title_key >= ? AND title_key < ?"
+                   f"{platform_filter} ORDER BY title_key LIMIT ?")
+            rows = conn.execute(sql, [key, key + "\uffff", *params, limit]).fetchall()
+    finally:
+        if owned:
+            conn.close()
+    return rows if with_titles else [(gameid, platform) for gameid, platform, _ in rows]
+
+
+def match_title(title, conn=None, db_path=DB_PATH):
+    """Every (gameid, platform) whose normalised title equals this one - the same game on each platform."""
+    conn, owned = _connect(conn, db_path)
+    try:
+        return conn.execute(
+            "SELECT gameid, platform FROM game_titles WHERE title_key = ? ORDER BY platform, gameid",
+            (normalise_title(title),)).fetchall()
+    finally:
+        if owned:
+            conn.close()
+
+
+def title_frame(games):
+    """game_titles as a DataFrame, for backends that load from CSV (gma/columnar_backend.py)."""
+    titles = games[["gameid", "platform", "title"]].copy()
+    titles["title_key"] = titles["title"].map(normalise_title)
+    return titles
+
+
+''' ===== CHECK ===== '''
+
+# title -> expected title_key
+CHECK_CASES = {
+    "The Witcher® 3: Wild Hunt – Game of the Year Edition": "the witcher 3 wild hunt",
+    "Mass Effect Legendary Edition": "mass effect",
+    "Sid Meier's Civilization VI (PS4)": "sid meiers civilization vi",
+    "Forza Horizon 5 - Xbox Series X|S": "forza horizon 5",
+    "Death Stranding Director's Cut": "death stranding",
+    "Final Fantasy VII - Final Cut": "final fantasy vii",
+    "Dishonored - Definitive Version": "dishonored",
+    "Doom Eternal PC Version": "doom eternal",
+    "Paper Cut": "paper cut",
+    "Short Version": "short version",
+    "Final Cut": "final cut",
+    "Edition": "edition",
+}
+
+
+def check():
+    ok = True
+    for title, expected in CHECK_CASES.items():
+        key = normalise_title(title)
+        ok &= key == expected
+        print(f"  {'✔' if key == expected else '✘'} {title!r} -> {key!r}" + ("" if key == expected else f" (expected {expected!r})"))
+    return ok
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or search the game title index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="(re)build game_titles and games_fts in games_analytics.db")
+    s = sub.add_parser("search", help="full-text title search")
+    s.add_argument("text")
+    s.add_argument("--platform", nargs="*")
+    s.add_argument("--limit", type=int, default=20)
+    m = sub.add_parser("match", help="same title on every platform (normalised title key)")
+    m.add_argument("title")
+    sub.add_parser("check", help="normalise_title on known edition / platform suffixes")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        return 0 if check() else 1
+
+    if args.command == "build":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            print(f"  ✔ game_titles / games_fts: {build_title_index(conn)} titles")
+        finally:
+            conn.close()
+        return 0
+
+    start = time.perf_counter()
+    if args.command == "search":
+        rows = search_titles(args.text, platforms=args.platform, limit=args.limit, with_titles=True)
+    else:
+        rows = match_title(args.title)
+    for row in rows:
+        print(" | ".join(str(v) for v in row))
+    print(f"\n{len(rows)} matches in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,386 @@
+"""
+Module Name: value_engine.py
+Purpose:
+    Player value without joins (stage "build-value", after build-db). The
+    Player Value queries in sql/03_player_value.sql join every purchase to
+    prices and players, and the revenue queries in sql/05_top_games.sql rebuild
+    a latest_prices window each time. Here the latest price per
+    (platform, gameid) and the game titles are loaded once into dense NumPy
+    arrays indexed by gameid; the players' platform / country go into arrays
+    indexed by playerid. Every result is then one gather over the purchases
+    arrays plus a np.bincount - no join, no sort.
+
+        index = IdIndex(gameids)          # gameid -> slot (direct offset, or a remap for sparse ids)
+        usd[platform_code, index.lookup(purchases.gameid)]   # price of every purchase at once
+
+    Tables written (same rows as the sql/ queries they store - see check):
+        player_value           one row per player with a priced purchase: priced_purchases, total_spend_usd
+        value_platform_spend   03 Query 4  (avg price per priced purchase, total revenue estimate)
+        value_segments         03 Query 5  (high / mid / low value players)
+        value_country          03 Query 6  (avg / total spend per player by country)
+        value_game_revenue     05 Query 7's units_sold x latest usd, per (platform, gameid)
+
+Dataset:
+    Input:   games_analytics.db (games, players, purchases, prices) or the in-memory clean tables
+    Output:  games_analytics.db (the five tables above)
+
+Author: Shian Raveneau-Wright
+
+Notes:
+    - Ids are looked up by direct offset (id - min id) when they span at most
+      DENSE_SPAN x as many values as there are ids; otherwise through a sorted
+      id array and np.searchsorted (Steam player ids are 17 digits).
+    - Platforms are matched lower-cased, as in gma/sketches.py and in the
+      sql/ queries: purchases say "Playstation", players / prices "PlayStation".
+    - Purchases are matched to players on playerid alone (the players primary
+      key), exactly as the SQL does.
+    - Segment boundaries copy Query 5: >= 100 high, 30-99 mid, < 30 low - a
+      total strictly between 99 and 100 is in none of them, as in SQL.
+    - `python -m gma.value_engine check` runs the sql/ queries themselves
+      (through gma/sql_catalog.py) and compares every table with them;
+      player_value and value_game_revenue are compared with the same SQL
+      keyed per player / per game (PLAYER_SQL, GAME_SQL).
+"""
+
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from gma.paths import DB_PATH
+from gma.sql_catalog import load_catalog
+
+DENSE_SPAN = 4 # direct indexing while (max id - min id + 1) <= DENSE_SPAN * number of ids
+HIGH_VALUE = 100
+MID_VALUE = 30
+
+
+''' ===== ID INDEX ===== '''
+
+class IdIndex:
+    """
+    Maps ids (gameids, playerids) to slots 0..n-1. Dense ids use one offset
+    lookup table; sparse ids are remapped through a sorted array. Unknown ids map to -1.
+    """
+
+    def __init__(self, ids):
+        self.ids = np.unique(np.asarray(ids, dtype=np.int64)) # sorted, slot = position
+        self.table = None
+        if len(self.ids):
+            self.low = int(self.ids[0])
+            span = int(self.ids[-1]) - self.low + 1
+            if span <= DENSE_SPAN * len(self.ids):
+                self.table = np.full(span, -1, dtype=np.int64)
+                self.table[self.ids - self.low] = np.arange(len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(values), -1, dtype=np.int64)
+        if self.table is not None:
+            offset = values - self.low
+            inside = (offset >= 0) & (offset < len(self.table))
+            slots = np.full(len(values), -1, dtype=np.int64)
+            slots[inside] = self.table[offset[inside]]
+            return slots
+        slots = np.searchsorted(self.ids, values)
+        slots[slots == len(self.ids)] = 0
+        return np.where(self.ids[slots] == values, slots, -1)
+
+
+''' ===== LOOKUP ARRAYS ===== '''
+
+def _read_tables(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return {
+            "games": pd.read_sql("SELECT gameid, platform, title FROM games", conn),
+            "players": pd.read_sql("SELECT playerid, platform, country FROM players", conn),
+            "purchases": pd.read_sql("SELECT playerid, gameid, platform FROM purchases", conn),
+            "prices": pd.read_sql("SELECT gameid, platform, usd FROM prices", conn),
+        }
+    finally:
+        conn.close()
+
+
+class ValueArrays:
+    """The lookup arrays plus the purchases as slot arrays - built once, shared by every table."""
+
+    def __init__(self, tables):
+        games, players, purchases, prices = (tables[t] for t in ["games", "players", "purchases", "prices"])
+        prices = prices[prices["gameid"].notna() & prices["platform"].notna()]
+        games = games[games["gameid"].notna() & games["platform"].notna()]
+        purchases = purchases[purchases["gameid"].notna() & purchases["playerid"].notna()]
+        players = players.drop_duplicates("playerid") # primary key in the database
+
+        # platform codes (lower-cased, shared by every table)
+        self.platforms = sorted(set().union(*(t["platform"].dropna().str.lower().unique()
+                                              for t in (games, players, purchases, prices))))
+        code = {name: i for i, name in enumerate(self.platforms)}
+
+        def codes(column):
+            return column.str.lower().map(code).fillna(-1).to_numpy(dtype=np.int64)
+
+        # latest usd and title per (platform, gameid): 2-D arrays [platform code, game slot]
+        self.games = IdIndex(np.concatenate([prices["gameid"].to_numpy(np.int64), games["gameid"].to_numpy(np.int64)]))
+        shape = (len(self.platforms), len(self.games))
+        self.usd = np.full(shape, np.nan)
+        self.has_price = np.zeros(shape, dtype=bool)
+        p, s = codes(prices["platform"]), self.games.lookup(prices["gameid"].to_numpy(np.int64))
+        self.usd[p, s] = prices["usd"].to_numpy(dtype=np.float64) # a repeated key keeps its last row
+        self.has_price[p, s] = True
+        self.titles = np.full(shape, None, dtype=object)
+        self.titles[codes(games["platform"]), self.games.lookup(games["gameid"].to_numpy(np.int64))] = games["title"].to_numpy()
+
+        # player platform / country by player slot
+        self.players = IdIndex(players["playerid"].to_numpy(np.int64))
+        order = self.players.lookup(players["playerid"].to_numpy(np.int64))
+        self.player_ids = self.players.ids
+        self.player_platform = np.empty(len(self.players), dtype=object)
+        self.player_platform[order] = players["platform"].to_numpy()
+        self.player_country = np.empty(len(self.players), dtype=object)
+        self.player_country[order] = players["country"].where(players["country"].notna(), None).to_numpy()
+
+        # purchases as slot arrays
+        self.pu_platform = codes(purchases["platform"])
+        self.pu_game = self.games.lookup(purchases["gameid"].to_numpy(np.int64))
+        self.pu_player = self.players.lookup(purchases["playerid"].to_numpy(np.int64))
+        self.purchases = len(purchases)
+
+    def purchase_prices(self):
+        """(priced, usd): which purchases have a price row for their (platform, gameid), and that price."""
+        known = (self.pu_game >= 0) & (self.pu_platform >= 0)
+        priced = np.zeros(self.purchases, dtype=bool)
+        priced[known] = self.has_price[self.pu_platform[known], self.pu_game[known]]
+        usd = np.full(self.purchases, np.nan)
+        usd[priced] = self.usd[self.pu_platform[priced], self.pu_game[priced]]
+        return priced, usd
+
+
+''' ===== TABLES ===== '''
+
+def _group_codes(values):
+    # object array (None allowed) -> (codes, labels); None gets its own group like SQL's GROUP BY
+    codes, labels = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return codes, [None if pd.isna(v) else v for v in labels]
+
+
+def value_tables(arrays):
+    """All five tables as DataFrames, from one gather + bincounts over the purchases."""
+    a = arrays
+    priced, usd = a.purchase_prices()
+    rows = priced & (a.pu_player >= 0) # inner join to players and prices
+    has_usd = rows & ~np.isnan(usd)
+    n = len(a.players)
+
+    # per player: SUM(usd) over priced purchases (NULL when every price is NULL)
+    priced_count = np.bincount(a.pu_player[rows], minlength=n)
+    usd_count = np.bincount(a.pu_player[has_usd], minlength=n)
+    spend = np.bincount(a.pu_player[has_usd], weights=usd[has_usd], minlength=n)
+    spend[usd_count == 0] = np.nan
+    buyers = np.flatnonzero(priced_count)
+    player_value = pd.DataFrame({
+        "playerid": a.player_ids[buyers], "platform": a.player_platform[buyers],
+        "country": a.player_country[buyers], "priced_purchases": priced_count[buyers],
+        "total_spend_usd": spend[buyers],
+    })
+
+    # Query 4: by player platform, over purchase rows
+    platform_codes, platform_labels = _group_codes(a.player_platform)
+    row_platform = platform_codes[a.pu_player[has_usd]]
+    totals = np.bincount(row_platform, weights=usd[has_usd], minlength=len(platform_labels))
+    counts = np.bincount(row_platform, minlength=len(platform_labels))
+    present = np.unique(platform_codes[a.pu_player[rows]])
+    platform_spend = pd.DataFrame({
+        "platform": [platform_labels[i] for i in present],
+        "avg_spend_per_player_usd": np.round(np.divide(totals[present], counts[present], out=np.full(len(present), np.nan),
+                                                       where=counts[present] > 0), 2),
+        "total_revenue_estimate_usd": np.where(counts[present] > 0, np.round(totals[present], 2), np.nan),
+    }).sort_values("avg_spend_per_player_usd", ascending=False, kind="stable")
+
+    # Query 5: players by spend segment, per platform
+    buyer_platform = platform_codes[buyers]
+    buyer_spend = spend[buyers]
+    high, mid, low = buyer_spend >= HIGH_VALUE, (buyer_spend >= MID_VALUE) & (buyer_spend <= 99), buyer_spend < MID_VALUE
+    seg_present = np.unique(buyer_platform)
+    segments = pd.DataFrame({
+        "platform": [platform_labels[i] for i in seg_present],
+        "high_value_players": np.bincount(buyer_platform[high], minlength=len(platform_labels))[seg_present],
+        "mid_value_players": np.bincount(buyer_platform[mid], minlength=len(platform_labels))[seg_present],
+        "low_value_players": np.bincount(buyer_platform[low], minlength=len(platform_labels))[seg_present],
+    }).sort_values("platform", kind="stable", na_position="first")
+
+    # Query 6: by country, over players (AVG / SUM skip NULL totals)
+    country_codes, country_labels = _group_codes(a.player_country[buyers])
+    known = ~np.isnan(buyer_spend)
+    c_total = np.bincount(country_codes[known], weights=buyer_spend[known], minlength=len(country_labels))
+    c_count = np.bincount(country_codes[known], minlength=len(country_labels))
+    country_value = pd.DataFrame({
+        "country": country_labels,
+        "avg_spend_per_player": np.round(np.divide(c_total, c_count, out=np.full(len(c_total), np.nan), where=c_count > 0), 2),
+        "total_country_value": np.where(c_count > 0, np.round(c_total, 2), np.nan),
+    }).sort_values("avg_spend_per_player", ascending=False, kind="stable")
+
+    # Query 7 per (platform, gameid): units with a price row x latest usd
+    width = len(a.games)
+    flat = a.pu_platform[priced] * width + a.pu_game[priced]
+    units = np.bincount(flat, minlength=len(a.platforms) * width)
+    sold = np.flatnonzero(units)
+    p, s = np.divmod(sold, width)
+    game_revenue = pd.DataFrame({
+        "platform": [a.platforms[i] for i in p], "gameid": a.games.ids[s], "title": a.titles[p, s],
+        "units_sold": units[sold], "latest_price_usd": a.usd[p, s], "estimated_revenue_usd": units[sold] * a.usd[p, s],
+    }).sort_values("estimated_revenue_usd", ascending=False, kind="stable")
+
+    return {
+        "player_value": player_value,
+        "value_platform_spend": platform_spend.reset_index(drop=True),
+        "value_segments": segments.reset_index(drop=True),
+        "value_country": country_value.reset_index(drop=True),
+        "value_game_revenue": game_revenue.reset_index(drop=True),
+    }
+
+
+''' ===== BUILD ===== '''
+
+# table -> index created after loading
+INDEXES = {
+    "player_value": "CREATE UNIQUE INDEX idx_player_value ON player_value (playerid)",
+    "value_platform_spend": "CREATE UNIQUE INDEX idx_value_platform_spend ON value_platform_spend (platform)",
+    "value_segments": "CREATE UNIQUE INDEX idx_value_segments ON value_segments (platform)",
+    "value_country": "CREATE UNIQUE INDEX idx_value_country ON value_country (country)",
+    "value_game_revenue": "CREATE UNIQUE INDEX idx_value_game_revenue ON value_game_revenue (platform, gameid)",
+}
+
+
+def build(tables=None, db_path=DB_PATH):
+    """
+    Compute the value tables and store them in games_analytics.db. `tables` may
+    hold the in-memory games / players / purchases / prices frames from earlier
+    stages; otherwise they are read from the database.
+    """
+    start = time.perf_counter()
+    tables = tables if tables is not None else _read_tables(db_path)
+    arrays = ValueArrays(tables)
+    results = value_tables(arrays)
+    seconds = time.perf_counter() - start
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, df in results.items():
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            df.to_sql(name, conn, index=False)
+            conn.execute(INDEXES[name])
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"  ✔ value tables: {len(results['player_value'])} players with spend, "
+          f"{len(results['value_game_revenue'])} priced games ({arrays.purchases} purchases, {seconds:.2f}s)")
+    return results
+
+
+''' ===== CHECK AGAINST SQL ===== '''
+
+# table -> the sql/ query it stores (gma/sql_catalog.py names)
+CATALOG_QUERIES = {
+    "value_platform_spend": "03_player_value.estimated_spend_per_player",
+    "value_segments": "03_player_value.player_value_segmentation",
+    "value_country": "03_player_value.country_level_player_value",
+}
+
+# per-player totals: the player CTE of 03 Queries 5 / 6 keyed by playerid
+PLAYER_SQL = """
+    SELECT pu.playerid, COUNT(*) AS priced_purchases, SUM(pr.usd) AS total_spend_usd
+    FROM purchases AS pu
+    JOIN players AS pl ON pu.playerid = pl.playerid
+    JOIN prices AS pr ON pu.gameid = pr.gameid AND lower(pu.platform) = lower(pr.platform)
+    GROUP BY pu.playerid"""
+
+# revenue per game: 05 Query 7 (which reports per title and platform) keyed by (platform, gameid)
+GAME_SQL = """
+    WITH latest_prices AS (
+        SELECT gameid, platform, usd,
+               ROW_NUMBER() OVER (PARTITION BY gameid, platform ORDER BY date(date_acquired) DESC) AS rn
+        FROM prices
+    )
+    SELECT lower(pu.platform) AS platform, pu.gameid, COUNT(pu.gameid) AS units_sold,
+           lp.usd AS latest_price_usd, COUNT(pu.gameid) * lp.usd AS estimated_revenue_usd
+    FROM purchases AS pu
+    JOIN latest_prices AS lp ON pu.gameid = lp.gameid AND lower(pu.platform) = lower(lp.platform)
+    WHERE lp.rn = 1
+    GROUP BY lower(pu.platform), pu.gameid, lp.usd"""
+
+KEYS = {"value_platform_spend": ["platform"], "value_segments": ["platform"], "value_country": ["country"],
+        "value_game_revenue": ["platform", "gameid"]}
+
+
+def _same(engine, reference, keys):
+    if len(engine) != len(reference):
+        return False
+    merged = engine.merge(reference, on=keys, how="outer", suffixes=("", "_sql"), indicator=True)
+    if (merged["_merge"] != "both").any():
+        return False
+    for col in reference.columns.difference(keys):
+        mine, theirs = merged[col].astype(float).to_numpy(), merged[f"{col}_sql"].astype(float).to_numpy()
+        if not np.allclose(mine, theirs, rtol=1e-9, atol=1e-6, equal_nan=True):
+            return False
+    return True
+
+
+def check(db_path=DB_PATH):
+    """Compare every engine table with the SQL it replaces on the current database. Returns True if all match."""
+    start = time.perf_counter()
+    results = value_tables(ValueArrays(_read_tables(db_path)))
+    engine_seconds = time.perf_counter() - start
+
+    catalog = load_catalog()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        ok = True
+        sql_seconds = 0.0
+        for name, query in CATALOG_QUERIES.items():
+            start = time.perf_counter()
+            reference = pd.read_sql(catalog[query].sql, conn)
+            sql_seconds += time.perf_counter() - start
+            engine = results[name][reference.columns]
+            match = _same(engine.fillna({"country": "__null__"}) if name == "value_country" else engine,
+                          reference.fillna({"country": "__null__"}) if name == "value_country" else reference,
+                          KEYS[name])
+            ok &= match
+            print(f"  {'✔' if match else '✘'} {name}: {len(engine)} rows (SQL {len(reference)})")
+
+        # per-player totals against the Query 5 / 6 player CTE, per-game revenue against Query 7 per gameid
+        for name, sql, keys in [("player_value", PLAYER_SQL, ["playerid"]),
+                                ("value_game_revenue", GAME_SQL, KEYS["value_game_revenue"])]:
+            reference = pd.read_sql(sql, conn)
+            match = _same(results[name][reference.columns], reference, keys)
+            ok &= match
+            print(f"  {'✔' if match else '✘'} {name}: {len(results[name])} rows (SQL {len(reference)})")
+    finally:
+        conn.close()
+    print(f"engine {engine_seconds:.2f}s (incl. loading) vs SQL {sql_seconds:.2f}s for the same tables")
+    return ok
+
+
+''' ===== MAIN ===== '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Player value from dense gameid-indexed arrays")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="(re)build the value tables in games_analytics.db")
+    sub.add_parser("check", help="compare the value tables with the SQL queries they replace")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build()
+        return 0
+    return 0 if check() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
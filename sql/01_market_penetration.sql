@@ -4,11 +4,14 @@
         Analyse platform market penetration across global regions.
         Identify which platforms dominate which countries, and how player distribution varies.
     Dataset:
-        games_analytics.db (SQLite) — tables: players, games, purchases
+        games_analytics.db (SQLite) — tables: players, games, purchases,
+        population, population_by_year, country_aliases
     Author: Shian Raveneau-Wright
     Notes:
         - Queries in this file focus on country-level and regional penetration.
         - Outputs will support visualisations for the Market Penetration chapter.
+        - QUERY 7 counts players in the year their account was created and compares them with that
+          year's population; country names resolve to an integer country_id through country_aliases.
 */
 
 /* Basic platform–country join for market penetration analysis */
@@ -89,4 +92,24 @@ FROM players AS pl
 JOIN population AS pop
     ON pl.country = pop.country
 GROUP BY pl.country, pl.platform
-ORDER BY penetration_percentage DESC;
\ No newline at end of file
+ORDER BY penetration_percentage DESC;
+
+/* ===== QUERY 7: Market Penetration % by acquisition year (Requires population_by_year) ===== */
+SELECT
+    pl.country,
+    pl.platform,
+    CAST(STRFTIME('%Y', pl.created_date) AS INTEGER) AS acquisition_year,
+    COUNT(pl.playerid) AS new_players,
+    py.population,
+    ROUND(
+        (COUNT(pl.playerid) * 1.0 / py.population) * 100,
+        6
+    ) AS penetration_percentage
+FROM players AS pl
+JOIN country_aliases AS ca
+    ON ca.alias = pl.country
+JOIN population_by_year AS py
+    ON py.country_id = ca.country_id
+   AND py.year = CAST(STRFTIME('%Y', pl.created_date) AS INTEGER)
+GROUP BY pl.country, pl.platform, acquisition_year
+ORDER BY acquisition_year ASC, penetration_percentage DESC;
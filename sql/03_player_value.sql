@@ -10,6 +10,9 @@
     Notes:
         - Part of the Player Value chapter.
         - Queries support dashboards showing LTV components, like owned game count and spending activity.
+        - Purchases store "Playstation", prices "PlayStation": platforms are joined
+          lower-cased. Queries 4-6 are also stored as tables by the build-value
+          stage (python/gma/value_engine.py).
 */
 
 /* ===== QUERY 1: Number of Games Owned Per Player ===== */
@@ -72,7 +75,7 @@ WITH player_game_prices AS (
         ON pu.playerid = pl.playerid
     JOIN prices AS pr
         ON pu.gameid = pr.gameid
-        AND pu.platform = pr.platform
+        AND lower(pu.platform) = lower(pr.platform)
 )
 SELECT
     platform,
@@ -95,7 +98,7 @@ WITH player_totals AS (
         ON pu.playerid = pl.playerid
     JOIN prices AS pr
         ON pu.gameid = pr.gameid
-        AND pu.platform = pr.platform
+        AND lower(pu.platform) = lower(pr.platform)
     GROUP BY pl.playerid, pl.platform
 )
 SELECT
@@ -120,7 +123,7 @@ WITH player_spend AS (
         ON pu.playerid = pl.playerid
     JOIN prices pr
         ON pu.gameid = pr.gameid
-        AND pu.platform = pr.platform
+        AND lower(pu.platform) = lower(pr.platform)
     GROUP BY pl.playerid, pl.country
 )
 SELECT
@@ -116,6 +116,7 @@ HAVING platforms_available_on = 1;
 
 
 /* ===== QUERY 7: Estimated Revenue Based on Latest Price Snapshot ===== */
+-- Prices are joined on lower-cased platform (purchases store "Playstation", prices "PlayStation").
 
 WITH latest_prices AS (
     SELECT
@@ -138,7 +139,7 @@ FROM purchases AS pu
 JOIN games AS g ON pu.gameid = g.gameid
 JOIN latest_prices AS lp
     ON pu.gameid = lp.gameid
-   AND pu.platform = lp.platform
+   AND lower(pu.platform) = lower(lp.platform)
 WHERE lp.rn = 1
 GROUP BY g.title, pu.platform
 ORDER BY estimated_revenue_usd DESC;
@@ -167,3 +168,33 @@ JOIN latest_prices AS lp
 WHERE lp.rn = 1
 GROUP BY g.title
 ORDER BY global_estimated_revenue_usd DESC;
+
+/* ===== QUERY 9: Cross-Platform Titles Matched by Normalised Title ===== */
+-- Same game under slightly different titles ("… – Game of the Year Edition", "(PS4)") counted once.
+-- title_key comes from game_titles (built with the database, indexed - see python/gma/titles.py).
+
+SELECT
+    MIN(gt.title) AS title,
+    gt.title_key,
+    COUNT(DISTINCT gt.platform) AS num_platforms_available,
+    (
+        SELECT GROUP_CONCAT(p.platform)
+        FROM (
+            SELECT DISTINCT platform
+            FROM game_titles
+            WHERE title_key = gt.title_key
+            ORDER BY platform
+        ) AS p
+    ) AS platforms, -- alphabetical, so every backend gives the same list
+    SUM(gp.total_purchases) AS total_purchases
+FROM game_titles AS gt
+LEFT JOIN (
+    SELECT gameid, lower(platform) AS platform, COUNT(*) AS total_purchases
+    FROM purchases
+    GROUP BY gameid, lower(platform)
+) AS gp
+    ON gp.gameid = gt.gameid AND gp.platform = lower(gt.platform)
+WHERE gt.title_key <> ''
+GROUP BY gt.title_key
+HAVING num_platforms_available >= 2
+ORDER BY total_purchases DESC, num_platforms_available DESC, gt.title_key;
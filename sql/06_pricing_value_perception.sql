@@ -4,9 +4,118 @@
         Analyse pricing structure, cross-regional price differences,
         and inferred value-perception signals from player behaviour.
     Dataset:
-        games_analytics.db (SQLite) — tables: prices, games, purchases
-    Author: <YOUR NAME>
-    Module: Shian Raveneau-Wright
-        - Queries will examine how pricing relates to demand.
+        games_analytics.db (SQLite)
+        Tables: pricing_bands, pricing_regional, pricing_regional_summary,
+                pricing_changes, pricing_change_demand, pricing_elasticity, games
+    Author: Shian Raveneau-Wright
+    Notes:
+        - The pricing_* tables are summaries built by the build-pricing stage
+          (python/gma/pricing.py, part of `gma run all`), so these queries never
+          scan the price history or the purchases table.
+        - Queries examine how pricing relates to demand.
         - Supports competitive benchmarking and monetisation insights.
+        - Purchases have no date: price-change queries compare games that were
+          cut / raised, they do not measure demand before and after a change.
 */
+
+/* ===== QUERY 1: USD Price Band Mix and Demand Per Platform ===== */
+-- Share of each platform's catalogue in each price band, and how much of the demand it takes.
+
+SELECT
+    platform,
+    band,
+    games,
+    share_of_games_pct,
+    purchases,
+    share_of_purchases_pct,
+    purchases_per_game
+FROM pricing_bands
+WHERE currency = 'usd'
+ORDER BY platform, band_order;
+
+/* ===== QUERY 2: Demand Per Price Band in Every Currency ===== */
+
+SELECT
+    platform,
+    currency,
+    band,
+    games,
+    purchases_per_game,
+    avg_price
+FROM pricing_bands
+ORDER BY platform, currency, band_order;
+
+/* ===== QUERY 3: Cross-Regional Price Ratios Per Platform ===== */
+-- Local price divided by the USD price of the same game (median and 10th / 90th percentile).
+
+SELECT
+    platform,
+    currency,
+    games,
+    median_ratio,
+    p10_ratio,
+    p90_ratio
+FROM pricing_regional_summary
+ORDER BY currency, median_ratio DESC;
+
+/* ===== QUERY 4: Games Priced Highest in Europe Relative to USD ===== */
+
+SELECT
+    g.title,
+    pr.platform,
+    pr.usd,
+    pr.eur,
+    pr.eur_per_usd,
+    pr.purchases
+FROM pricing_regional AS pr
+LEFT JOIN games AS g
+    ON g.gameid = pr.gameid
+   AND g.platform = pr.platform
+WHERE pr.eur_per_usd IS NOT NULL
+ORDER BY pr.eur_per_usd DESC, pr.purchases DESC, pr.platform, pr.gameid
+LIMIT 20;
+
+/* ===== QUERY 5: Demand for Games After Price Cuts vs Increases ===== */
+-- demand_index = purchases per game relative to the platform average (1.0 = average).
+
+SELECT
+    platform,
+    direction,
+    games,
+    purchases_per_game,
+    median_purchases,
+    median_change_pct,
+    demand_index
+FROM pricing_change_demand
+ORDER BY platform, demand_index DESC;
+
+/* ===== QUERY 6: Largest Price Cuts and Their Demand ===== */
+
+SELECT
+    g.title,
+    pc.platform,
+    pc.first_usd,
+    pc.last_usd,
+    pc.change_pct,
+    pc.price_changes,
+    pc.first_date,
+    pc.last_date,
+    pc.purchases
+FROM pricing_changes AS pc
+LEFT JOIN games AS g
+    ON g.gameid = pc.gameid
+   AND g.platform = pc.platform
+WHERE pc.direction = 'cut'
+ORDER BY pc.change_pct ASC, pc.purchases DESC, pc.platform, pc.gameid
+LIMIT 20;
+
+/* ===== QUERY 7: Price Elasticity of Demand Per Platform ===== */
+-- Slope of log(purchases) on log(USD price) across each platform's games:
+-- -1 means 10% higher prices go with ~10% fewer purchases; near 0 means price hardly matters.
+
+SELECT
+    platform,
+    games,
+    elasticity
+FROM pricing_elasticity
+ORDER BY elasticity ASC;